@@ -0,0 +1,907 @@
+import asyncio
+import gzip
+import json
+import time
+from datetime import date
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.dependencies import ServiceRunner, get_db, get_session
+from app.instrumentation import instrument_engine, route_metrics, slow_queries
+from app.main import app
+from app.models.wishlist import Wishlist
+from app.repositories.unique_link_repository import UniqueLinkRepository
+from app.metrics import Histogram
+from app.schemas.gift import GiftShort
+from app.serialization import list_adapter, validate_list
+from app.services.gift_import import read_import_rows
+from app.services.link_filter import BloomFilter, UniqueLinkFilter, unique_link_filter
+from app.services.single_flight import SingleFlight
+from app.services.user_cache import user_cache, user_read_flight
+from app.services.wishlist_cache import (
+    PublicWishlistCache,
+    etag_matches,
+    public_wishlist_cache,
+    public_wishlist_flight,
+)
+from app.services.wishlist_service import WishlistService
+
+
+@pytest.fixture
+def client():
+    """HTTP-клиент поверх in-memory БД, общей для всех потоков"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    instrument_engine(engine)
+    SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+    def override_session():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_db] = override_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    unique_link_filter.clear()
+    user_cache.clear()
+    public_wishlist_cache.clear()
+    public_wishlist_flight.clear()
+    user_read_flight.clear()
+    route_metrics.clear()
+    slow_queries.clear()
+
+
+@pytest.fixture
+def auth_headers(client):
+    client.post(
+        "/users/register",
+        json={"login": "owner", "email": "owner@example.com", "password": "password123"},
+    )
+    token = client.post("/users/token", data={"username": "owner", "password": "password123"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+@pytest.fixture
+def guest_headers(client, auth_headers):
+    client.post(
+        "/users/register",
+        json={"login": "guest", "email": "guest@example.com", "password": "password123"},
+    )
+    token = client.post("/users/token", data={"username": "guest", "password": "password123"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+@pytest.fixture
+def wishlist(client, auth_headers):
+    return client.post(
+        "/wishlists/",
+        json={"user_id": 1, "name": "Birthday", "event_date": "2026-03-15"},
+        headers=auth_headers,
+    ).json()
+
+
+class TestPublicWishlistCache:
+    """Тесты кэша публичных вишлистов"""
+
+    def test_entry_expires_after_ttl(self):
+        """✅ Позитив: запись живёт не дольше TTL"""
+        now = [0.0]
+        cache = PublicWishlistCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        cache.put("link", 1, 1, b"{}")
+
+        assert cache.get("link", 1) is not None
+        now[0] = 6
+        assert cache.get("link", 1) is None
+
+    def test_invalidation_drops_all_links_of_wishlist(self):
+        """✅ Позитив: сброс по wishlist_id удаляет все его записи"""
+        cache = PublicWishlistCache(maxsize=10, ttl=60)
+        cache.put("old", 1, 1, b"{}")
+        cache.put("other", 2, 1, b"{}")
+
+        cache.invalidate_wishlist(1)
+
+        assert cache.get("old", 1) is None
+        assert cache.get("other", 1) is not None
+
+    def test_entry_of_old_version_is_not_served(self):
+        """❌ Негатив: запись другой версии вишлиста не отдаётся"""
+        cache = PublicWishlistCache(maxsize=10, ttl=60)
+        cache.put("link", 1, 3, b"{}")
+
+        assert cache.get("link", 4) is None
+        assert cache.get("link", 3) is None
+
+    def test_etag_comes_from_version(self):
+        """✅ Позитив: ETag зависит только от вишлиста и его версии"""
+        cache = PublicWishlistCache(maxsize=10, ttl=60)
+
+        assert cache.put("a", 1, 3, b"{}").etag == cache.put("b", 1, 3, b"[]").etag == '"1-3"'
+        assert cache.put("a", 1, 4, b"{}").etag != '"1-3"'
+
+    def test_etag_matching(self):
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches(None, '"b"')
+        assert not etag_matches('"a"', '"b"')
+
+
+class TestWishlistByLinkCaching:
+    """Тесты условных запросов к GET /wishlists/link/{unique_link}"""
+
+    def test_not_modified_with_matching_etag(self, client, wishlist):
+        """✅ Позитив: повторный запрос с If-None-Match получает 304 без тела"""
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.json()["name"] == "Birthday"
+        etag = first.headers["ETag"]
+
+        second = client.get(url, headers={"If-None-Match": etag})
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_gift_change_produces_new_etag(self, client, auth_headers, wishlist):
+        """✅ Позитив: после добавления подарка отдаётся свежий ответ"""
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        etag = client.get(url).headers["ETag"]
+
+        client.post(
+            "/gifts/",
+            json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"},
+            headers=auth_headers,
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert [g["name"] for g in response.json()["gifts"]] == ["Book"]
+
+    def test_write_from_another_worker_is_visible(self, client, wishlist, link_db):
+        """✅ Позитив: запись без локальной инвалидации (другой воркер) видна по версии сразу"""
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        etag = client.get(url).headers["ETag"]
+
+        link_db.execute(text("UPDATE wishlists SET name = 'Party', version = version + 1"))
+        link_db.commit()
+        response = client.get(url, headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()["name"] == "Party"
+
+    def test_gift_rename_produces_new_etag(self, client, auth_headers, wishlist):
+        """✅ Позитив: правка подарка без изменения счётчиков тоже повышает версию"""
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        gift = client.post(
+            "/gifts/", json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"}, headers=auth_headers,
+        ).json()
+        etag = client.get(url).headers["ETag"]
+
+        client.patch(f"/gifts/{gift['gift_id']}", json={"name": "Novel"}, headers=auth_headers)
+        response = client.get(url, headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert [g["name"] for g in response.json()["gifts"]] == ["Novel"]
+
+    def test_regenerated_link_is_not_served(self, client, auth_headers, wishlist):
+        """❌ Негатив: старая ссылка перестаёт работать сразу после перевыпуска"""
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        assert client.get(url).status_code == 200
+
+        client.post(f"/wishlists/{wishlist['wishlist_id']}/regenerate-link", headers=auth_headers)
+
+        assert client.get(url).status_code == 404
+
+
+class TestSingleFlight:
+    """Объединение одинаковых одновременных чтений"""
+
+    def test_concurrent_calls_share_one_load(self):
+        """✅ Позитив: одновременные вызовы с одним ключом выполняют загрузку один раз"""
+        flight = SingleFlight("test")
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do("key", load) for _ in range(10)), flight.do("other", load))
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 2
+        assert all(result is results[0] for result in results[:10])
+        assert flight.stats()["executed"] == 2 and flight.stats()["coalesced"] == 9
+        assert flight.in_flight() == 0
+
+    def test_error_is_shared_and_not_remembered(self):
+        """❌ Негатив: ошибка загрузки получают все ожидающие, следующий вызов загружает заново"""
+        flight = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def scenario():
+            first = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+            second = await asyncio.gather(flight.do("key", fail), return_exceptions=True)
+            return first + second
+
+        errors = asyncio.run(scenario())
+
+        assert all(isinstance(e, ValueError) for e in errors)
+        assert flight.stats()["executed"] == 2 and flight.stats()["errors"] == 2
+
+    def test_cancelled_waiter_does_not_cancel_load(self):
+        """✅ Позитив: отмена первого вызова не обрывает загрузку для остальных"""
+        flight = SingleFlight("test")
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("key", load))
+            second = asyncio.ensure_future(flight.do("key", load))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "done"
+
+    def test_shared_load_uses_its_own_session(self, link_db, monkeypatch):
+        """✅ Позитив: общая загрузка идёт не в сессии запроса-лидера и закрывает свою сессию"""
+        sessions = []
+        original = WishlistService.get_public_by_link
+
+        def record(self, unique_link):
+            sessions.append(self.db)
+            return original(self, unique_link)
+
+        monkeypatch.setattr(WishlistService, "get_public_by_link", record)
+        runner = ServiceRunner(link_db, WishlistService, single_flight=SingleFlight("test"))
+
+        assert asyncio.run(runner.get_public_by_link("missing")) is None
+        assert asyncio.run(runner.in_own_session().get_public_by_link("missing")) is None
+
+        assert len(sessions) == 2
+        assert all(session is not link_db for session in sessions)
+        assert not any(session.in_transaction() for session in sessions)
+
+    def test_public_link_herd_after_invalidation(self, client, auth_headers, wishlist, monkeypatch):
+        """✅ Позитив: после инвалидации одновременные запросы по ссылке читают БД один раз"""
+        loads = []
+        original = WishlistService.get_public_by_link
+
+        def slow_load(self, unique_link):
+            loads.append(unique_link)
+            time.sleep(0.05)
+            return original(self, unique_link)
+
+        monkeypatch.setattr(WishlistService, "get_public_by_link", slow_load)
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        client.get(url)
+        client.post("/gifts/", json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"}, headers=auth_headers)
+
+        async def herd():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await asyncio.gather(*(http.get(url) for _ in range(20)))
+
+        responses = asyncio.run(herd())
+
+        assert len(loads) == 2
+        assert {r.status_code for r in responses} == {200}
+        assert all(r.json()["gifts"][0]["name"] == "Book" for r in responses)
+        assert public_wishlist_flight.stats()["coalesced"] == 19
+
+    def test_service_runner_coalesces_user_reads(self, client, auth_headers, monkeypatch):
+        """✅ Позитив: ServiceRunner с single_flight объединяет чтения профиля по аргументам вызова"""
+        from app.services.user_service import UserService
+
+        loads = []
+        original = UserService.get_by_id
+
+        def slow_get(self, user_id):
+            loads.append(user_id)
+            time.sleep(0.05)
+            return original(self, user_id)
+
+        monkeypatch.setattr(UserService, "get_by_id", slow_get)
+
+        async def herd():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await asyncio.gather(
+                    *(http.get("/users/1") for _ in range(5)),
+                    *(http.get("/users/1", params={"_": i}) for i in range(5)),
+                    http.get("/users/2"),
+                )
+
+        responses = asyncio.run(herd())
+
+        assert sorted(loads) == [1, 2]
+        assert [r.status_code for r in responses] == [200] * 10 + [404]
+        assert 'single_flight_calls_total{flight="user_read",result="coalesced"} 9' in client.get("/metrics").text
+
+@pytest.fixture
+def link_db(client):
+    """Сессия той же in-memory БД, что и у HTTP-клиента"""
+    sessions = app.dependency_overrides[get_db]()
+    yield next(sessions)
+    sessions.close()
+
+
+def sql_queries(response) -> int:
+    return int(response.headers["Server-Timing"].split('desc="')[1].split(" ")[0])
+
+
+class TestUniqueLinkFilter:
+    """Тесты фильтра Блума для GET /wishlists/link/{unique_link}"""
+
+    def test_bloom_has_no_false_negatives(self):
+        """✅ Позитив: добавленные ключи всегда найдены, доля ложных ответов около целевой"""
+        bloom = BloomFilter(capacity=10000, fp_rate=0.01, max_bytes=1 << 20)
+        for i in range(10000):
+            bloom.add(f"link-{i}")
+
+        assert all(f"link-{i}" in bloom for i in range(10000))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 250
+        assert bloom.estimated_fp_rate() < 0.02
+
+    def test_bloom_respects_memory_limit(self):
+        """✅ Позитив: размер битового массива ограничен max_bytes"""
+        bloom = BloomFilter(capacity=10**7, fp_rate=0.001, max_bytes=1024)
+
+        assert bloom.nbytes == 1024
+
+    def test_disabled_filter_admits_everything(self, link_db):
+        """✅ Позитив: выключенный или не построенный фильтр пропускает любую ссылку"""
+        link_filter = UniqueLinkFilter(enabled=False, fp_rate=0.01, capacity=100, max_bytes=1024, sync_interval=1)
+
+        assert link_filter.rebuild(link_db) == 0
+        assert not link_filter.ready
+        assert link_filter.might_contain("anything")
+
+    def test_unknown_link_rejected_without_query(self, client, wishlist, link_db, monkeypatch):
+        """❌ Негатив: неизвестная ссылка получает 404 без единого SQL-запроса"""
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 3600)
+        assert unique_link_filter.rebuild(link_db) == 1
+
+        response = client.get("/wishlists/link/no-such-link")
+
+        assert response.status_code == 404
+        assert sql_queries(response) == 0
+        assert client.get(f"/wishlists/link/{wishlist['unique_link']}").status_code == 200
+        assert unique_link_filter.stats()["rejected"] == 1
+
+    def test_new_link_admitted_immediately(self, client, auth_headers, link_db, monkeypatch):
+        """✅ Позитив: ссылка, созданная после построения фильтра, сразу доступна"""
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 3600)
+        unique_link_filter.rebuild(link_db)
+
+        created = client.post(
+            "/wishlists/",
+            json={"user_id": 1, "name": "New", "event_date": "2026-03-15"},
+            headers=auth_headers,
+        ).json()
+        regenerated = client.post(f"/wishlists/{created['wishlist_id']}/regenerate-link", headers=auth_headers).json()
+
+        assert client.get(f"/wishlists/link/{created['unique_link']}").status_code == 404
+        assert client.get(f"/wishlists/link/{regenerated['unique_link']}").status_code == 200
+        stats = unique_link_filter.stats()
+        assert stats["rejected"] == 0
+        assert stats["false_positives"] == 1
+        assert stats["removed"] == 1
+
+    def test_link_from_other_process_read_from_log(self, client, wishlist, link_db, monkeypatch):
+        """✅ Позитив: ссылка, записанная другим процессом, дочитывается из журнала перед отказом"""
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 0)
+        unique_link_filter.rebuild(link_db)
+        # Запись в обход сервиса: фильтр этого процесса о ней не знает
+        link_db.add(Wishlist(user_id=1, name="Other", event_date=date(2026, 3, 15), unique_link="from-other-worker"))
+        link_db.commit()
+
+        response = client.get("/wishlists/link/from-other-worker")
+
+        assert response.status_code == 200
+        assert response.json()["name"] == "Other"
+        assert unique_link_filter.stats()["rejected"] == 0
+
+    def test_link_written_during_rebuild_read_from_log(self, client, wishlist, link_db, monkeypatch):
+        """✅ Позитив: ссылку, записанную после чтения seq и не попавшую в проход, фильтр дочитывает из журнала"""
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 0)
+        last_seq, iter_links = UniqueLinkRepository.last_seq, UniqueLinkRepository.iter_links
+
+        def last_seq_then_write(repo):
+            seq = last_seq(repo)
+            repo.db.add(Wishlist(user_id=1, name="Late", event_date=date(2026, 3, 15), unique_link="late-link"))
+            repo.db.commit()
+            return seq
+
+        def iter_links_before_write(repo, batch_size):
+            return (link for link in iter_links(repo, batch_size) if link != "late-link")
+
+        monkeypatch.setattr(UniqueLinkRepository, "last_seq", last_seq_then_write)
+        monkeypatch.setattr(UniqueLinkRepository, "iter_links", iter_links_before_write)
+        unique_link_filter.rebuild(link_db)
+        monkeypatch.undo()
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 0)
+
+        assert not unique_link_filter.might_contain("late-link")
+        assert client.get("/wishlists/link/late-link").status_code == 200
+        assert unique_link_filter.stats()["rejected"] == 0
+
+    def test_pruned_log_triggers_rebuild(self, client, wishlist, link_db, monkeypatch):
+        """✅ Позитив: если журнал обрезан дальше прочитанного, фильтр перестраивается целиком"""
+        monkeypatch.setattr(unique_link_filter, "sync_interval", 0)
+        unique_link_filter.rebuild(link_db)
+        link_db.add_all([
+            Wishlist(user_id=1, name=name, event_date=date(2026, 3, 15), unique_link=name.lower())
+            for name in ("First", "Second")
+        ])
+        link_db.flush()
+        # Другой воркер обрезал журнал: запись о "first" этот процесс уже не прочитает
+        link_db.execute(text("DELETE FROM unique_link_log WHERE unique_link != 'second'"))
+        link_db.commit()
+
+        assert client.get("/wishlists/link/second").status_code == 200
+        assert client.get("/wishlists/link/first").status_code == 200
+        assert unique_link_filter.stats()["rebuilds"] == 2
+        assert unique_link_filter.stats()["links"] == 3
+
+    def test_filter_metrics(self, client, wishlist, link_db):
+        """✅ Позитив: размер фильтра и доля отказов видны в /metrics"""
+        unique_link_filter.rebuild(link_db)
+        client.get("/wishlists/link/no-such-link")
+
+        body = client.get("/metrics").text
+
+        assert 'unique_link_filter{stat="links"} 1' in body
+        assert 'unique_link_filter_checks_total{result="rejected"} 1' in body
+
+
+class TestGiftImport:
+    """Тесты пакетного импорта подарков через HTTP"""
+
+    def test_bulk_json(self, client, auth_headers, wishlist):
+        """✅ Позитив: POST /gifts/bulk возвращает результат по каждой строке"""
+        response = client.post(
+            f"/gifts/bulk?wishlist_id={wishlist['wishlist_id']}",
+            json=[{"name": "Book"}, {"name": "Pen", "price": "abc"}],
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["created"] == 1
+        assert body["results"][1]["error"].startswith("price:")
+
+    def test_import_ndjson(self, client, auth_headers, wishlist):
+        """✅ Позитив: импорт из NDJSON"""
+        lines = "\n".join(f'{{"name": "Gift {i}"}}' for i in range(50))
+        response = client.post(
+            f"/gifts/import?wishlist_id={wishlist['wishlist_id']}",
+            content=lines.encode(),
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["created"] == 50
+
+    def test_import_csv(self, client, auth_headers, wishlist):
+        """✅ Позитив: импорт из CSV с заголовком, пустые ячейки не мешают"""
+        csv_body = "name,price,description\r\nКнига,500,\r\nРучка,,синяя\r\n"
+        response = client.post(
+            f"/gifts/import?wishlist_id={wishlist['wishlist_id']}",
+            content=csv_body.encode(),
+            headers={**auth_headers, "Content-Type": "text/csv; charset=utf-8"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["created"] == 2
+        gifts = client.get(f"/gifts/wishlist/{wishlist['wishlist_id']}", headers=auth_headers).json()
+        assert [(g["name"], g["price"]) for g in gifts] == [("Книга", 500.0), ("Ручка", None)]
+
+    def test_import_invalid_json_line(self, client, auth_headers, wishlist):
+        """❌ Негатив: битая строка NDJSON"""
+        response = client.post(
+            f"/gifts/import?wishlist_id={wishlist['wishlist_id']}",
+            content=b'{"name": "Ok"}\n{oops\n',
+            headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid JSON on line 2"
+
+    def test_import_stops_reading_after_row_limit(self):
+        """❌ Негатив: поток длиннее gift_bulk_max_rows отклоняется, не дочитываясь до конца"""
+        consumed = []
+
+        async def body():
+            for i in range(10_000):
+                consumed.append(i)
+                yield f'{{"name": "Gift {i}"}}\n'.encode()
+
+        with pytest.raises(ValueError, match="at most 5 allowed"):
+            asyncio.run(read_import_rows(body(), "application/x-ndjson", max_rows=5))
+        assert len(consumed) <= 7
+
+    def test_import_rejects_long_line(self):
+        """❌ Негатив: строка длиннее лимита отклоняется, даже без перевода строки"""
+        async def body():
+            while True:
+                yield b"x" * 1024
+
+        with pytest.raises(ValueError, match="longer than 4096 bytes"):
+            asyncio.run(read_import_rows(body(), "text/csv", max_line_bytes=4096))
+
+    def test_import_csv_quoted_newline(self):
+        """✅ Позитив: поле CSV в кавычках может занимать несколько строк"""
+        async def body():
+            yield '\ufeffname,description\r\nКнига,"две\r\nстроки"\r\nРучка,""\r\n'.encode()
+
+        rows = asyncio.run(read_import_rows(body(), "text/csv"))
+
+        assert rows == [{"name": "Книга", "description": "две\nстроки"}, {"name": "Ручка"}]
+
+    def test_import_unsupported_format(self, client, auth_headers):
+        """❌ Негатив: неподдерживаемый Content-Type"""
+        response = client.post(
+            "/gifts/import",
+            content=b"<xml/>",
+            headers={**auth_headers, "Content-Type": "application/xml"},
+        )
+
+        assert response.status_code == 400
+
+
+class TestListSerialization:
+    """Списки сериализуются из строк Row через TypeAdapter"""
+
+    def test_validate_list_accepts_rows_and_dicts(self):
+        """✅ Позитив: один адаптер на схему; строки-объекты и словари валидируются одинаково"""
+        row = {"gift_id": 1, "wishlist_id": 2, "name": "Book", "created_at": "2026-01-01 10:00:00"}
+
+        class Attrs:
+            def __init__(self, **values):
+                self.__dict__.update(values)
+
+        items = validate_list(GiftShort, [row, Attrs(**row)])
+
+        assert list_adapter(GiftShort) is list_adapter(GiftShort)
+        assert items[0] == items[1]
+        assert items[0].active_reservations is None
+
+    def test_gift_pages(self, client, auth_headers, wishlist):
+        """✅ Позитив: страницы подарков с курсором и полями GiftShort"""
+        client.post(
+            f"/gifts/bulk?wishlist_id={wishlist['wishlist_id']}",
+            json=[{"name": "Book", "price": 10}, {"name": "Pen"}, {"name": "Lamp"}],
+            headers=auth_headers,
+        )
+
+        first = client.get(f"/gifts/wishlist/{wishlist['wishlist_id']}?limit=2", headers=auth_headers)
+        second = client.get(
+            f"/gifts/wishlist/{wishlist['wishlist_id']}?limit=2&cursor={first.headers['X-Next-Cursor']}",
+            headers=auth_headers,
+        )
+
+        assert first.headers["content-type"] == "application/json"
+        assert set(first.json()[0]) == set(GiftShort.model_fields)
+        assert first.json()[0]["price"] == 10.0
+        assert "T" in first.json()[0]["created_at"]
+        assert [g["name"] for g in second.json()] == ["Lamp"]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_my_reservations(self, client, auth_headers, wishlist):
+        """✅ Позитив: /reservations/my отдаёт брони текущего пользователя"""
+        gift = client.post(
+            "/gifts/", json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"}, headers=auth_headers,
+        ).json()
+        client.post(
+            "/users/register",
+            json={"login": "guest", "email": "guest@example.com", "password": "password123"},
+        )
+        token = client.post("/users/token", data={"username": "guest", "password": "password123"}).json()
+        guest = {"Authorization": f"Bearer {token['access_token']}"}
+        client.post(f"/reservations/gift/{gift['gift_id']}", headers=guest)
+
+        response = client.get("/reservations/my?only_active=true", headers=guest)
+
+        assert response.status_code == 200
+        [reservation] = response.json()
+        assert reservation["gift_id"] == gift["gift_id"]
+        assert reservation["cancelled_at"] is None
+        assert client.get("/reservations/my", headers=auth_headers).json() == []
+
+
+class TestUserExport:
+    """Потоковая выгрузка данных пользователя"""
+
+    @pytest.fixture
+    def filled(self, client, auth_headers, guest_headers, wishlist):
+        client.post(
+            f"/gifts/bulk?wishlist_id={wishlist['wishlist_id']}",
+            json=[{"name": f"Gift {i}"} for i in range(5)],
+            headers=auth_headers,
+        )
+        client.post("/wishlists/", json={"user_id": 1, "name": "Empty", "event_date": "2026-05-01"}, headers=auth_headers)
+        guest_wishlist = client.post(
+            "/wishlists/", json={"user_id": 2, "name": "Guest", "event_date": "2026-06-01"}, headers=guest_headers,
+        ).json()
+        guest_gift = client.post(
+            "/gifts/", json={"wishlist_id": guest_wishlist["wishlist_id"], "name": "Guest gift"}, headers=guest_headers,
+        ).json()
+        assert client.post(f"/reservations/gift/{guest_gift['gift_id']}", headers=auth_headers).status_code == 201
+
+    def test_ndjson(self, client, auth_headers, filled):
+        """✅ Позитив: NDJSON со всеми записями пользователя по порядку"""
+        response = client.get("/users/me/export", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "attachment" in response.headers["content-disposition"]
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["type"] for r in records] == ["user"] + ["wishlist"] * 2 + ["gift"] * 5 + ["reservation"]
+        assert records[0]["data"]["login"] == "owner"
+        assert "password_hash" not in records[0]["data"]
+        assert [r["data"]["name"] for r in records if r["type"] == "gift"] == [f"Gift {i}" for i in range(5)]
+
+    def test_gzip_json_matches_ndjson(self, client, auth_headers, filled):
+        """✅ Позитив: архив JSON в gzip содержит те же данные"""
+        lines = client.get("/users/me/export", headers=auth_headers).text.splitlines()
+        response = client.get("/users/me/export?format=json.gz", headers=auth_headers)
+
+        assert response.headers["content-type"] == "application/gzip"
+        document = json.loads(gzip.decompress(response.content))
+        records = [json.loads(line) for line in lines]
+        assert document["user"] == records[0]["data"]
+        assert document["gifts"] == [r["data"] for r in records if r["type"] == "gift"]
+        assert len(document["wishlists"]) == 2 and len(document["reservations"]) == 1
+
+    def test_only_own_data(self, client, guest_headers, filled):
+        """✅ Позитив: в выгрузку не попадают чужие вишлисты, подарки и брони"""
+        response = client.get("/users/me/export", headers=guest_headers)
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["type"] for r in records] == ["user", "wishlist", "gift"]
+        assert records[2]["data"]["name"] == "Guest gift"
+
+    def test_streams_in_batches(self, client, auth_headers, filled):
+        """✅ Позитив: записи читаются пачками курсора и отдаются кусками заданного размера"""
+        from app.services.user_export import UserExport
+
+        db = next(app.dependency_overrides[get_db]())
+        export = UserExport(db, 1, batch_size=2, chunk_size=64)
+        chunks = list(export.ndjson())
+        db.close()
+
+        assert len(chunks) > 1
+        assert all(len(chunk) >= 64 for chunk in chunks[:-1])
+        assert sum(chunk.count(b"\n") for chunk in chunks) == 9
+
+    def test_export_reads_one_snapshot(self, tmp_path):
+        """✅ Позитив: запись, зафиксированная во время выгрузки, в неё не попадает"""
+        from app.models.user import User
+        from app.services.user_export import UserExport
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        with Session() as writer:
+            writer.add(User(user_id=1, login="owner", email="owner@example.com", password_hash="x"))
+            writer.add(Wishlist(user_id=1, name="First", event_date=date(2026, 3, 15)))
+            writer.commit()
+
+        with Session() as reader:
+            export = UserExport(reader, 1)
+            export.load_user()
+            with Session() as writer:
+                writer.add(Wishlist(user_id=1, name="Second", event_date=date(2026, 3, 15)))
+                writer.commit()
+            records = [json.loads(line) for line in b"".join(export.ndjson()).splitlines()]
+        engine.dispose()
+
+        assert [r["data"]["name"] for r in records if r["type"] == "wishlist"] == ["First"]
+
+    def test_unknown_format(self, client, auth_headers):
+        """❌ Негатив: неизвестный формат выгрузки"""
+        assert client.get("/users/me/export?format=xml", headers=auth_headers).status_code == 422
+
+    def test_requires_token(self, client):
+        """❌ Негатив: выгрузка без токена"""
+        assert client.get("/users/me/export").status_code == 401
+
+
+class TestWriteStatements:
+    """Запросы на запись: изменения фиксируются одним COMMIT без перечитывания строк"""
+
+    def test_no_reload_after_write(self, client, auth_headers, wishlist, link_db):
+        """✅ Позитив: после UPDATE/INSERT ответ собирается без SELECT и COMMIT ровно один"""
+        gift = client.post(
+            "/gifts/", json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"}, headers=auth_headers,
+        ).json()
+        engine = link_db.get_bind()
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lstrip().split()[0].upper())
+
+        def on_commit(conn):
+            statements.append("COMMIT")
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        event.listen(engine, "commit", on_commit)
+        try:
+            response = client.patch(f"/gifts/{gift['gift_id']}", json={"price": 10}, headers=auth_headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+            event.remove(engine, "commit", on_commit)
+
+        assert response.status_code == 200
+        assert response.json()["price"] == 10
+        assert statements.count("COMMIT") == 1
+        assert "SELECT" not in statements[statements.index("UPDATE"):]
+
+    def test_new_wishlist_response_without_gift_query(self, client, auth_headers):
+        """✅ Позитив: новый вишлист отдаётся без запроса подарков"""
+        response = client.post(
+            "/wishlists/", json={"user_id": 1, "name": "New", "event_date": "2026-03-15"}, headers=auth_headers,
+        )
+
+        assert response.status_code == 201
+        assert response.json()["gifts"] == []
+        assert sql_queries(response) <= 2
+
+
+class TestReservationBatch:
+    """Тесты POST /reservations/batch"""
+
+    def test_reserve_cart(self, client, auth_headers, guest_headers, wishlist):
+        """✅ Позитив: несколько подарков бронируются одним запросом с результатом по каждому"""
+        created = client.post(
+            f"/gifts/bulk?wishlist_id={wishlist['wishlist_id']}",
+            json=[{"name": f"Gift {i}", "price": 5} for i in range(5)],
+            headers=auth_headers,
+        ).json()
+        gift_ids = [row["gift_id"] for row in created["results"]]
+        url = f"/wishlists/link/{wishlist['unique_link']}"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.post("/reservations/batch", json={"gift_ids": gift_ids + [99999]}, headers=guest_headers)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["reserved"] == 5 and body["failed"] == 1
+        assert [r["reservation"]["gift_id"] for r in body["results"][:5]] == gift_ids
+        assert body["results"][5] == {"index": 5, "gift_id": 99999, "reservation": None, "error": "Gift not found"}
+        assert sql_queries(response) <= 5
+        public = client.get(url, headers={"If-None-Match": etag})
+        assert public.status_code == 200
+        assert {g["status"] for g in public.json()["gifts"]} == {"reserved"}
+        assert len(client.get("/reservations/my", headers=guest_headers).json()) == 5
+
+    def test_atomic_conflict(self, client, auth_headers, guest_headers, wishlist):
+        """❌ Негатив: atomic-пакет с занятым подарком ничего не бронирует"""
+        gift_ids = [
+            client.post(
+                "/gifts/", json={"wishlist_id": wishlist["wishlist_id"], "name": name}, headers=auth_headers,
+            ).json()["gift_id"]
+            for name in ("Book", "Pen")
+        ]
+        client.post(f"/reservations/gift/{gift_ids[0]}", headers=guest_headers)
+
+        body = client.post(
+            "/reservations/batch", json={"gift_ids": gift_ids, "atomic": True}, headers=guest_headers,
+        ).json()
+
+        assert body["reserved"] == 0
+        assert body["results"][0]["error"] == "Gift is already reserved by this user"
+        assert len(client.get("/reservations/my", headers=guest_headers).json()) == 1
+
+    def test_validation(self, client, guest_headers):
+        """❌ Негатив: пустой список — 422, слишком большой пакет — 400, без токена — 401"""
+        assert client.post("/reservations/batch", json={"gift_ids": []}, headers=guest_headers).status_code == 422
+        too_many = client.post("/reservations/batch", json={"gift_ids": list(range(1, 1000))}, headers=guest_headers)
+        assert too_many.status_code == 400
+        assert client.post("/reservations/batch", json={"gift_ids": [1]}).status_code == 401
+
+
+class TestRequestMetrics:
+    """Тесты учёта SQL-запросов по HTTP-запросам"""
+
+    def test_server_timing_header(self, client, auth_headers, wishlist):
+        """✅ Позитив: ответ содержит Server-Timing с числом запросов к БД"""
+        response = client.get("/wishlists/my", headers=auth_headers)
+
+        timing = response.headers["Server-Timing"]
+        assert timing.startswith("db;dur=")
+        assert '"0 queries"' not in timing
+        assert "total;dur=" in timing
+
+    def test_metrics_keyed_by_route_template(self, client, auth_headers, wishlist):
+        """✅ Позитив: метрики агрегируются по шаблону маршрута, а не по конкретному пути"""
+        client.get(f"/wishlists/link/{wishlist['unique_link']}")
+        client.get("/wishlists/link/missing")
+
+        routes = client.get("/metrics/sql", headers=auth_headers).json()["routes"]
+
+        item = routes["GET /wishlists/link/{unique_link}"]
+        assert item["requests"] == 2
+        assert item["queries"] >= 2
+        assert item["slowest_statement"].startswith("SELECT")
+
+    def test_slow_query_explain(self, client, wishlist, monkeypatch):
+        """✅ Позитив: медленные SELECT попадают в журнал вместе с планом"""
+        from app.config import settings
+        monkeypatch.setattr(settings, "slow_query_ms", 0.0)
+        monkeypatch.setattr(settings, "slow_query_explain_rate", 1.0)
+
+        client.get(f"/wishlists/link/{wishlist['unique_link']}")
+
+        entries = [e for e in slow_queries.snapshot() if e["statement"].lstrip().startswith("SELECT")]
+        assert entries
+        assert all(e["plan"] for e in entries)
+
+    def test_sql_metrics_require_auth(self, client):
+        """❌ Негатив: тексты SQL-запросов не отдаются без авторизации"""
+        assert client.get("/metrics/sql").status_code == 401
+
+
+class TestPrometheusMetrics:
+    """Тесты /metrics в текстовом формате Prometheus"""
+
+    def test_histogram_rendering(self):
+        """✅ Позитив: корзины накопительные, есть _sum и _count"""
+        histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+        histogram.observe(5, route="/a")
+
+        lines = histogram.render()
+
+        assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+        assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{route="/a"} 3' in lines
+
+    def test_route_latency_and_runtime_gauges(self, client, auth_headers, wishlist):
+        """✅ Позитив: латентность по маршруту и статусу, загрузка пулов и кэшей"""
+        client.get("/wishlists/my", headers=auth_headers)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/wishlists/my",status="200"}' in text
+        assert 'http_router_busy_seconds_total{router="Wishlists"}' in text
+        assert 'threadpool_threads{state="max"}' in text
+        assert "threadpool_queue_wait_seconds_count" in text
+        assert 'password_hash_queue{state="in_flight"} 0' in text
+        assert 'cache_hit_ratio{cache="user_principal"}' in text
+        assert 'db_queries_total{route="GET /wishlists/my"}' in text
@@ -0,0 +1,4 @@
+import time
+
+# Начало отсчёта холодного старта воркера (см. app.boot)
+STARTED_AT = time.perf_counter()
@@ -0,0 +1,121 @@
+"""Запуск воркера: схема БД, прогрев и замер холодного старта.
+
+В боевом режиме (PRODUCTION=true) DDL не выполняется: версия схемы сверяется
+одним запросом, миграции применяются заранее (python -m app.migrations upgrade).
+"""
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from app import STARTED_AT, schemas
+from app.config import settings
+from app.database import engine, init_db
+from app.migrations import head, schema_version
+from app.services.link_filter import unique_link_filter
+from app.services.password_hasher import password_hasher
+
+
+boot_logger = logging.getLogger("app.boot")
+
+
+class SchemaVersionError(RuntimeError):
+    """Схема БД не совпадает с версией приложения"""
+
+
+class BootReport:
+    """Длительность этапов запуска воркера (в секундах); import — от импорта пакета app"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.total: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def as_dict(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "mode": "production" if settings.production else "development",
+            "total_ms": round((self.total or 0.0) * 1000, 2),
+            "phases_ms": {name: round(value * 1000, 2) for name, value in self.phases.items()},
+        }
+
+
+boot_report = BootReport()
+
+
+def verify_schema(bind: Engine) -> int:
+    """Одним запросом сверяет версию схемы с последней миграцией"""
+    try:
+        with bind.connect() as conn:
+            version = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError) as e:
+        raise SchemaVersionError("Schema is not initialized, run: python -m app.migrations upgrade") from e
+    if version != head():
+        raise SchemaVersionError(
+            f"Schema version {version} does not match {head()}, run: python -m app.migrations upgrade"
+        )
+    return version
+
+
+def prewarm_pool(bind: Engine, connections: int) -> int:
+    """Открывает соединения заранее (вместе с PRAGMA профиля) и возвращает их в пул"""
+    pool_size = getattr(bind.pool, "size", None)
+    if callable(pool_size):
+        connections = min(connections, pool_size())
+    opened = [bind.connect() for _ in range(max(connections, 0))]
+    for conn in opened:
+        conn.close()
+    return len(opened)
+
+
+def warm_schemas() -> int:
+    """Импортирует все схемы и достраивает валидаторы моделей с отложенными ссылками"""
+    models = 0
+    for module_info in pkgutil.iter_modules(schemas.__path__, schemas.__name__ + "."):
+        module = importlib.import_module(module_info.name)
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, BaseModel) and value.__module__ == module.__name__:
+                if not value.__pydantic_complete__:
+                    value.model_rebuild()
+                models += 1
+    return models
+
+
+def boot() -> BootReport:
+    """Готовит воркер к первому запросу и пишет отчёт в логгер app.boot"""
+    boot_report.phases["import"] = time.perf_counter() - STARTED_AT
+    with boot_report.phase("schema"):
+        if settings.production:
+            verify_schema(engine)
+        else:
+            init_db()
+    if settings.link_filter:
+        with boot_report.phase("link_filter"), Session(engine) as db:
+            unique_link_filter.rebuild(db)
+    if settings.boot_prewarm:
+        with boot_report.phase("db_pool"):
+            prewarm_pool(engine, settings.boot_prewarm_connections)
+        with boot_report.phase("password_hasher"):
+            password_hasher.warm_up()
+        with boot_report.phase("schemas"):
+            warm_schemas()
+    boot_report.total = time.perf_counter() - STARTED_AT
+    boot_logger.info(json.dumps(boot_report.as_dict()))
+    return boot_report
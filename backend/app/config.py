@@ -6,7 +6,63 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     app_name: str = "Wishlist App"
     debug: bool = True
+    # Боевой режим: без reload, несколько воркеров, схема только проверяется (миграции — отдельной командой)
+    production: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 4
+    # Прогрев при запуске воркера: соединения пула, бэкенд argon2, схемы pydantic
+    boot_prewarm: bool = True
+    boot_prewarm_connections: int = 4
     database_url: str = "sqlite:///./wishlist.db"
+    # Пул соединений (для SQLite :memory: не используется)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    # Профиль SQLite: PRAGMA, которые выполняются для каждого нового соединения
+    sqlite_profile: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size: int = -65536  # отрицательное значение — в КиБ (64 МиБ)
+    sqlite_mmap_size: int = 268435456
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout: int = 5000  # мс
+    sqlite_foreign_keys: bool = True
+    # Учёт SQL по запросам: порог медленного запроса и доля медленных SELECT с EXPLAIN
+    # (EXPLAIN — лишний запрос как раз тогда, когда БД и так медленная, поэтому доля мала)
+    slow_query_ms: float = 100.0
+    slow_query_explain_rate: float = 0.05
+    slow_query_log_size: int = 50
+    # Асинхронный режим: AsyncEngine/AsyncSession вместо пула потоков
+    async_db: bool = False
+    async_database_url: Optional[str] = None
+    # Кэш пользователей для аутентификации по токену
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 60.0
+    # Пул для argon2: "thread" (argon2-cffi отпускает GIL) или "process"
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    # Кэш ответов для публичных ссылок на вишлисты
+    public_cache_size: int = 2048
+    public_cache_ttl: float = 30.0
+    # Объединение одинаковых одновременных чтений (публичные ссылки, профили пользователей)
+    single_flight: bool = True
+    # Фильтр Блума действующих unique_link: неизвестные ссылки отклоняются без запроса к БД
+    link_filter: bool = True
+    link_filter_fp_rate: float = 0.01
+    link_filter_capacity: int = 100000  # минимальная ёмкость; при перестроении — вдвое больше числа ссылок
+    link_filter_max_bytes: int = 16 * 1024 * 1024
+    link_filter_sync_interval: float = 1.0  # как часто дочитывать ссылки из других процессов, с
+    link_filter_log_keep: int = 10000
+    # Максимум строк в одном пакетном импорте подарков и байт в одной строке импорта
+    gift_bulk_max_rows: int = 1000
+    gift_import_max_line_bytes: int = 64 * 1024
+    # Максимум подарков в одной пакетной брони (POST /reservations/batch)
+    reservation_batch_max_gifts: int = 100
+    # Выгрузка данных пользователя: строк на одну выборку курсора и байт в одном куске ответа
+    export_batch_size: int = 500
+    export_chunk_size: int = 65536
     
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = os.environ.get("ALGORITHM", "HS256")
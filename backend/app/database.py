@@ -1,16 +1,90 @@
-from sqlalchemy import create_engine
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.instrumentation import instrument_engine
+
+def sqlite_profile_pragmas() -> Dict[str, object]:
+	"""PRAGMA из настроек; busy_timeout первым, чтобы смена журнала могла дождаться блокировки"""
+	return {
+		"busy_timeout": settings.sqlite_busy_timeout,
+		"journal_mode": settings.sqlite_journal_mode,
+		"synchronous": settings.sqlite_synchronous,
+		"cache_size": settings.sqlite_cache_size,
+		"mmap_size": settings.sqlite_mmap_size,
+		"temp_store": settings.sqlite_temp_store,
+		"foreign_keys": "ON" if settings.sqlite_foreign_keys else "OFF",
+	}
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Optional[Dict[str, object]] = None) -> None:
+	"""Выполняет PRAGMA при каждом новом подключении к SQLite"""
+	if engine.dialect.name != "sqlite":
+		return
+	pragmas = sqlite_profile_pragmas() if pragmas is None else pragmas
+
+	@event.listens_for(engine, "connect")
+	def _set_sqlite_pragmas(dbapi_connection, connection_record):
+		cursor = dbapi_connection.cursor()
+		try:
+			for name, value in pragmas.items():
+				cursor.execute(f"PRAGMA {name}={value}")
+		finally:
+			cursor.close()
+
+
+def pool_options(url: str) -> Dict[str, object]:
+	"""Явные размеры пула; in-memory SQLite живёт в одном соединении и пул не настраивает"""
+	parsed = make_url(url)
+	if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+		return {}
+	return {
+		"pool_size": settings.db_pool_size,
+		"max_overflow": settings.db_max_overflow,
+		"pool_timeout": settings.db_pool_timeout,
+	}
+
 
 engine = create_engine(
 	settings.database_url,
 	connect_args={"check_same_thread": False},
+	**pool_options(settings.database_url),
 )
+if settings.sqlite_profile:
+	apply_sqlite_profile(engine)
+instrument_engine(engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine	)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
+_ASYNC_DRIVERS = {
+	"sqlite": "sqlite+aiosqlite",
+	"postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+	parsed = make_url(url)
+	backend = parsed.get_backend_name()
+	if parsed.drivername != backend or backend not in _ASYNC_DRIVERS:
+		return url
+	return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.async_db:
+	_async_url = settings.async_database_url or to_async_url(settings.database_url)
+	async_engine = create_async_engine(_async_url, **pool_options(_async_url))
+	if settings.sqlite_profile:
+		apply_sqlite_profile(async_engine.sync_engine)
+	instrument_engine(async_engine.sync_engine)
+	AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
 def get_db():
 	db = SessionLocal()
 	try:
@@ -18,6 +92,21 @@ def get_db():
 	finally:
 		db.close()
 
+async def get_async_db():
+	async with AsyncSessionLocal() as db:
+		yield db
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_indexes(target, connection, **kw):
+	from app.repositories.search_repository import create_search_indexes
+	create_search_indexes(connection)
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_link_log_triggers(target, connection, **kw):
+	from app.repositories.unique_link_repository import create_link_log_triggers
+	create_link_log_triggers(connection)
+
 def init_db():
-	Base.metadata.create_all(bind=engine)
+	from app.migrations import upgrade
+	upgrade(engine)
 	
\ No newline at end of file
@@ -1,10 +1,18 @@
-from typing import Generator
+import time
+from typing import Any, Callable, Generator, Optional, Type, Union
 
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.database import SessionLocal
+from app.config import settings
+from app.database import SessionLocal, get_async_db
+from app.instrumentation import record_lock_wait
+from app.metrics import THREADPOOL_QUEUE_WAIT
 from app.models.user import User
+from app.serialization import validate_list
+from app.services.single_flight import SingleFlight
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -15,6 +23,109 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# Сессия для обработчиков: AsyncSession в асинхронном режиме, иначе обычная Session
+get_session = get_async_db if settings.async_db else get_db
+
+
+def _with_connection(fn: Callable[[Session], Any], scheduled: Optional[float] = None) -> Callable[[Session], Any]:
+    """Сначала берёт соединение из пула, чтобы отдельно учесть время ожидания"""
+    def run(session: Session) -> Any:
+        started = time.perf_counter()
+        if scheduled is not None:
+            THREADPOOL_QUEUE_WAIT.observe(started - scheduled)
+        session.connection()
+        record_lock_wait(time.perf_counter() - started)
+        return fn(session)
+
+    return run
+
+
+async def run_in_session(db: Union[Session, AsyncSession], fn: Callable[[Session], Any]) -> Any:
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(_with_connection(fn))
+    return await run_in_threadpool(_with_connection(fn, scheduled=time.perf_counter()), db)
+
+
+async def run_in_own_session(db: Union[Session, AsyncSession], fn: Callable[[Session], Any]) -> Any:
+    """Как run_in_session, но в отдельной сессии на том же engine, которую вызов сам закрывает.
+
+    Для загрузок, общих для нескольких запросов (single-flight): сессию запроса-лидера
+    закрывает завершение его обработчика, даже если общая загрузка ещё идёт.
+    """
+    if isinstance(db, AsyncSession):
+        async with AsyncSession(bind=db.bind, expire_on_commit=False) as own:
+            return await run_in_session(own, fn)
+
+    def run_and_close(session: Session) -> Any:
+        try:
+            return fn(session)
+        finally:
+            session.close()
+
+    return await run_in_session(SessionLocal(bind=db.get_bind()), run_and_close)
+
+
+class ServiceRunner:
+    """Вызывает методы синхронного сервиса из async-обработчиков.
+
+    В асинхронном режиме вызов идёт через AsyncSession.run_sync, иначе в пуле
+    потоков. Если задана схема, результат сериализуется внутри того же вызова,
+    пока сессия доступна для ленивой загрузки связей. С single_flight
+    одинаковые одновременные вызовы выполняются один раз в собственной сессии
+    (только для чтений).
+    """
+
+    def __init__(
+        self,
+        db: Union[Session, AsyncSession],
+        service_class: Type,
+        schema: Optional[Type] = None,
+        single_flight: Optional[SingleFlight] = None,
+        own_session: bool = False,
+    ):
+        self.db = db
+        self.service_class = service_class
+        self.schema = schema
+        self.single_flight = single_flight
+        self.own_session = own_session
+
+    def in_own_session(self) -> "ServiceRunner":
+        """Тот же сервис, но каждый вызов идёт в собственной сессии (см. run_in_own_session)"""
+        return ServiceRunner(self.db, self.service_class, self.schema, self.single_flight, own_session=True)
+
+    def _dump(self, result: Any) -> Any:
+        if self.schema is None or result is None:
+            return result
+        if isinstance(result, list):
+            return validate_list(self.schema, result)
+        return self.schema.model_validate(result)
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            def invoke(session: Session) -> Any:
+                method = getattr(self.service_class(session), name)
+                return self._dump(method(*args, **kwargs))
+
+            if self.single_flight is None:
+                run = run_in_own_session if self.own_session else run_in_session
+                return await run(self.db, invoke)
+            key = (self.service_class, self.schema, name, args, tuple(sorted(kwargs.items())))
+            return await self.single_flight.do(key, lambda: run_in_own_session(self.db, invoke))
+
+        call.__name__ = name
+        return call
+
+
+def get_service(service_class: Type, schema: Optional[Type] = None, single_flight: Optional[SingleFlight] = None):
+    async def dependency(db: Union[Session, AsyncSession] = Depends(get_session)) -> ServiceRunner:
+        return ServiceRunner(db, service_class, schema, single_flight)
+
+    return dependency
+
+
 def get_current_user(db: Session = Depends(get_db)) -> User:
 
     from app.repositories.user_repository import UserRepository
@@ -0,0 +1,249 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.metrics import DB_POOL_CHECKOUT_WAIT, REQUEST_LATENCY, ROUTER_BUSY
+
+
+request_logger = logging.getLogger("app.requests")
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+@dataclass
+class RequestStats:
+    """SQL-статистика одного HTTP-запроса (время — в секундах)"""
+
+    queries: int = 0
+    db_time: float = 0.0
+    lock_wait: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record_query(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f"db-slowest;dur={self.slowest_time * 1000:.2f}",
+            f"db-wait;dur={self.lock_wait * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ])
+
+
+# Статистика текущего запроса; объект общий, поэтому запись из пула потоков видна middleware
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def record_lock_wait(elapsed: float) -> None:
+    """Время ожидания соединения из пула (учитывается в lock_wait текущего запроса)"""
+    DB_POOL_CHECKOUT_WAIT.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.lock_wait += elapsed
+
+
+def explain(conn, statement: str, parameters: Any) -> List[str]:
+    """План запроса через DBAPI-курсор в обход событий движка"""
+    sqlite = conn.dialect.name == "sqlite"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + statement, parameters)
+        return [str(row[-1]) if sqlite else " ".join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """Последние медленные запросы; для части SELECT сохраняется план (EXPLAIN)"""
+
+    def __init__(self, size: int):
+        self._entries: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, conn, statement: str, parameters: Any, elapsed: float, executemany: bool) -> None:
+        entry = {
+            "statement": statement,
+            "duration_ms": round(elapsed * 1000, 2),
+            "plan": None,
+        }
+        sampled = random.random() < settings.slow_query_explain_rate
+        if sampled and not executemany and statement.lstrip().upper().startswith("SELECT"):
+            entry["plan"] = explain(conn, statement, parameters)
+        with self._lock:
+            self._entries.append(entry)
+        slow_query_logger.warning(json.dumps(entry, ensure_ascii=False))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RouteMetrics:
+    """Агрегаты по шаблону маршрута: число запросов, SQL-запросов и время в БД"""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, stats: RequestStats, duration: float) -> None:
+        with self._lock:
+            item = self._routes.get(route)
+            if item is None:
+                item = self._routes[route] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "duration": 0.0,
+                    "db_time": 0.0,
+                    "lock_wait": 0.0,
+                    "slowest_time": 0.0,
+                    "slowest_statement": None,
+                }
+            item["requests"] += 1
+            item["queries"] += stats.queries
+            item["max_queries"] = max(item["max_queries"], stats.queries)
+            item["duration"] += duration
+            item["db_time"] += stats.db_time
+            item["lock_wait"] += stats.lock_wait
+            if stats.slowest_time > item["slowest_time"]:
+                item["slowest_time"] = stats.slowest_time
+                item["slowest_statement"] = stats.slowest_statement
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                route: {
+                    "requests": item["requests"],
+                    "queries": item["queries"],
+                    "avg_queries": round(item["queries"] / item["requests"], 2),
+                    "max_queries": item["max_queries"],
+                    "avg_duration_ms": round(item["duration"] * 1000 / item["requests"], 2),
+                    "db_time_ms": round(item["db_time"] * 1000, 2),
+                    "avg_db_time_ms": round(item["db_time"] * 1000 / item["requests"], 2),
+                    "lock_wait_ms": round(item["lock_wait"] * 1000, 2),
+                    "slowest_ms": round(item["slowest_time"] * 1000, 2),
+                    "slowest_statement": item["slowest_statement"],
+                }
+                for route, item in sorted(self._routes.items())
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = RouteMetrics()
+slow_queries = SlowQueryLog(settings.slow_query_log_size)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record_query(statement, elapsed)
+    if elapsed * 1000 >= settings.slow_query_ms:
+        slow_queries.record(conn, statement, parameters, elapsed, executemany)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает учёт SQL-запросов к движку (повторный вызов ничего не меняет)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope) -> str:
+    """Шаблон пути (/gifts/{gift_id}), чтобы метрики не дробились по ID"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return f"{scope['method']} {path}"
+
+
+def router_name(scope) -> str:
+    """Роутер, обработавший запрос (первый тег маршрута: Users, Gifts, ...)"""
+    tags = getattr(scope.get("route"), "tags", None)
+    return str(tags[0]) if tags else "other"
+
+
+class RequestMetricsMiddleware:
+    """ASGI-middleware: Server-Timing, структурный лог и агрегаты по маршрутам"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = route_template(scope)
+            route_metrics.record(route, stats, duration)
+            REQUEST_LATENCY.observe(
+                duration,
+                method=scope["method"],
+                route=getattr(scope.get("route"), "path", "unmatched"),
+                status=str(status_code),
+            )
+            ROUTER_BUSY.inc(duration, router=router_name(scope))
+            request_logger.info(json.dumps({
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "queries": stats.queries,
+                "db_time_ms": round(stats.db_time * 1000, 2),
+                "slowest_ms": round(stats.slowest_time * 1000, 2),
+                "lock_wait_ms": round(stats.lock_wait * 1000, 2),
+            }))
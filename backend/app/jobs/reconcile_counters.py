@@ -0,0 +1,27 @@
+"""Пересчёт денормализованных счётчиков вишлистов (gift_count, reserved_count, available_total_price).
+
+Счётчики обновляются инкрементально; задача нужна после ручных правок БД
+или импорта в обход репозиториев.
+
+    python -m app.jobs.reconcile_counters
+    python -m app.jobs.reconcile_counters --wishlist 12 --wishlist 15
+"""
+import argparse
+
+from app.database import SessionLocal
+from app.repositories.wishlist_repository import WishlistRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wishlist", type=int, action="append", help="ID вишлиста (по умолчанию все)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        fixed = WishlistRepository(db).reconcile_counters(args.wishlist)
+        db.commit()
+    print(f"Wishlists with corrected counters: {fixed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,30 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from .config import settings
-from .database import init_db
-from .routes import users_router, wishlists_router, gifts_router, reservation_router
+from .boot import boot
+from .instrumentation import RequestMetricsMiddleware
+from .repositories.pagination import NEXT_CURSOR_HEADER
+from .routes import users_router, wishlists_router, gifts_router, reservation_router, search_router, metrics_router
+from .services.password_hasher import password_hasher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	await run_in_threadpool(boot)
+	yield
+	password_hasher.shutdown()
+
 
 app = FastAPI(
 	title= settings.app_name,
-	debug= True,
+	debug= settings.debug and not settings.production,
+	lifespan=lifespan,
+	default_response_class=ORJSONResponse,
 	docs_url='/api/docs',
 	redoc_url='/api/redoc',
 )
@@ -16,18 +33,17 @@ app.add_middleware(
 		allow_origins= settings.cors_origins,
 		allow_credentials=True,
 		allow_methods=["*"],
-		allow_headers=["*"]
+		allow_headers=["*"],
+		expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(users_router)
 app.include_router(wishlists_router)
 app.include_router(gifts_router)
 app.include_router(reservation_router)
-
-@app.on_event('startup')
-def on_startup():
-    init_db()
-
+app.include_router(search_router)
+app.include_router(metrics_router)
 
 @app.get("/", tags=["Root"])
 def root():
@@ -0,0 +1,92 @@
+"""Версионные миграции схемы (в духе Alembic, без внешних зависимостей).
+
+Номер применённой миграции хранится в таблице schema_version. Новая база
+создаётся сразу по моделям и помечается последней версией; существующая
+догоняется миграциями из app.migrations.versions по порядку.
+
+    python -m app.migrations upgrade
+    python -m app.migrations current
+    python -m app.migrations check
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.gift import now_str
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String, nullable=False),
+    Column("applied_at", String, nullable=False),
+)
+
+
+def migration(version: int, description: str):
+    """Регистрирует функцию как миграцию с номером version"""
+    def register(fn: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Migration {version} is already registered")
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+
+def head() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def pending(conn: Connection) -> List[Migration]:
+    version = current_version(conn)
+    return [m for m in MIGRATIONS if m.version > version]
+
+
+def _record(conn: Connection, migrations: Sequence[Migration]) -> None:
+    if migrations:
+        conn.execute(schema_version.insert(), [
+            {"version": m.version, "description": m.description, "applied_at": now_str()}
+            for m in migrations
+        ])
+
+
+def upgrade(engine: Engine) -> List[Migration]:
+    """Приводит схему к последней версии; возвращает применённые миграции"""
+    from app.database import Base
+
+    with engine.begin() as conn:
+        fresh = not inspect(conn).has_table("users")
+        _version_metadata.create_all(conn)
+        # Недостающие таблицы создаются сразу по моделям; существующие меняют только миграции
+        Base.metadata.create_all(conn)
+        if fresh:
+            _record(conn, MIGRATIONS)
+            return []
+        applied = pending(conn)
+        for m in applied:
+            m.upgrade(conn)
+        _record(conn, applied)
+    return applied
+
+
+from app.migrations import versions  # noqa: E402,F401  регистрация миграций
@@ -0,0 +1,33 @@
+import argparse
+import sys
+
+from app.database import engine
+from app.migrations import current_version, head, upgrade
+from app.migrations.check import check_schema
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Миграции схемы БД")
+    parser.add_argument("command", choices=["upgrade", "current", "check"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = upgrade(engine)
+        for m in applied:
+            print(f"Applied {m.version:04d}: {m.description}")
+        print(f"Schema version: {head()}")
+    elif args.command == "current":
+        with engine.connect() as conn:
+            print(f"Schema version: {current_version(conn)} (head: {head()})")
+    else:
+        with engine.connect() as conn:
+            problems = check_schema(conn)
+        for problem in problems:
+            print(problem)
+        if problems:
+            sys.exit(1)
+        print("All filter columns are indexed")
+
+
+if __name__ == "__main__":
+    main()
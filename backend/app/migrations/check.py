@@ -0,0 +1,80 @@
+"""Проверка индексов: каждый фильтр из репозиториев должен опираться на индекс.
+
+Статическая часть сверяет живую базу со списком шаблонов доступа (столбцы из
+WHERE, сравниваемые на равенство) и внешними ключами моделей. Динамическая —
+разбирает EXPLAIN QUERY PLAN конкретного запроса и ищет полные просмотры таблиц.
+"""
+from typing import Any, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.engine import Connection
+
+from app.instrumentation import explain
+
+AccessPattern = Tuple[str, Tuple[str, ...]]
+
+# Фильтры репозиториев, которые не выводятся из внешних ключей
+ACCESS_PATTERNS: Tuple[AccessPattern, ...] = (
+    ("users", ("login",)),
+    ("users", ("email",)),
+    ("wishlists", ("unique_link",)),
+    ("gifts", ("wishlist_id", "status")),
+    ("reservations", ("user_id", "cancelled_at")),
+    ("reservations", ("gift_id", "cancelled_at")),
+)
+
+
+def foreign_key_patterns(metadata: MetaData) -> List[AccessPattern]:
+    return [
+        (table.name, (column.name,))
+        for table in metadata.sorted_tables
+        for column in table.columns
+        if column.foreign_keys
+    ]
+
+
+def _index_prefixes(conn: Connection, table: str) -> List[Tuple[str, ...]]:
+    """Столбцы всех полных (не частичных) индексов таблицы, включая PK и UNIQUE"""
+    inspector = inspect(conn)
+    prefixes = [tuple(inspector.get_pk_constraint(table)["constrained_columns"])]
+    prefixes.extend(tuple(c["column_names"]) for c in inspector.get_unique_constraints(table))
+    for index in inspector.get_indexes(table):
+        partial = any(key.endswith("_where") for key in index.get("dialect_options", {}))
+        if not partial:
+            prefixes.append(tuple(index["column_names"]))
+    return prefixes
+
+
+def _covers(prefix: Sequence[str], columns: Set[str]) -> bool:
+    return len(prefix) >= len(columns) and set(prefix[:len(columns)]) == columns
+
+
+def unindexed_filters(conn: Connection, patterns: Iterable[AccessPattern]) -> List[AccessPattern]:
+    """Шаблоны доступа, для которых нет индекса с этими столбцами в начале"""
+    missing = []
+    cache = {}
+    for table, columns in dict.fromkeys(patterns):
+        if table not in cache:
+            cache[table] = _index_prefixes(conn, table)
+        if not any(_covers(prefix, set(columns)) for prefix in cache[table]):
+            missing.append((table, columns))
+    return missing
+
+
+def check_schema(conn: Connection) -> List[str]:
+    from app.database import Base
+
+    patterns = [*foreign_key_patterns(Base.metadata), *ACCESS_PATTERNS]
+    return [
+        f"{table}({', '.join(columns)}) is filtered on but not indexed"
+        for table, columns in unindexed_filters(conn, patterns)
+    ]
+
+
+def full_scans(conn: Connection, statement: str, parameters: Any, tables: Iterable[str]) -> List[str]:
+    """Строки плана SQLite с полным просмотром одной из таблиц (SCAN без поиска по индексу)"""
+    names = set(tables)
+    return [
+        line for line in explain(conn, statement, parameters)
+        if line.startswith("SCAN ") and line.split()[1] in names
+    ]
@@ -0,0 +1,131 @@
+"""Миграции схемы по порядку. Каждая миграция идемпотентна: база, созданная
+старым create_all или shema.sql, могла уже содержать часть изменений.
+
+Новые миграции добавляются в конец со следующим номером; уже выпущенные не меняются.
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from app.migrations import migration
+from app.models.reservation import now_str
+
+
+def add_column(conn: Connection, table: str, name: str, ddl: str) -> None:
+    if name not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def create_index(
+    conn: Connection,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+) -> None:
+    statement = (
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+        f"ON {table} ({', '.join(columns)})"
+    )
+    if where:
+        statement += f" WHERE {where}"
+    conn.exec_driver_sql(statement)
+
+
+def drop_index(conn: Connection, name: str) -> None:
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+def recount_wishlists(conn: Connection) -> None:
+    """Пересчитывает счётчики всех вишлистов по таблице gifts"""
+    conn.exec_driver_sql("""
+        UPDATE wishlists SET
+            gift_count = (SELECT COUNT(*) FROM gifts WHERE gifts.wishlist_id = wishlists.wishlist_id),
+            reserved_count = (
+                SELECT COUNT(*) FROM gifts
+                WHERE gifts.wishlist_id = wishlists.wishlist_id AND gifts.status = 'reserved'
+            ),
+            available_total_price = (
+                SELECT COALESCE(SUM(price), 0) FROM gifts
+                WHERE gifts.wishlist_id = wishlists.wishlist_id AND COALESCE(gifts.status, '') <> 'reserved'
+            )
+    """)
+
+
+@migration(1, "wishlist counters")
+def wishlist_counters(conn: Connection) -> None:
+    add_column(conn, "wishlists", "gift_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "wishlists", "reserved_count", "INTEGER NOT NULL DEFAULT 0")
+    add_column(conn, "wishlists", "available_total_price", "REAL NOT NULL DEFAULT 0")
+    add_column(conn, "wishlists", "version", "INTEGER NOT NULL DEFAULT 1")
+    recount_wishlists(conn)
+
+
+@migration(2, "indexes for list and reservation queries")
+def access_pattern_indexes(conn: Connection) -> None:
+    # Старые базы могли получить две активные брони одного подарка: остаётся самая ранняя,
+    # иначе уникальный индекс ниже не создастся
+    conn.execute(text("""
+        UPDATE reservations SET cancelled_at = :cancelled_at
+        WHERE cancelled_at IS NULL AND EXISTS (
+            SELECT 1 FROM reservations AS earlier
+            WHERE earlier.gift_id = reservations.gift_id
+              AND earlier.cancelled_at IS NULL
+              AND (earlier.reserved_date < reservations.reserved_date
+                   OR (earlier.reserved_date = reservations.reserved_date
+                       AND earlier.reservation_id < reservations.reservation_id))
+        )
+    """), {"cancelled_at": now_str()})
+    conn.exec_driver_sql("""
+        UPDATE gifts SET status = 'reserved'
+        WHERE COALESCE(status, '') <> 'reserved' AND EXISTS (
+            SELECT 1 FROM reservations
+            WHERE reservations.gift_id = gifts.gift_id AND reservations.cancelled_at IS NULL
+        )
+    """)
+    recount_wishlists(conn)
+    create_index(conn, "ix_wishlists_user_id_wishlist_id", "wishlists", ["user_id", "wishlist_id"])
+    create_index(conn, "ix_gifts_wishlist_id_status", "gifts", ["wishlist_id", "status"])
+    create_index(conn, "ix_reservations_user_id_cancelled_at", "reservations", ["user_id", "cancelled_at"])
+    create_index(conn, "ix_reservations_gift_id_cancelled_at", "reservations", ["gift_id", "cancelled_at"])
+    create_index(
+        conn, "uq_reservations_active_gift", "reservations", ["gift_id"],
+        unique=True, where="cancelled_at IS NULL",
+    )
+    # Одиночные индексы, которые покрываются составными выше (имена из shema.sql и старых моделей)
+    for name in (
+        "idx_wishlists_user_id",
+        "idx_gifts_wishlist_id",
+        "ix_gifts_wishlist_id",
+        "idx_gifts_status",
+        "idx_reservations_user_id",
+        "idx_reservations_gift_id",
+        "idx_reservations_cancelled_at",
+        "ix_reservations_user_id",
+        "ix_reservations_gift_id",
+    ):
+        drop_index(conn, name)
+
+
+@migration(3, "unique link log for the link filter")
+def unique_link_log(conn: Connection) -> None:
+    # Таблицу создаёт create_all по моделям перед миграциями, здесь — только триггеры
+    from app.repositories.unique_link_repository import create_link_log_triggers
+
+    create_link_log_triggers(conn)
+
+
+@migration(4, "drop legacy reservation triggers")
+def drop_reservation_triggers(conn: Connection) -> None:
+    # Статус подарка переключает ReservationRepository; старый BEFORE INSERT видел подарок
+    # уже в 'reserved' после условного UPDATE и отклонял каждую бронь
+    for name in ("trigger_reserve_gift", "trigger_cancel_reservation", "trigger_reactivate_reservation"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+@migration(5, "drop single-column gifts.wishlist_id index")
+def drop_gifts_wishlist_id_index(conn: Connection) -> None:
+    # Базы, уже прошедшие миграцию 2, получили этот индекс; его покрывает ix_gifts_wishlist_id_status
+    drop_index(conn, "ix_gifts_wishlist_id")
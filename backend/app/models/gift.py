@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import query_expression, relationship
 from app.database import Base
 from app.models.wishlist import Wishlist
 from datetime import datetime
@@ -9,6 +9,10 @@ def now_str() -> str:
 
 class Gift(Base):
     __tablename__ = "gifts"
+    __table_args__ = (
+        # Подарки вишлиста, в том числе с фильтром по статусу: WHERE wishlist_id = ? [AND status = ?]
+        Index("ix_gifts_wishlist_id_status", "wishlist_id", "status"),
+    )
 
     gift_id = Column(Integer, primary_key=True, index=True)
     wishlist_id = Column(Integer, ForeignKey("wishlists.wishlist_id"), nullable=False)
@@ -18,6 +22,8 @@ class Gift(Base):
     store_link = Column(String)
     status = Column(String, default="available", server_default="available")
     created_at = Column(String, nullable=False, default=now_str)
+    # Заполняется только по запросу через with_expression (см. active_reservations_count)
+    active_reservations = query_expression()
 
   
     wishlist = relationship("Wishlist", back_populates="gifts")
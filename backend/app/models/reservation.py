@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint,String, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint,String, func, text
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -11,11 +11,22 @@ class Reservation(Base):
     __tablename__ = "reservations"
     __table_args__ = (
         UniqueConstraint("user_id", "gift_id", name="uq_reservations_user_gift"),
+        # Брони пользователя / подарка, в том числе только активные (cancelled_at IS NULL)
+        Index("ix_reservations_user_id_cancelled_at", "user_id", "cancelled_at"),
+        Index("ix_reservations_gift_id_cancelled_at", "gift_id", "cancelled_at"),
+        # Частичный индекс: не больше одной активной брони на подарок
+        Index(
+            "uq_reservations_active_gift",
+            "gift_id",
+            unique=True,
+            sqlite_where=text("cancelled_at IS NULL"),
+            postgresql_where=text("cancelled_at IS NULL"),
+        ),
     )
 
     reservation_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
-    gift_id = Column(Integer, ForeignKey("gifts.gift_id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    gift_id = Column(Integer, ForeignKey("gifts.gift_id"), nullable=False)
     reserved_date = Column(String, nullable=False, default=now_str)
     cancelled_at = Column(String, nullable=True)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -9,6 +9,10 @@ def now_str() -> str:
 
 class Wishlist(Base):
     __tablename__ = "wishlists"
+    __table_args__ = (
+        # Список вишлистов владельца: WHERE user_id = ? ORDER BY wishlist_id
+        Index("ix_wishlists_user_id_wishlist_id", "user_id", "wishlist_id"),
+    )
 
     wishlist_id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
@@ -17,6 +21,24 @@ class Wishlist(Base):
     is_private = Column(Integer, default=0)
     unique_link = Column(String, unique=True, index=True)
     created_at = Column(String, nullable=False, default=now_str)
+    # Денормализованные счётчики, обновляются репозиториями подарков и броней
+    gift_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reserved_count = Column(Integer, nullable=False, default=0, server_default="0")
+    available_total_price = Column(Float, nullable=False, default=0.0, server_default="0")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     user = relationship("User", back_populates="wishlists")
-    gifts = relationship("Gift", back_populates="wishlist", cascade="all, delete-orphan")
\ No newline at end of file
+    gifts = relationship("Gift", back_populates="wishlist", cascade="all, delete-orphan")
+
+
+class UniqueLinkLog(Base):
+    """Журнал появившихся unique_link (заполняется триггерами SQLite).
+
+    Воркеры дочитывают его по seq, чтобы фильтр ссылок узнавал о ссылках,
+    созданных в других процессах.
+    """
+    __tablename__ = "unique_link_log"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    unique_link = Column(String, nullable=False)
@@ -0,0 +1,27 @@
+from typing import Any, Callable, Optional, Type
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncRepository:
+    """Асинхронная версия репозитория: каждый метод синхронного репозитория
+    выполняется через AsyncSession.run_sync, поэтому запросы идут через
+    асинхронный драйвер (aiosqlite / asyncpg) без занятия потока."""
+
+    repository_class: Optional[Type] = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.repository_class, name)
+
+        async def call(*args, **kwargs):
+            return await self.db.run_sync(
+                lambda session: method(self.repository_class(session), *args, **kwargs)
+            )
+
+        call.__name__ = name
+        return call
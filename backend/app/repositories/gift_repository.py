@@ -1,22 +1,119 @@
-from typing import List, Optional
+from collections import defaultdict
+from typing import List, Optional, Tuple
 
-from sqlalchemy import Select, and_, select
+from sqlalchemy import Select, and_, func, insert, select, update
 from sqlalchemy.orm import Session
 
-from app.models.gift import Gift
+from app.models.gift import Gift, now_str
+from app.models.reservation import Reservation
+from app.models.wishlist import Wishlist
+from app.repositories.pagination import paginate
+from app.repositories.rows import GIFT_ROW_COLUMNS, GiftRow, fetch_rows
+from app.repositories.search_repository import search_condition
 from app.schemas.gift import GiftCreate, GiftUpdate
 
 
+def active_reservations_count():
+    return (
+        select(func.count(Reservation.reservation_id))
+        .where(Reservation.gift_id == Gift.gift_id, Reservation.cancelled_at.is_(None))
+        .correlate(Gift)
+        .scalar_subquery()
+    )
+
+
+def adjust_wishlist_counters(
+    db: Session,
+    wishlist_id: int,
+    gifts: int = 0,
+    reserved: int = 0,
+    available_price: float = 0.0,
+) -> None:
+    """Инкрементально меняет счётчики вишлиста в текущей транзакции и повышает version"""
+    db.execute(
+        update(Wishlist)
+        .where(Wishlist.wishlist_id == wishlist_id)
+        .values(
+            gift_count=Wishlist.gift_count + gifts,
+            reserved_count=Wishlist.reserved_count + reserved,
+            available_total_price=Wishlist.available_total_price + available_price,
+            version=Wishlist.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def owned_by(owner_id: int):
+    """Признак владения, вычисляемый в том же запросе: вишлист строки принадлежит owner_id"""
+    return (Wishlist.user_id == owner_id).label("is_owner")
+
+
+GiftState = Tuple[int, Optional[str], Optional[float]]
+
+
+def _gift_state(gift: Gift) -> GiftState:
+    return gift.wishlist_id, gift.status, gift.price
+
+
+def _contribution(status: Optional[str], price: Optional[float]) -> Tuple[int, float]:
+    """Вклад подарка в reserved_count и available_total_price"""
+    if status == "reserved":
+        return 1, 0.0
+    return 0, price or 0.0
+
+
+def _apply_gift_change(db: Session, old: Optional[GiftState], new: Optional[GiftState]) -> None:
+    if old == new:
+        return
+    if old is not None:
+        reserved, price = _contribution(old[1], old[2])
+        if new is not None and new[0] == old[0]:
+            new_reserved, new_price = _contribution(new[1], new[2])
+            adjust_wishlist_counters(db, old[0], 0, new_reserved - reserved, new_price - price)
+            return
+        adjust_wishlist_counters(db, old[0], -1, -reserved, -price)
+    if new is not None:
+        reserved, price = _contribution(new[1], new[2])
+        adjust_wishlist_counters(db, new[0], 1, reserved, price)
+
+
 class GiftRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def _base_query(self) -> Select:
-        return select(Gift)
+        return select(*GIFT_ROW_COLUMNS)
 
     def get_by_id(self, gift_id: int) -> Optional[Gift]:
         return self.db.get(Gift, gift_id)
 
+    def get_with_ownership(self, gift_id: int, owner_id: int) -> Optional[Tuple[Gift, bool]]:
+        """Подарок и признак владения одной строкой (JOIN wishlists); None — подарка нет"""
+        stmt = (
+            select(Gift, owned_by(owner_id))
+            .join(Wishlist, Wishlist.wishlist_id == Gift.wishlist_id)
+            .where(Gift.gift_id == gift_id)
+        )
+        row = self.db.execute(stmt).first()
+        return None if row is None else (row[0], bool(row[1]))
+
+    def get_ownership(self, gift_id: int, owner_id: int) -> Optional[bool]:
+        """Только признак владения подарком, без загрузки строки; None — подарка нет"""
+        stmt = (
+            select(owned_by(owner_id))
+            .join_from(Gift, Wishlist, Wishlist.wishlist_id == Gift.wishlist_id)
+            .where(Gift.gift_id == gift_id)
+        )
+        owned = self.db.execute(stmt).scalar()
+        return None if owned is None else bool(owned)
+
+    def has_active_reservation(self, gift_id: int) -> bool:
+        stmt = select(Reservation.reservation_id).where(
+            Reservation.gift_id == gift_id,
+            Reservation.cancelled_at.is_(None),
+        ).exists()
+        return bool(self.db.execute(select(stmt)).scalar())
+
     def list_by_wishlist(
         self,
         wishlist_id: int,
@@ -24,18 +121,20 @@ class GiftRepository:
         limit: int = 50,
         status: Optional[str] = None,
         search: Optional[str] = None,
-    ) -> List[Gift]:
+        cursor: Optional[str] = None,
+    ) -> List[GiftRow]:
         stmt = self._base_query().where(Gift.wishlist_id == wishlist_id)
         conditions = []
         if status is not None:
             conditions.append(Gift.status == status)
         if search:
-            like = f"%{search}%"
-            conditions.append(Gift.name.ilike(like))
+            conditions.append(
+                search_condition(self.db, "gifts_fts", Gift.gift_id, search, Gift.name, Gift.description)
+            )
         if conditions:
             stmt = stmt.where(and_(*conditions))
-        stmt = stmt.offset(offset).limit(limit)
-        return list(self.db.execute(stmt).scalars().all())
+        stmt = paginate(stmt, Gift.gift_id, offset, limit, cursor)
+        return fetch_rows(self.db, stmt, GiftRow)
 
     def create(self, data: GiftCreate) -> Gift:
         gift = Gift(
@@ -47,11 +146,46 @@ class GiftRepository:
             status=data.status or "available",
         )
         self.db.add(gift)
-        self.db.commit()
-        self.db.refresh(gift)
+        _apply_gift_change(self.db, None, (gift.wishlist_id, gift.status, gift.price))
+        self.db.flush()
         return gift
 
+    def create_many(self, items: List[GiftCreate]) -> List[int]:
+        """Пакетная вставка (executemany); ID в порядке items"""
+        if not items:
+            return []
+        rows = [
+            {
+                "wishlist_id": data.wishlist_id,
+                "name": data.name,
+                "description": data.description,
+                "price": data.price,
+                "store_link": str(data.store_link) if data.store_link is not None else None,
+                "status": data.status or "available",
+                "created_at": now_str(),
+            }
+            for data in items
+        ]
+        # SQLite выдаёт rowid по порядку строк VALUES, так что порядок восстанавливается
+        # сортировкой; sort_by_parameter_order здесь откатился бы на вставку по одной строке
+        ordered = self.db.get_bind().dialect.name != "sqlite"
+        stmt = insert(Gift).returning(Gift.gift_id, sort_by_parameter_order=ordered)
+        gift_ids = list(self.db.scalars(stmt, rows).all())
+        if not ordered:
+            gift_ids.sort()
+        totals = defaultdict(lambda: [0, 0, 0.0])
+        for row in rows:
+            reserved, price = _contribution(row["status"], row["price"])
+            total = totals[row["wishlist_id"]]
+            total[0] += 1
+            total[1] += reserved
+            total[2] += price
+        for wishlist_id, (gifts, reserved, price) in totals.items():
+            adjust_wishlist_counters(self.db, wishlist_id, gifts, reserved, price)
+        return gift_ids
+
     def update(self, gift: Gift, data: GiftUpdate) -> Gift:
+        old_state = _gift_state(gift)
         if data.name is not None:
             gift.name = data.name
         if data.description is not None:
@@ -64,16 +198,23 @@ class GiftRepository:
             gift.status = data.status
         if data.wishlist_id is not None:
             gift.wishlist_id = data.wishlist_id
-        self.db.commit()
-        self.db.refresh(gift)
+        new_state = _gift_state(gift)
+        if new_state == old_state:
+            # Счётчики те же, но ответ вишлиста изменился: повышается только version (ETag)
+            adjust_wishlist_counters(self.db, gift.wishlist_id)
+        else:
+            _apply_gift_change(self.db, old_state, new_state)
+        self.db.flush()
         return gift
 
     def delete(self, gift: Gift) -> None:
+        _apply_gift_change(self.db, _gift_state(gift), None)
         self.db.delete(gift)
-        self.db.commit()
+        self.db.flush()
 
     def change_status(self, gift: Gift, new_status: str) -> Gift:
+        old_state = _gift_state(gift)
         gift.status = new_status
-        self.db.commit()
-        self.db.refresh(gift)
+        _apply_gift_change(self.db, old_state, _gift_state(gift))
+        self.db.flush()
         return gift
@@ -0,0 +1,48 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Select
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def paginate(stmt: Select, key_column, offset: int, limit: int, cursor: Optional[str]) -> Select:
+    """Стабильный порядок по ключу; с курсором — keyset (WHERE key > last), иначе OFFSET"""
+    stmt = stmt.order_by(key_column)
+    if cursor is not None:
+        stmt = stmt.where(key_column > decode_cursor(cursor))
+    elif offset:
+        stmt = stmt.offset(offset)
+    return stmt.limit(limit)
+
+
+def next_cursor(items: Sequence[Any], limit: int, key: str) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница неполная"""
+    if limit <= 0 or len(items) < limit:
+        return None
+    return encode_cursor(getattr(items[-1], key))
+
+
+def set_next_cursor(response, items: Sequence[Any], limit: int, key: str) -> None:
+    cursor = next_cursor(items, limit, key)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -1,12 +1,24 @@
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
-from app.models.reservation import Reservation
+from app.models.gift import Gift
+from app.models.reservation import Reservation, now_str
+from app.models.wishlist import Wishlist
+from app.repositories.gift_repository import adjust_wishlist_counters
+from app.repositories.pagination import paginate
+from app.repositories.rows import RESERVATION_ROW_COLUMNS, ReservationRow, fetch_rows
 from app.schemas.reservation import ReservationCreate, ReservationUpdate
 
 
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
 class ReservationRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -14,6 +26,16 @@ class ReservationRepository:
     def get_by_id(self, reservation_id: int) -> Optional[Reservation]:
         return self.db.query(Reservation).filter(Reservation.reservation_id == reservation_id).first()
 
+    def get_with_wishlist_id(self, reservation_id: int) -> Optional[Tuple[Reservation, int]]:
+        """Бронь и wishlist_id её подарка одной строкой (JOIN gifts), без ленивой загрузки Gift"""
+        stmt = (
+            select(Reservation, Gift.wishlist_id)
+            .join(Gift, Gift.gift_id == Reservation.gift_id)
+            .where(Reservation.reservation_id == reservation_id)
+        )
+        row = self.db.execute(stmt).first()
+        return None if row is None else (row[0], row[1])
+
     def get_by_user_and_gift(self, user_id: int, gift_id: int) -> Optional[Reservation]:
         """Получить резервацию (любую: активную или отменённую)"""
         return self.db.query(Reservation).filter(
@@ -27,11 +49,13 @@ class ReservationRepository:
         offset: int = 0,
         limit: int = 50,
         only_active: bool = False,
-    ) -> List[Reservation]:
-        query = self.db.query(Reservation).filter(Reservation.user_id == user_id)
+        cursor: Optional[str] = None,
+    ) -> List[ReservationRow]:
+        stmt = select(*RESERVATION_ROW_COLUMNS).where(Reservation.user_id == user_id)
         if only_active:
-            query = query.filter(Reservation.cancelled_at.is_(None))  # Только активные
-        return query.offset(offset).limit(limit).all()
+            stmt = stmt.where(Reservation.cancelled_at.is_(None))  # Только активные
+        stmt = paginate(stmt, Reservation.reservation_id, offset, limit, cursor)
+        return fetch_rows(self.db, stmt, ReservationRow)
 
     def list_by_gift(
         self,
@@ -39,11 +63,12 @@ class ReservationRepository:
         offset: int = 0,
         limit: int = 50,
         only_active: bool = False,
+        cursor: Optional[str] = None,
     ) -> List[Reservation]:
         query = self.db.query(Reservation).filter(Reservation.gift_id == gift_id)
         if only_active:
             query = query.filter(Reservation.cancelled_at.is_(None))  # Только активные
-        return query.offset(offset).limit(limit).all()
+        return paginate(query, Reservation.reservation_id, offset, limit, cursor).all()
 
     def create(self, data: ReservationCreate) -> Reservation:
         """Создать новую активную резервацию (cancelled_at = NULL)"""
@@ -53,16 +78,15 @@ class ReservationRepository:
             # cancelled_at по умолчанию NULL (активная)
         )
         self.db.add(reservation)
-        self.db.commit()
-        self.db.refresh(reservation)
+        self.db.flush()
         return reservation
 
     def cancel(self, reservation: Reservation, cancelled_at: datetime) -> Reservation:
         """Soft delete: пометить резервацию как отменённую"""
         reservation.cancelled_at = cancelled_at
         self.db.add(reservation)
-        self.db.commit()
-        self.db.refresh(reservation)
+        self._release_gift(reservation.gift_id)
+        self.db.flush()
         return reservation
 
     def reactivate(self, reservation: Reservation) -> Reservation:
@@ -70,11 +94,147 @@ class ReservationRepository:
         reservation.cancelled_at = None
         reservation.reserved_date = datetime.utcnow()  # Обновляем дату
         self.db.add(reservation)
-        self.db.commit()
-        self.db.refresh(reservation)
+        self.db.flush()
         return reservation
 
     def delete(self, reservation: Reservation) -> None:
         """Hard delete: физически удалить запись (админ-операция)"""
+        if reservation.cancelled_at is None:
+            self._release_gift(reservation.gift_id)
         self.db.delete(reservation)
-        self.db.commit()
+        self.db.flush()
+
+    def reserve(self, user_id: int, gift_id: int) -> Optional[Tuple[Reservation, int]]:
+        """Атомарно бронирует подарок: UPDATE gifts ... WHERE status = 'available' + upsert брони.
+
+        Условия доступа (не свой, не чужой приватный вишлист) проверяются в том же UPDATE,
+        поэтому из двух конкурентных запросов успешен ровно один. Счётчики вишлиста
+        меняются в той же транзакции. Возвращает (бронь, wishlist_id)
+        или None, если подарок забронировать нельзя — причину выясняет get_reservation_state
+        (транзакцию откатывает вызывающий сервис).
+        """
+        reserved = self.reserve_many(user_id, [gift_id])
+        return reserved.get(gift_id)
+
+    def reserve_many(self, user_id: int, gift_ids: Sequence[int]) -> Dict[int, Tuple[Reservation, int]]:
+        """Пакетная версия reserve: один условный UPDATE на все подарки, счётчики — по одному
+        UPDATE на вишлист, брони — одним upsert. Возвращает {gift_id: (бронь, wishlist_id)}
+        только для захваченных подарков; остальные заняты или недоступны пользователю.
+        """
+        if not gift_ids:
+            return {}
+        owner_can_reserve = select(Wishlist.wishlist_id).where(
+            Wishlist.wishlist_id == Gift.wishlist_id,
+            Wishlist.user_id != user_id,
+            Wishlist.is_private == 0,
+        ).exists()
+        claimed = self.db.execute(
+            update(Gift)
+            .where(Gift.gift_id.in_(gift_ids), Gift.status == "available", owner_can_reserve)
+            .values(status="reserved")
+            .returning(Gift.gift_id, Gift.wishlist_id, Gift.price)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not claimed:
+            return {}
+        totals: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+        for _, wishlist_id, price in claimed:
+            totals[wishlist_id][0] += 1
+            totals[wishlist_id][1] -= price or 0.0
+        for wishlist_id, (reserved, price) in totals.items():
+            adjust_wishlist_counters(self.db, wishlist_id, reserved=reserved, available_price=price)
+        wishlists = {gift_id: wishlist_id for gift_id, wishlist_id, _ in claimed}
+        return {
+            reservation.gift_id: (reservation, wishlists[reservation.gift_id])
+            for reservation in self._upsert_active(user_id, list(wishlists))
+        }
+
+    def _upsert_active(self, user_id: int, gift_ids: List[int]) -> List[Reservation]:
+        """Создаёт брони или реактивирует отменённые одной командой (ON CONFLICT DO UPDATE)"""
+        reserved_date = now_str()
+        dialect_insert = _UPSERT_DIALECTS.get(self.db.get_bind().dialect.name)
+        if dialect_insert is None:
+            for gift_id in gift_ids:
+                reactivated = self.db.execute(
+                    update(Reservation)
+                    .where(Reservation.user_id == user_id, Reservation.gift_id == gift_id)
+                    .values(cancelled_at=None, reserved_date=reserved_date)
+                    .execution_options(synchronize_session=False)
+                )
+                if not reactivated.rowcount:
+                    self.db.execute(
+                        insert(Reservation).values(user_id=user_id, gift_id=gift_id, reserved_date=reserved_date)
+                    )
+            return [self.get_by_user_and_gift(user_id, gift_id) for gift_id in gift_ids]
+
+        rows = [
+            {"user_id": user_id, "gift_id": gift_id, "reserved_date": reserved_date, "cancelled_at": None}
+            for gift_id in gift_ids
+        ]
+        stmt = dialect_insert(Reservation)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Reservation.user_id, Reservation.gift_id],
+            set_={"cancelled_at": None, "reserved_date": stmt.excluded.reserved_date},
+        ).returning(Reservation)
+        return list(self.db.scalars(stmt, rows, execution_options={"populate_existing": True}).all())
+
+    def release_user_gifts(self, user_id: int) -> List[int]:
+        """Освобождает подарки всех активных броней пользователя одним UPDATE и правит счётчики.
+
+        Нужно перед удалением пользователя: каскад удаляет его брони без _release_gift.
+        Возвращает wishlist_id затронутых вишлистов.
+        """
+        active = select(Reservation.gift_id).where(
+            Reservation.user_id == user_id,
+            Reservation.cancelled_at.is_(None),
+        )
+        return self._release_gifts(Gift.gift_id.in_(active))
+
+    def _release_gift(self, gift_id: int) -> None:
+        self._release_gifts(Gift.gift_id == gift_id)
+
+    def _release_gifts(self, condition) -> List[int]:
+        released = self.db.execute(
+            update(Gift)
+            .where(condition, Gift.status == "reserved")
+            .values(status="available")
+            .returning(Gift.wishlist_id, Gift.price)
+            .execution_options(synchronize_session="fetch")
+        ).all()
+        totals: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+        for wishlist_id, price in released:
+            totals[wishlist_id][0] -= 1
+            totals[wishlist_id][1] += price or 0.0
+        for wishlist_id, (reserved, price) in totals.items():
+            adjust_wishlist_counters(self.db, wishlist_id, reserved=reserved, available_price=price)
+        return list(totals)
+
+    def get_reservation_state(self, user_id: int, gift_id: int) -> Optional[Row]:
+        """Одним запросом: статус подарка, владелец и приватность вишлиста, активная бронь пользователя"""
+        return self.get_reservation_states(user_id, [gift_id]).get(gift_id)
+
+    def get_reservation_states(self, user_id: int, gift_ids: Sequence[int]) -> Dict[int, Row]:
+        """То же для нескольких подарков одним запросом: {gift_id: строка состояния}"""
+        if not gift_ids:
+            return {}
+        stmt = (
+            select(
+                Gift.gift_id,
+                Gift.status,
+                Gift.wishlist_id,
+                Wishlist.user_id.label("owner_id"),
+                Wishlist.is_private,
+                Reservation.reservation_id.label("own_reservation_id"),
+            )
+            .join(Wishlist, Wishlist.wishlist_id == Gift.wishlist_id)
+            .outerjoin(
+                Reservation,
+                and_(
+                    Reservation.gift_id == Gift.gift_id,
+                    Reservation.user_id == user_id,
+                    Reservation.cancelled_at.is_(None),
+                ),
+            )
+            .where(Gift.gift_id.in_(gift_ids))
+        )
+        return {row.gift_id: row for row in self.db.execute(stmt)}
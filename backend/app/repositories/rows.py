@@ -0,0 +1,96 @@
+"""Проекции для списков: dataclass-строки со __slots__ и столбцы, которые они читают.
+
+Поля строки совпадают с полями короткой схемы ответа (GiftShort, WishlistShort, ...),
+поэтому SELECT берёт только нужные столбцы, а pydantic валидирует строку через
+from_attributes так же, как ORM-объект.
+"""
+from dataclasses import dataclass, fields
+from typing import Any, List, Optional, Tuple, Type, TypeVar
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.models.gift import Gift
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.models.wishlist import Wishlist
+
+
+RowT = TypeVar("RowT")
+
+
+def row_columns(model: Type, row_type: Type) -> Tuple[Any, ...]:
+    """Столбцы модели в порядке полей dataclass-строки"""
+    return tuple(getattr(model, field.name) for field in fields(row_type))
+
+
+def fetch_rows(db: Session, stmt: Select, row_type: Type[RowT]) -> List[RowT]:
+    """Кортежи из курсора в лёгкие объекты со __slots__: без identity map и состояния ORM.
+
+    Доступ к атрибутам slots-объекта в pydantic (from_attributes) заметно быстрее,
+    чем к строке Row, поэтому страница валидируется быстрее, чем из ORM-объектов.
+    """
+    return [row_type(*row) for row in db.execute(stmt)]
+
+
+@dataclass(slots=True)
+class GiftRow:
+    """Подарок в списках: значения столбцов без состояния ORM"""
+
+    gift_id: int
+    wishlist_id: int
+    name: str
+    description: Optional[str]
+    price: Optional[float]
+    store_link: Optional[str]
+    status: Optional[str]
+    created_at: str
+
+
+GIFT_ROW_COLUMNS = row_columns(Gift, GiftRow)
+
+
+@dataclass(slots=True)
+class WishlistRow:
+    """Вишлист в списках (поля WishlistShort): без подарков и состояния ORM"""
+
+    wishlist_id: int
+    user_id: int
+    name: str
+    event_date: str
+    is_private: int
+    unique_link: Optional[str]
+    created_at: str
+    gift_count: int
+    reserved_count: int
+    available_total_price: float
+    version: int
+
+
+WISHLIST_ROW_COLUMNS = row_columns(Wishlist, WishlistRow)
+
+
+@dataclass(slots=True)
+class UserRow:
+    """Пользователь в списках (поля UserShort): password_hash не читается из БД"""
+
+    user_id: int
+    login: str
+    email: str
+
+
+USER_ROW_COLUMNS = row_columns(User, UserRow)
+
+
+@dataclass(slots=True)
+class ReservationRow:
+    """Бронь в списках: значения столбцов без состояния ORM"""
+
+    reservation_id: int
+    user_id: int
+    gift_id: int
+    reserved_date: str
+    cancelled_at: Optional[str]
+
+
+RESERVATION_ROW_COLUMNS = row_columns(Reservation, ReservationRow)
@@ -0,0 +1,121 @@
+from typing import List, Optional
+
+from sqlalchemy import column, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.gift import Gift
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.repositories.rows import (
+    GIFT_ROW_COLUMNS,
+    USER_ROW_COLUMNS,
+    WISHLIST_ROW_COLUMNS,
+    GiftRow,
+    UserRow,
+    WishlistRow,
+    fetch_rows,
+)
+
+
+# Полнотекстовые индексы FTS5 (trigram — поиск по подстроке) поверх основных таблиц.
+# Индексы external content: хранят только токены, синхронизируются триггерами.
+SEARCH_INDEXES = {
+    "gifts_fts": ("gifts", "gift_id", ("name", "description")),
+    "wishlists_fts": ("wishlists", "wishlist_id", ("name",)),
+    "users_fts": ("users", "user_id", ("login", "email")),
+}
+
+# Trigram-токенизатор не находит подстроки короче трёх символов
+MIN_MATCH_LENGTH = 3
+
+
+def _index_ddl(index: str, source: str, key: str, columns) -> List[str]:
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.{key}, {new_values});"
+    delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.{key}, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"{cols}, content='{source}', content_rowid='{key}', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {source} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {source} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {cols} ON {source} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def create_search_indexes(connection) -> None:
+    """Создаёт индексы и триггеры; новый индекс сразу заполняется из таблицы"""
+    if connection.dialect.name != "sqlite":
+        return
+    for index, (source, key, columns) in SEARCH_INDEXES.items():
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": index},
+        ).first()
+        for statement in _index_ddl(index, source, key, columns):
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def _fts(index: str):
+    return table(index, column("rowid"), column("rank"))
+
+
+def _match_query(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def uses_search_index(db: Session, term: str) -> bool:
+    return db.get_bind().dialect.name == "sqlite" and len(term) >= MIN_MATCH_LENGTH
+
+
+def search_condition(db: Session, index: str, key_column, term: str, *fallback_columns):
+    """Условие поиска по подстроке: через FTS5, либо ILIKE для коротких строк и других СУБД"""
+    if uses_search_index(db, term):
+        fts = _fts(index)
+        matched = select(fts.c.rowid).where(literal_column(index).op("MATCH")(_match_query(term)))
+        return key_column.in_(matched)
+    like = f"%{term}%"
+    return or_(*(col.ilike(like) for col in fallback_columns))
+
+
+class SearchRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _ranked(self, columns, key_column, index: str, term: str, fallback_columns, limit: int):
+        stmt = select(*columns)
+        if uses_search_index(self.db, term):
+            fts = _fts(index)
+            stmt = (
+                stmt.join(fts, fts.c.rowid == key_column)
+                .where(literal_column(index).op("MATCH")(_match_query(term)))
+                .order_by(fts.c.rank)
+            )
+        else:
+            like = f"%{term}%"
+            stmt = stmt.where(or_(*(col.ilike(like) for col in fallback_columns))).order_by(key_column)
+        return stmt.limit(limit)
+
+    def search_gifts(self, term: str, limit: int = 20, public_only: bool = True) -> List[GiftRow]:
+        stmt = self._ranked(GIFT_ROW_COLUMNS, Gift.gift_id, "gifts_fts", term, (Gift.name, Gift.description), limit)
+        if public_only:
+            stmt = stmt.join(Wishlist, Wishlist.wishlist_id == Gift.wishlist_id).where(Wishlist.is_private == 0)
+        return fetch_rows(self.db, stmt, GiftRow)
+
+    def search_wishlists(self, term: str, limit: int = 20, public_only: bool = True) -> List[WishlistRow]:
+        stmt = self._ranked(WISHLIST_ROW_COLUMNS, Wishlist.wishlist_id, "wishlists_fts", term, (Wishlist.name,), limit)
+        if public_only:
+            stmt = stmt.where(Wishlist.is_private == 0)
+        return fetch_rows(self.db, stmt, WishlistRow)
+
+    def search_users(self, term: str, limit: int = 20) -> List[UserRow]:
+        stmt = self._ranked(USER_ROW_COLUMNS, User.user_id, "users_fts", term, (User.login, User.email), limit)
+        return fetch_rows(self.db, stmt, UserRow)
+
+    def rebuild(self, index: Optional[str] = None) -> None:
+        for name in [index] if index else SEARCH_INDEXES:
+            self.db.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
@@ -0,0 +1,58 @@
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.wishlist import UniqueLinkLog, Wishlist
+
+
+# Новые и изменённые ссылки попадают в журнал в той же транзакции, что и сама запись
+LINK_LOG_TRIGGERS = {
+    "unique_link_log_ai": "AFTER INSERT ON wishlists",
+    "unique_link_log_au": "AFTER UPDATE OF unique_link ON wishlists",
+}
+
+
+def create_link_log_triggers(connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    for name, when in LINK_LOG_TRIGGERS.items():
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {name} {when} WHEN new.unique_link IS NOT NULL "
+            f"BEGIN INSERT INTO unique_link_log (unique_link) VALUES (new.unique_link); END"
+        ))
+
+
+class UniqueLinkRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def count_links(self) -> int:
+        return self.db.execute(select(func.count(Wishlist.unique_link))).scalar_one()
+
+    def iter_links(self, batch_size: int) -> Iterator[str]:
+        stmt = select(Wishlist.unique_link).where(Wishlist.unique_link.is_not(None))
+        result = self.db.execute(stmt.execution_options(yield_per=batch_size))
+        try:
+            for (unique_link,) in result:
+                yield unique_link
+        finally:
+            result.close()
+
+    def last_seq(self) -> int:
+        return self.db.execute(select(func.max(UniqueLinkLog.seq))).scalar() or 0
+
+    def first_seq(self) -> Optional[int]:
+        return self.db.execute(select(func.min(UniqueLinkLog.seq))).scalar()
+
+    def logged_since(self, seq: int) -> List[Tuple[int, str]]:
+        stmt = (
+            select(UniqueLinkLog.seq, UniqueLinkLog.unique_link)
+            .where(UniqueLinkLog.seq > seq)
+            .order_by(UniqueLinkLog.seq)
+        )
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def prune_log(self, through_seq: int) -> None:
+        """Удаляет старую часть журнала; воркер, не дочитавший её, перестроит фильтр целиком"""
+        self.db.execute(delete(UniqueLinkLog).where(UniqueLinkLog.seq <= through_seq))
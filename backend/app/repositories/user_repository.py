@@ -2,6 +2,10 @@ from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..models.user import User
+from .async_repository import AsyncRepository
+from .pagination import paginate
+from .rows import USER_ROW_COLUMNS, UserRow, fetch_rows
+from .search_repository import search_condition
 from ..schemas.user import UserCreate, UserUpdate
 
 
@@ -25,13 +29,13 @@ class UserRepository:
         offset: int = 0,
         limit: int = 50,
         search: Optional[str] = None,
-    ) -> List[User]:
-        stmt = select(User)
+        cursor: Optional[str] = None,
+    ) -> List[UserRow]:
+        stmt = select(*USER_ROW_COLUMNS)
         if search:
-            like = f"%{search}%"
-            stmt = stmt.where((User.login.ilike(like)) | (User.email.ilike(like)))
-        stmt = stmt.offset(offset).limit(limit)
-        return list(self.db.execute(stmt).scalars().all())
+            stmt = stmt.where(search_condition(self.db, "users_fts", User.user_id, search, User.login, User.email))
+        stmt = paginate(stmt, User.user_id, offset, limit, cursor)
+        return fetch_rows(self.db, stmt, UserRow)
 
     def create(self, data: UserCreate, password_hash: str) -> User:
         user = User(
@@ -40,8 +44,7 @@ class UserRepository:
             password_hash=password_hash,
         )
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        self.db.flush()
         return user
 
     def update(self, user: User, data: UserUpdate, new_password_hash: Optional[str] = None) -> User:
@@ -51,10 +54,13 @@ class UserRepository:
             user.email = data.email
         if new_password_hash is not None:
             user.password_hash = new_password_hash
-        self.db.commit()
-        self.db.refresh(user)
+        self.db.flush()
         return user
 
     def delete(self, user: User) -> None:
         self.db.delete(user)
-        self.db.commit()
+        self.db.flush()
+
+
+class AsyncUserRepository(AsyncRepository):
+    repository_class = UserRepository
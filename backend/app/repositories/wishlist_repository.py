@@ -1,26 +1,58 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from sqlalchemy import and_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session, selectinload, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import ORMOption
 
+from app.models.gift import Gift
 from app.models.wishlist import Wishlist
+from app.repositories.async_repository import AsyncRepository
+from app.repositories.gift_repository import active_reservations_count
+from app.repositories.pagination import paginate
+from app.repositories.rows import WISHLIST_ROW_COLUMNS, WishlistRow, fetch_rows
+from app.repositories.search_repository import search_condition
 from app.schemas.wishlist import WishlistCreate, WishlistUpdate
 
 
+def with_gifts(reservation_counts: bool = False) -> ORMOption:
+    """Загрузка подарков вишлиста одним дополнительным запросом (selectin)"""
+    loader = selectinload(Wishlist.gifts)
+    if reservation_counts:
+        loader = loader.options(with_expression(Gift.active_reservations, active_reservations_count()))
+    return loader
+
+
 class WishlistRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_by_id(self, wishlist_id: int) -> Optional[Wishlist]:
-        return self.db.get(Wishlist, wishlist_id)
+    def get_by_id(self, wishlist_id: int, options: Sequence[ORMOption] = ()) -> Optional[Wishlist]:
+        return self.db.get(Wishlist, wishlist_id, options=options, populate_existing=bool(options))
 
-    def get_by_unique_link(self, unique_link: str, only_public: bool = True) -> Optional[Wishlist]:
+    def get_by_unique_link(
+        self,
+        unique_link: str,
+        only_public: bool = True,
+        options: Sequence[ORMOption] = (),
+    ) -> Optional[Wishlist]:
         conditions = [Wishlist.unique_link == unique_link]
         if only_public:
             conditions.append(Wishlist.is_private == 0)
-        stmt = select(Wishlist).where(and_(*conditions))
+        stmt = select(Wishlist).where(and_(*conditions)).options(*options)
+        if options:
+            stmt = stmt.execution_options(populate_existing=True)
         return self.db.execute(stmt).scalars().first()
 
+    def get_public_version(self, unique_link: str) -> Optional[Tuple[int, int]]:
+        """(wishlist_id, version) публичного вишлиста по ссылке одной строкой, без подарков"""
+        stmt = select(Wishlist.wishlist_id, Wishlist.version).where(
+            Wishlist.unique_link == unique_link,
+            Wishlist.is_private == 0,
+        )
+        row = self.db.execute(stmt).first()
+        return None if row is None else (row.wishlist_id, row.version)
+
     def list_by_user(
         self,
         user_id: int,
@@ -28,15 +60,15 @@ class WishlistRepository:
         limit: int = 50,
         include_private: bool = True,
         search: Optional[str] = None,
-    ) -> List[Wishlist]:
-        stmt = select(Wishlist).where(Wishlist.user_id == user_id)
+        cursor: Optional[str] = None,
+    ) -> List[WishlistRow]:
+        stmt = select(*WISHLIST_ROW_COLUMNS).where(Wishlist.user_id == user_id)
         if not include_private:
             stmt = stmt.where(Wishlist.is_private == 0)
         if search:
-            like = f"%{search}%"
-            stmt = stmt.where(Wishlist.name.ilike(like))
-        stmt = stmt.offset(offset).limit(limit)
-        return list(self.db.execute(stmt).scalars().all())
+            stmt = stmt.where(search_condition(self.db, "wishlists_fts", Wishlist.wishlist_id, search, Wishlist.name))
+        stmt = paginate(stmt, Wishlist.wishlist_id, offset, limit, cursor)
+        return fetch_rows(self.db, stmt, WishlistRow)
 
     def create(self, data: WishlistCreate) -> Wishlist:
         wishlist = Wishlist(
@@ -47,35 +79,94 @@ class WishlistRepository:
             unique_link=data.unique_link,
         )
         self.db.add(wishlist)
-        self.db.commit()
-        self.db.refresh(wishlist)
+        self.db.flush()
+        # У нового вишлиста нет подарков: ответ не подгружает их отдельным запросом
+        set_committed_value(wishlist, "gifts", [])
+        return wishlist
+
+    def _update(self, wishlist: Wishlist, values: Dict[str, Any]) -> Wishlist:
+        """UPDATE ... RETURNING version: новая версия приходит тем же запросом, без SELECT после записи"""
+        version = self.db.execute(
+            update(Wishlist)
+            .where(Wishlist.wishlist_id == wishlist.wishlist_id)
+            .values(**values, version=Wishlist.version + 1)
+            .returning(Wishlist.version)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+        for key, value in {**values, "version": version}.items():
+            set_committed_value(wishlist, key, value)
         return wishlist
 
     def update(self, wishlist: Wishlist, data: WishlistUpdate) -> Wishlist:
+        values: Dict[str, Any] = {}
         if data.name is not None:
-            wishlist.name = data.name
+            values["name"] = data.name
         if data.event_date is not None:
-            wishlist.event_date = str(data.event_date)
+            values["event_date"] = str(data.event_date)
         if data.is_private is not None:
-            wishlist.is_private = 1 if data.is_private else 0
+            values["is_private"] = 1 if data.is_private else 0
         if data.unique_link is not None:
-            wishlist.unique_link = data.unique_link
-        self.db.commit()
-        self.db.refresh(wishlist)
-        return wishlist
+            values["unique_link"] = data.unique_link
+        return self._update(wishlist, values)
 
     def delete(self, wishlist: Wishlist) -> None:
         self.db.delete(wishlist)
-        self.db.commit()
+        self.db.flush()
 
     def set_unique_link(self, wishlist: Wishlist, unique_link: Optional[str]) -> Wishlist:
-        wishlist.unique_link = unique_link
-        self.db.commit()
-        self.db.refresh(wishlist)
-        return wishlist
+        return self._update(wishlist, {"unique_link": unique_link})
 
     def is_owner(self, wishlist_id: int, user_id: int) -> bool:
         stmt = select(Wishlist.wishlist_id).where(
             (Wishlist.wishlist_id == wishlist_id) & (Wishlist.user_id == user_id)
         )
         return self.db.execute(stmt).scalar_one_or_none() is not None
+
+    def get_ownership(self, wishlist_id: int, owner_id: int) -> Optional[bool]:
+        """Признак владения вишлистом без загрузки строки; None — вишлиста нет"""
+        stmt = select((Wishlist.user_id == owner_id).label("is_owner")).where(Wishlist.wishlist_id == wishlist_id)
+        owned = self.db.execute(stmt).scalar()
+        return None if owned is None else bool(owned)
+
+    def get_owner_ids(self, wishlist_ids: Iterable[int]) -> Dict[int, int]:
+        """Владельцы нескольких вишлистов одним запросом: {wishlist_id: user_id}"""
+        ids = set(wishlist_ids)
+        if not ids:
+            return {}
+        stmt = select(Wishlist.wishlist_id, Wishlist.user_id).where(Wishlist.wishlist_id.in_(ids))
+        return dict(self.db.execute(stmt).all())
+
+    def reconcile_counters(self, wishlist_ids: Optional[Iterable[int]] = None) -> int:
+        """Пересчитывает счётчики одним UPDATE; трогает только разошедшиеся строки, возвращает их число"""
+        def of_wishlist(column, *conditions):
+            return select(column).where(Gift.wishlist_id == Wishlist.wishlist_id, *conditions).scalar_subquery()
+
+        gift_count = of_wishlist(func.count(Gift.gift_id))
+        reserved_count = of_wishlist(func.count(Gift.gift_id), Gift.status == "reserved")
+        available_price = of_wishlist(
+            func.coalesce(func.sum(Gift.price), 0.0),
+            Gift.status.is_distinct_from("reserved"),
+        )
+
+        stmt = (
+            update(Wishlist)
+            .where(or_(
+                Wishlist.gift_count != gift_count,
+                Wishlist.reserved_count != reserved_count,
+                func.abs(Wishlist.available_total_price - available_price) > 1e-6,
+            ))
+            .values(
+                gift_count=gift_count,
+                reserved_count=reserved_count,
+                available_total_price=available_price,
+                version=Wishlist.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if wishlist_ids is not None:
+            stmt = stmt.where(Wishlist.wishlist_id.in_(set(wishlist_ids)))
+        return self.db.execute(stmt).rowcount
+
+
+class AsyncWishlistRepository(AsyncRepository):
+    repository_class = WishlistRepository
@@ -2,5 +2,7 @@ from .gifts import router as gifts_router
 from .wishlists import router as wishlists_router
 from .reservation import router as reservation_router
 from .user import router as users_router
+from .search import router as search_router
+from .metrics import router as metrics_router
 
-__all__ = ["gifts_router", "wishlists_router", "reservation_router", "users_router"]
\ No newline at end of file
+__all__ = ["gifts_router", "wishlists_router", "reservation_router", "users_router", "search_router", "metrics_router"]
\ No newline at end of file
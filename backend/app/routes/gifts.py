@@ -1,13 +1,16 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
 
-from app.dependencies import get_db
+from app.dependencies import ServiceRunner, get_service
+from app.repositories.pagination import set_next_cursor
+from app.serialization import list_response
 from app.services.auth_service import get_current_user_from_token
-from app.models.user import User
-from app.schemas.gift import GiftCreate, GiftRead, GiftShort, GiftUpdate
+from app.services.user_cache import UserPrincipal
+from app.schemas.gift import GiftBulkResult, GiftCreate, GiftRead, GiftShort, GiftUpdate
+from app.services.gift_import import read_import_rows
 from app.services.gift_service import GiftService
+from app.services.reservation_service import ReservationConflict
 
 
 router = APIRouter(prefix="/gifts", tags=["Gifts"])
@@ -19,46 +22,85 @@ router = APIRouter(prefix="/gifts", tags=["Gifts"])
     status_code=status.HTTP_201_CREATED,
     description="Создать новый подарок в вишлисте"
 )
-def create_gift(
+async def create_gift(
     data: GiftCreate,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftRead)),
 ):
-    service = GiftService(db)
     try:
-        gift = service.create_for_user(current_user.user_id, data)
+        gift = await service.create_for_user(current_user.user_id, data)
         return gift
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
 
 
+@router.post(
+    "/bulk",
+    response_model=GiftBulkResult,
+    description="Создать несколько подарков одним запросом (результат по каждой строке)"
+)
+async def create_gifts_bulk(
+    rows: List[Dict[str, Any]] = Body(...),
+    wishlist_id: Optional[int] = None,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftBulkResult)),
+):
+    try:
+        return await service.bulk_create_for_user(current_user.user_id, rows, wishlist_id=wishlist_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/import",
+    response_model=GiftBulkResult,
+    description="Импорт подарков из NDJSON или CSV (тело читается потоком)"
+)
+async def import_gifts(
+    request: Request,
+    wishlist_id: Optional[int] = None,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftBulkResult)),
+):
+    try:
+        rows = await read_import_rows(request.stream(), request.headers.get("content-type", ""))
+        return await service.bulk_create_for_user(current_user.user_id, rows, wishlist_id=wishlist_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get(
     "/wishlist/{wishlist_id}",
     response_model=List[GiftShort],
     description="Получить все подарки вишлиста"
 )
-def list_gifts_in_wishlist(
+async def list_gifts_in_wishlist(
     wishlist_id: int,
     offset: int = 0,
     limit: int = 50,
     status: Optional[str] = None,
     search: Optional[str] = None,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftShort)),
 ):
-    service = GiftService(db)
     try:
-        gifts = service.list_for_wishlist(
+        gifts = await service.list_for_wishlist(
             owner_id=current_user.user_id,
             wishlist_id=wishlist_id,
             offset=offset,
             limit=limit,
             status=status,
             search=search,
+            cursor=cursor,
         )
-        return gifts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
+    response = list_response(GiftShort, gifts)
+    set_next_cursor(response, gifts, limit, "gift_id")
+    return response
 
 
 @router.get(
@@ -66,14 +108,13 @@ def list_gifts_in_wishlist(
     response_model=GiftRead,
     description="Получить подарок по ID"
 )
-def get_gift_by_id(
+async def get_gift_by_id(
     gift_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftRead)),
 ):
-    service = GiftService(db)
     try:
-        gift = service.get_for_owner(gift_id, current_user.user_id)
+        gift = await service.get_for_owner(gift_id, current_user.user_id)
         return gift
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -86,16 +127,17 @@ def get_gift_by_id(
     response_model=GiftRead,
     description="Обновить подарок"
 )
-def update_gift(
+async def update_gift(
     gift_id: int,
     data: GiftUpdate,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftRead)),
 ):
-    service = GiftService(db)
     try:
-        updated = service.update_for_owner(gift_id, current_user.user_id, data)
+        updated = await service.update_for_owner(gift_id, current_user.user_id, data)
         return updated
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PermissionError as e:
@@ -107,14 +149,13 @@ def update_gift(
     status_code=status.HTTP_204_NO_CONTENT,
     description="Удалить подарок"
 )
-def delete_gift(
+async def delete_gift(
     gift_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService)),
 ):
-    service = GiftService(db)
     try:
-        service.delete_for_owner(gift_id, current_user.user_id)
+        await service.delete_for_owner(gift_id, current_user.user_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except PermissionError as e:
@@ -126,20 +167,21 @@ def delete_gift(
     response_model=GiftRead,
     description="Изменить статус подарка вручную"
 )
-def change_gift_status(
+async def change_gift_status(
     gift_id: int,
     new_status: str,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(GiftService, GiftRead)),
 ):
-    service = GiftService(db)
     try:
-        gift = service.change_status_for_owner(
+        gift = await service.change_status_for_owner(
             gift_id=gift_id,
             owner_id=current_user.user_id,
             new_status=new_status,
         )
         return gift
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except PermissionError as e:
@@ -0,0 +1,141 @@
+from anyio import to_thread
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.boot import boot_report
+from app.database import engine
+from app.instrumentation import route_metrics, slow_queries
+from app.metrics import CONTENT_TYPE, registry
+from app.services.link_filter import unique_link_filter
+from app.services.auth_service import get_current_user_from_token
+from app.services.password_hasher import password_hasher
+from app.services.user_cache import user_cache, user_read_flight
+from app.services.wishlist_cache import public_wishlist_cache, public_wishlist_flight
+
+
+router = APIRouter(tags=["Metrics"])
+
+_CACHES = {"user_principal": user_cache, "public_wishlist": public_wishlist_cache}
+_FLIGHTS = (public_wishlist_flight, user_read_flight)
+
+
+def _threadpool():
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except RuntimeError:  # вне event loop
+        return
+    yield {"state": "busy"}, limiter.borrowed_tokens
+    yield {"state": "max"}, limiter.total_tokens
+    yield {"state": "waiting"}, limiter.statistics().tasks_waiting
+
+
+def _db_pool():
+    pool = engine.pool
+    for state, method in (("checked_out", "checkedout"), ("size", "size"), ("overflow", "overflow")):
+        if hasattr(pool, method):
+            yield {"state": state}, getattr(pool, method)()
+
+
+def _password_hasher():
+    yield {"state": "in_flight"}, password_hasher.queue_depth
+    yield {"state": "max"}, password_hasher.max_queue
+
+
+def _cache_ratio():
+    for name, cache in _CACHES.items():
+        yield {"cache": name}, cache.stats()["hit_ratio"]
+
+
+def _cache_requests():
+    for name, cache in _CACHES.items():
+        stats = cache.stats()
+        yield {"cache": name, "result": "hit"}, stats["hits"]
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+
+
+def _single_flight_calls():
+    for flight in _FLIGHTS:
+        stats = flight.stats()
+        for result in ("executed", "coalesced", "errors"):
+            yield {"flight": flight.name, "result": result}, stats[result]
+
+
+def _single_flight_in_flight():
+    for flight in _FLIGHTS:
+        yield {"flight": flight.name}, flight.in_flight()
+
+
+def _link_filter():
+    stats = unique_link_filter.stats()
+    for name in ("ready", "links", "capacity", "bytes", "hashes", "target_fp_rate", "estimated_fp_rate", "observed_fp_rate"):
+        yield {"stat": name}, stats[name]
+
+
+def _link_filter_checks():
+    stats = unique_link_filter.stats()
+    yield {"result": "rejected"}, stats["rejected"]
+    yield {"result": "passed"}, stats["checks"] - stats["rejected"]
+    yield {"result": "false_positive"}, stats["false_positives"]
+
+
+def _boot_phases():
+    for phase, seconds in boot_report.phases.items():
+        yield {"phase": phase}, seconds
+    if boot_report.total is not None:
+        yield {"phase": "total"}, boot_report.total
+
+
+def _route_sql(field: str, scale: float = 1.0):
+    def collect():
+        for route, item in route_metrics.snapshot().items():
+            yield {"route": route}, item[field] * scale
+    return collect
+
+
+registry.gauge_callback("threadpool_threads", "Worker threads of the default threadpool", _threadpool)
+registry.gauge_callback("db_pool_connections", "Database connection pool state", _db_pool)
+registry.gauge_callback("password_hash_queue", "Password hashing tasks in flight and queue limit", _password_hasher)
+registry.counter_callback(
+    "password_hash_rejected_total",
+    "Password hashing tasks rejected because the queue was full",
+    lambda: [({}, password_hasher.rejected)],
+)
+registry.gauge_callback("app_boot_seconds", "Cold start of this worker process, by phase", _boot_phases)
+registry.gauge_callback("cache_hit_ratio", "Cache hit ratio since start", _cache_ratio)
+registry.counter_callback("cache_requests_total", "Cache lookups by result", _cache_requests)
+registry.counter_callback(
+    "single_flight_calls_total",
+    "Read calls by single-flight group: executed loads, calls that joined one, failed loads",
+    _single_flight_calls,
+)
+registry.gauge_callback("single_flight_in_flight", "Loads currently in flight, by single-flight group", _single_flight_in_flight)
+registry.gauge_callback("unique_link_filter", "Bloom filter of public links: size, memory and false positive rates", _link_filter)
+registry.counter_callback(
+    "unique_link_filter_checks_total",
+    "Public link lookups by filter result (false_positive: passed but not in the database)",
+    _link_filter_checks,
+)
+registry.counter_callback("db_queries_total", "SQL statements issued, by route", _route_sql("queries"))
+registry.counter_callback(
+    "db_time_seconds_total",
+    "Time spent in SQL statements, by route",
+    _route_sql("db_time_ms", 0.001),
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, description="Метрики в текстовом формате Prometheus")
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+# Ответ содержит тексты SQL-запросов, поэтому, как и админ-операции, требует авторизации
+@router.get(
+    "/metrics/sql",
+    description="SQL-статистика по маршрутам и последние медленные запросы",
+    dependencies=[Depends(get_current_user_from_token)],
+)
+def get_sql_metrics():
+    return {
+        "routes": route_metrics.snapshot(),
+        "slow_queries": slow_queries.snapshot(),
+    }
@@ -1,13 +1,14 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from app.dependencies import get_db
+from app.dependencies import ServiceRunner, get_service
+from app.repositories.pagination import set_next_cursor
+from app.serialization import list_response
 from app.services.auth_service import get_current_user_from_token
-from app.models.user import User
-from app.schemas.reservation import ReservationRead
-from app.services.reservation_service import ReservationService
+from app.services.user_cache import UserPrincipal
+from app.schemas.reservation import ReservationBatchCreate, ReservationBatchResult, ReservationRead
+from app.services.reservation_service import ReservationConflict, ReservationService
 
 
 router = APIRouter(prefix="/reservations", tags=["Reservations"])
@@ -19,44 +20,69 @@ router = APIRouter(prefix="/reservations", tags=["Reservations"])
     status_code=status.HTTP_201_CREATED,
     description="Зарезервировать подарок"
 )
-def reserve_gift(
+async def reserve_gift(
     gift_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationRead)),
 ):
-    service = ReservationService(db)
     try:
-        reservation = service.reserve_gift(
+        reservation = await service.reserve_gift(
             user_id=current_user.user_id,
             gift_id=gift_id,
         )
         return reservation
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
 
 
+@router.post(
+    "/batch",
+    response_model=ReservationBatchResult,
+    description="Забронировать несколько подарков одним запросом (результат по каждому подарку)"
+)
+async def reserve_gifts_batch(
+    data: ReservationBatchCreate,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationBatchResult)),
+):
+    try:
+        return await service.reserve_gifts(current_user.user_id, data.gift_ids, atomic=data.atomic)
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get(
     "/my",
     response_model=List[ReservationRead],
     description="Получить все резервации текущего пользователя"
 )
-def get_my_reservations(
+async def get_my_reservations(
     offset: int = 0,
     limit: int = 50,
     only_active: bool = False,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationRead)),
 ):
-    service = ReservationService(db)
-    reservations = service.list_for_user(
-        user_id=current_user.user_id,
-        offset=offset,
-        limit=limit,
-        only_active=only_active,
-    )
-    return reservations
+    try:
+        reservations = await service.list_for_user(
+            user_id=current_user.user_id,
+            offset=offset,
+            limit=limit,
+            only_active=only_active,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = list_response(ReservationRead, reservations)
+    set_next_cursor(response, reservations, limit, "reservation_id")
+    return response
 
 
 @router.get(
@@ -64,14 +90,13 @@ def get_my_reservations(
     response_model=ReservationRead,
     description="Получить резервацию по ID"
 )
-def get_reservation_by_id(
+async def get_reservation_by_id(
     reservation_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationRead)),
 ):
-    service = ReservationService(db)
     try:
-        reservation = service.get_for_user(reservation_id, current_user.user_id)
+        reservation = await service.get_for_user(reservation_id, current_user.user_id)
         return reservation
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -84,17 +109,16 @@ def get_reservation_by_id(
     response_model=List[ReservationRead],
     description="Получить все резервации конкретного подарка (для владельца вишлиста)"
 )
-def get_gift_reservations(
+async def get_gift_reservations(
     gift_id: int,
     offset: int = 0,
     limit: int = 50,
     only_active: bool = False,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationRead)),
 ):
-    service = ReservationService(db)
     try:
-        reservations = service.list_for_gift(
+        reservations = await service.list_for_gift(
             gift_id=gift_id,
             owner_id=current_user.user_id,
             offset=offset,
@@ -113,14 +137,13 @@ def get_gift_reservations(
     response_model=ReservationRead,
     description="Отменить резервацию"
 )
-def cancel_reservation(
+async def cancel_reservation(
     reservation_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService, ReservationRead)),
 ):
-    service = ReservationService(db)
     try:
-        cancelled = service.cancel_for_user(
+        cancelled = await service.cancel_for_user(
             reservation_id=reservation_id,
             user_id=current_user.user_id,
         )
@@ -136,13 +159,12 @@ def cancel_reservation(
     status_code=status.HTTP_204_NO_CONTENT,
     description="Полностью удалить резервацию (админ-операция)"
 )
-def delete_reservation(
+async def delete_reservation(
     reservation_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(ReservationService)),
 ):
-    service = ReservationService(db)
     try:
-        service.admin_delete(reservation_id)
+        await service.admin_delete(reservation_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.dependencies import ServiceRunner, get_service
+from app.schemas.search import SearchResults
+from app.services.search_service import SearchService
+
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get(
+    "/",
+    response_model=SearchResults,
+    description="Глобальный поиск по подаркам, публичным вишлистам и пользователям"
+)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    service: ServiceRunner = Depends(get_service(SearchService, SearchResults)),
+):
+    try:
+        return await service.search(q, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
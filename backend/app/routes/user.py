@@ -1,17 +1,30 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app.dependencies import get_db
-from app.models.user import User
+from app.dependencies import ServiceRunner, get_db, get_service, run_in_session
+from app.repositories.pagination import set_next_cursor
+from app.serialization import list_response
+from app.services.user_cache import UserPrincipal, user_read_flight
 from app.schemas.user import UserCreate, UserRead, UserShort, UserUpdate
-from app.services.user_service import UserService
+from app.services.password_hasher import PasswordHasherBusy
+from app.services.user_export import GZIP_JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, UserExport
+from app.services.user_service import UserService, authenticate_async, register_async, update_profile_async
 from app.services.auth_service import create_access_token, get_current_user_from_token
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+
+def hasher_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent password operations, try again later",
+        headers={"Retry-After": "1"},
+    )
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
 
 
@@ -21,29 +34,29 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
     status_code=status.HTTP_201_CREATED,
     description="Регистрация нового пользователя"
 )
-def register_user(
+async def register_user(
     data: UserCreate,
-    db: Session = Depends(get_db),
+    service: ServiceRunner = Depends(get_service(UserService, UserShort)),
 ):
-    service = UserService(db)
     try:
-        user = service.register(data)
+        user = await register_async(service, data)
         return user
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusy:
+        raise hasher_busy_exception()
 
 
 @router.post(
     "/token",
     description="Получить JWT токен для аутентификации"
 )
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    service: ServiceRunner = Depends(get_service(UserService)),
 ):
-    service = UserService(db)
     try:
-        user = service.authenticate(form_data.username, form_data.password)
+        user = await authenticate_async(service, form_data.username, form_data.password)
         access_token = create_access_token(data={"sub": str(user.user_id)})
         return {
             "access_token": access_token,
@@ -51,6 +64,8 @@ def login_for_access_token(
         }
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
+    except PasswordHasherBusy:
+        raise hasher_busy_exception()
 
 
 @router.get(
@@ -58,10 +73,39 @@ def login_for_access_token(
     response_model=UserRead,
     description="Получить профиль текущего пользователя"
 )
-def get_current_user_profile(
-    current_user: User = Depends(get_current_user_from_token),
+async def get_current_user_profile(
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(UserService, UserRead, single_flight=user_read_flight)),
+):
+    return await service.get_by_id(current_user.user_id)
+
+
+@router.get(
+    "/me/export",
+    response_class=StreamingResponse,
+    description="Выгрузить все вишлисты, подарки и брони текущего пользователя (NDJSON или JSON в gzip)"
+)
+async def export_current_user(
+    export_format: Literal["ndjson", "json.gz"] = Query("ndjson", alias="format"),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db),
 ):
-    return current_user
+    # Поток читается синхронной сессией в пуле потоков и в асинхронном режиме:
+    # сессия закрывается зависимостью уже после отправки ответа
+    export = UserExport(db, current_user.user_id)
+    try:
+        await run_in_session(db, lambda session: export.load_user())
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if export_format == "json.gz":
+        body, media_type, filename = export.json_gzip(), GZIP_JSON_MEDIA_TYPE, "export.json.gz"
+    else:
+        body, media_type, filename = export.ndjson(), NDJSON_MEDIA_TYPE, "export.ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get(
@@ -69,12 +113,11 @@ def get_current_user_profile(
     response_model=UserShort,
     description="Получить пользователя по ID"
 )
-def get_user_by_id(
+async def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
+    service: ServiceRunner = Depends(get_service(UserService, UserShort, single_flight=user_read_flight)),
 ):
-    service = UserService(db)
-    user = service.get_by_id(user_id)
+    user = await service.get_by_id(user_id)
     if user is None:
         raise HTTPException(
             status_code=404,
@@ -88,15 +131,20 @@ def get_user_by_id(
     response_model=List[UserShort],
     description="Получить список пользователей"
 )
-def list_users(
+async def list_users(
     offset: int = 0,
     limit: int = 50,
     search: str = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    service: ServiceRunner = Depends(get_service(UserService, UserShort)),
 ):
-    service = UserService(db)
-    users = service.list_users(offset=offset, limit=limit, search=search)
-    return users
+    try:
+        users = await service.list_users(offset=offset, limit=limit, search=search, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = list_response(UserShort, users)
+    set_next_cursor(response, users, limit, "user_id")
+    return response
 
 
 @router.patch(
@@ -104,17 +152,18 @@ def list_users(
     response_model=UserRead,
     description="Обновить профиль текущего пользователя"
 )
-def update_current_user_profile(
+async def update_current_user_profile(
     data: UserUpdate,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(UserService, UserRead)),
 ):
-    service = UserService(db)
     try:
-        updated = service.update_profile(current_user.user_id, data)
+        updated = await update_profile_async(service, current_user.user_id, data)
         return updated
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusy:
+        raise hasher_busy_exception()
 
 
 @router.delete(
@@ -122,12 +171,11 @@ def update_current_user_profile(
     status_code=status.HTTP_204_NO_CONTENT,
     description="Удалить текущего пользователя"
 )
-def delete_current_user(
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+async def delete_current_user(
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(UserService)),
 ):
-    service = UserService(db)
     try:
-        service.delete_user(current_user.user_id)
+        await service.delete_user(current_user.user_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
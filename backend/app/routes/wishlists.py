@@ -1,12 +1,15 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.dependencies import get_db
+from app.dependencies import ServiceRunner, get_service
+from app.repositories.pagination import set_next_cursor
+from app.serialization import list_response
 from app.services.auth_service import get_current_user_from_token
-from app.models.user import User
+from app.services.user_cache import UserPrincipal
 from app.schemas.wishlist import WishlistCreate, WishlistRead, WishlistShort, WishlistUpdate
+from app.services.link_filter import unique_link_filter
+from app.services.wishlist_cache import etag_matches, make_etag, public_wishlist_cache, public_wishlist_flight
 from app.services.wishlist_service import WishlistService
 
 
@@ -19,13 +22,12 @@ router = APIRouter(prefix="/wishlists", tags=["Wishlists"])
     status_code=status.HTTP_201_CREATED,
     description="Создать новый вишлист"
 )
-def create_wishlist(
+async def create_wishlist(
     data: WishlistCreate,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
 ):
-    service = WishlistService(db)
-    wishlist = service.create_for_user(
+    wishlist = await service.create_for_user(
         user_id=current_user.user_id,
         data=data,
         generate_link_if_missing=True,
@@ -38,23 +40,36 @@ def create_wishlist(
     response_model=List[WishlistShort],
     description="Получить все вишлисты текущего пользователя"
 )
-def get_my_wishlists(
+async def get_my_wishlists(
     offset: int = 0,
     limit: int = 50,
     include_private: bool = True,
     search: str = None,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistShort)),
 ):
-    service = WishlistService(db)
-    wishlists = service.list_for_user(
-        user_id=current_user.user_id,
-        offset=offset,
-        limit=limit,
-        include_private=include_private,
-        search=search,
+    try:
+        wishlists = await service.list_for_user(
+            user_id=current_user.user_id,
+            offset=offset,
+            limit=limit,
+            include_private=include_private,
+            search=search,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = list_response(WishlistShort, wishlists)
+    set_next_cursor(response, wishlists, limit, "wishlist_id")
+    return response
+
+
+def link_not_found(unique_link: str) -> HTTPException:
+    return HTTPException(
+        status_code=404,
+        detail=f"Public wishlist with link '{unique_link}' not found"
     )
-    return wishlists
 
 
 @router.get(
@@ -62,18 +77,47 @@ def get_my_wishlists(
     response_model=WishlistRead,
     description="Получить публичный вишлист по уникальной ссылке"
 )
-def get_wishlist_by_link(
+async def get_wishlist_by_link(
     unique_link: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
+    versions: ServiceRunner = Depends(get_service(WishlistService)),
 ):
-    service = WishlistService(db)
-    wishlist = service.get_public_by_link(unique_link)
-    if wishlist is None:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Public wishlist with link '{unique_link}' not found"
+    # Дочитывание журнала ссылок тоже общее для ожидающих запросов (single-flight)
+    if not await unique_link_filter.admits(unique_link, service.in_own_session().sync_link_filter):
+        raise link_not_found(unique_link)
+    # Текущая версия читается из БД на каждый запрос: записи других воркеров видны сразу
+    current = await versions.get_public_version(unique_link)
+    if current is None:
+        unique_link_filter.record_miss()
+        raise link_not_found(unique_link)
+    wishlist_id, version = current
+    etag = make_etag(wishlist_id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
         )
-    return wishlist
+
+    entry = public_wishlist_cache.get(unique_link, version)
+    if entry is None:
+
+        async def load():
+            # Загрузка общая для нескольких запросов: не в сессии запроса, которую закроет его завершение
+            wishlist = await service.in_own_session().get_public_by_link(unique_link)
+            if wishlist is None:
+                return None
+            body = wishlist.model_dump_json().encode()
+            # Тело прочитано не раньше version; более новые данные лишь вызовут повторную загрузку
+            return public_wishlist_cache.put(unique_link, wishlist.wishlist_id, version, body)
+
+        # Версия в ключе: запрос после записи не присоединяется к загрузке старых данных
+        entry = await public_wishlist_flight.do((unique_link, version), load)
+        if entry is None:
+            raise link_not_found(unique_link)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
 
 @router.get(
@@ -81,14 +125,13 @@ def get_wishlist_by_link(
     response_model=WishlistRead,
     description="Получить вишлист по ID (только владелец)"
 )
-def get_wishlist_by_id(
+async def get_wishlist_by_id(
     wishlist_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
 ):
-    service = WishlistService(db)
     try:
-        wishlist = service.get_for_owner(wishlist_id, current_user.user_id)
+        wishlist = await service.get_for_owner(wishlist_id, current_user.user_id, load_gifts=True)
         return wishlist
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -101,15 +144,14 @@ def get_wishlist_by_id(
     response_model=WishlistRead,
     description="Обновить вишлист"
 )
-def update_wishlist(
+async def update_wishlist(
     wishlist_id: int,
     data: WishlistUpdate,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
 ):
-    service = WishlistService(db)
     try:
-        updated = service.update_for_user(
+        updated = await service.update_for_user(
             wishlist_id=wishlist_id,
             owner_id=current_user.user_id,
             data=data,
@@ -126,14 +168,13 @@ def update_wishlist(
     status_code=status.HTTP_204_NO_CONTENT,
     description="Удалить вишлист"
 )
-def delete_wishlist(
+async def delete_wishlist(
     wishlist_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService)),
 ):
-    service = WishlistService(db)
     try:
-        service.delete_for_user(wishlist_id, current_user.user_id)
+        await service.delete_for_user(wishlist_id, current_user.user_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PermissionError as e:
@@ -145,14 +186,13 @@ def delete_wishlist(
     response_model=WishlistRead,
     description="Сгенерировать новую уникальную ссылку для вишлиста"
 )
-def regenerate_wishlist_link(
+async def regenerate_wishlist_link(
     wishlist_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
 ):
-    service = WishlistService(db)
     try:
-        wishlist = service.regenerate_unique_link(wishlist_id, current_user.user_id)
+        wishlist = await service.regenerate_unique_link(wishlist_id, current_user.user_id)
         return wishlist
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
@@ -165,14 +205,13 @@ def regenerate_wishlist_link(
     response_model=WishlistRead,
     description="Удалить уникальную ссылку вишлиста"
 )
-def clear_wishlist_link(
+async def clear_wishlist_link(
     wishlist_id: int,
-    current_user: User = Depends(get_current_user_from_token),
-    db: Session = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user_from_token),
+    service: ServiceRunner = Depends(get_service(WishlistService, WishlistRead)),
 ):
-    service = WishlistService(db)
     try:
-        wishlist = service.clear_unique_link(wishlist_id, current_user.user_id)
+        wishlist = await service.clear_unique_link(wishlist_id, current_user.user_id)
         return wishlist
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
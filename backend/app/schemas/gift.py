@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing_extensions import Literal
@@ -88,8 +88,23 @@ class GiftInDBBase(GiftBase):
 
 
 class GiftShort(GiftInDBBase):
-    pass
+    active_reservations: Optional[int] = Field(
+        None,
+        description="Количество активных броней (заполняется только для владельца)"
+    )
 
 
 class GiftRead(GiftInDBBase):
     pass
+
+
+class GiftBulkRowResult(BaseModel):
+    index: int = Field(..., description="Номер строки во входных данных (с нуля)")
+    gift_id: Optional[int] = Field(None, description="ID созданного подарка")
+    error: Optional[str] = Field(None, description="Причина, по которой строка не импортирована")
+
+
+class GiftBulkResult(BaseModel):
+    created: int = Field(..., description="Сколько подарков создано")
+    failed: int = Field(..., description="Сколько строк пропущено")
+    results: List[GiftBulkRowResult] = Field(..., description="Результат по каждой строке")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -47,3 +47,28 @@ class ReservationInDBBase(ReservationBase):
 
 class ReservationRead(ReservationInDBBase):
     pass
+
+
+class ReservationBatchCreate(BaseModel):
+    gift_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        description="ID подарков, которые нужно забронировать"
+    )
+    atomic: bool = Field(
+        False,
+        description="Бронировать всё или ничего: при любой ошибке ни один подарок не бронируется"
+    )
+
+
+class ReservationBatchRowResult(BaseModel):
+    index: int = Field(..., description="Номер подарка в gift_ids (с нуля)")
+    gift_id: int = Field(..., description="ID подарка")
+    reservation: Optional[ReservationRead] = Field(None, description="Созданная бронь")
+    error: Optional[str] = Field(None, description="Причина, по которой подарок не забронирован")
+
+
+class ReservationBatchResult(BaseModel):
+    reserved: int = Field(..., description="Сколько подарков забронировано")
+    failed: int = Field(..., description="Сколько подарков не забронировано")
+    results: List[ReservationBatchRowResult] = Field(..., description="Результат по каждому подарку")
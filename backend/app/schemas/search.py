@@ -0,0 +1,24 @@
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from .gift import GiftShort
+from .user import UserShort
+from .wishlist import WishlistShort
+
+
+class SearchResults(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    gifts: List[GiftShort] = Field(
+        default_factory=list,
+        description="Подарки из публичных вишлистов, по убыванию релевантности"
+    )
+    wishlists: List[WishlistShort] = Field(
+        default_factory=list,
+        description="Публичные вишлисты, по убыванию релевантности"
+    )
+    users: List[UserShort] = Field(
+        default_factory=list,
+        description="Пользователи, найденные по логину или почте"
+    )
@@ -72,7 +72,10 @@ class WishlistInDBBase(WishlistBase):
 
 
 class WishlistShort(WishlistInDBBase):
-    pass
+    gift_count: int = Field(0, description="Количество подарков в списке")
+    reserved_count: int = Field(0, description="Количество забронированных подарков")
+    available_total_price: float = Field(0.0, description="Суммарная цена свободных подарков")
+    version: int = Field(1, description="Версия списка, растёт при каждом изменении")
 
 
 class WishlistRead(WishlistInDBBase):
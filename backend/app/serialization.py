@@ -0,0 +1,30 @@
+"""Быстрая сериализация ответов.
+
+TypeAdapter для списка схемы собирается один раз и валидирует всю страницу
+одним вызовом pydantic-core (ORM-объекты, строки Row и словари). Готовый
+список пишется в JSON тем же pydantic-core, минуя повторную валидацию
+response_model и jsonable_encoder.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def validate_list(schema: Type[BaseModel], items: Iterable[Any]) -> List[BaseModel]:
+    return list_adapter(schema).validate_python(items, from_attributes=True)
+
+
+def list_response(
+    schema: Type[BaseModel],
+    items: List[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """JSON-ответ из уже провалидированных моделей; response_model маршрута остаётся для OpenAPI"""
+    return Response(list_adapter(schema).dump_json(items), media_type="application/json", headers=headers)
@@ -1,12 +1,14 @@
 import jwt
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.dependencies import get_db
-from app.models.user import User
-from app.services.user_service import UserService
-from app.schemas.user import UserRead
+from app.dependencies import get_session
+from app.repositories.user_repository import AsyncUserRepository, UserRepository
+from app.services.user_cache import UserPrincipal, user_cache
 from app.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
@@ -18,7 +20,12 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1
     return encoded_jwt
 
 
-def get_current_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def _load_principal(session: Session, user_id: int) -> Optional[UserPrincipal]:
+    user = UserRepository(session).get_by_id(user_id)
+    return UserPrincipal.from_user(user) if user is not None else None
+
+
+async def get_current_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)) -> UserPrincipal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,7 +38,15 @@ def get_current_user_from_token(token: str = Depends(oauth2_scheme), db: Session
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.user_id == int(user_id)).first()
-    if user is None:
+    principal = user_cache.get(int(user_id))
+    if principal is not None:
+        return principal
+    if isinstance(db, AsyncSession):
+        user = await AsyncUserRepository(db).get_by_id(int(user_id))
+        principal = UserPrincipal.from_user(user) if user is not None else None
+    else:
+        principal = await run_in_threadpool(_load_principal, db, int(user_id))
+    if principal is None:
         raise credentials_exception
-    return user
+    user_cache.put(principal)
+    return principal
@@ -0,0 +1,108 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from app.config import settings
+
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str]:
+    """Построчно декодирует поток тела запроса, не дожидаясь его конца.
+
+    Байт \\n не встречается внутри многобайтовых символов UTF-8, поэтому поток
+    режется на строки до декодирования; в памяти не больше одной строки.
+    """
+    tail = b""
+    number = 0
+    async for chunk in chunks:
+        tail += chunk
+        *lines, tail = tail.split(b"\n")
+        for line in lines:
+            number += 1
+            yield _decode_line(line, number, max_line_bytes)
+        if len(tail) > max_line_bytes:
+            raise ValueError(f"Line {number + 1} is longer than {max_line_bytes} bytes")
+    if tail:
+        yield _decode_line(tail, number + 1, max_line_bytes)
+
+
+def _decode_line(line: bytes, number: int, max_line_bytes: int) -> str:
+    if len(line) > max_line_bytes:
+        raise ValueError(f"Line {number} is longer than {max_line_bytes} bytes")
+    if number == 1 and line.startswith(codecs.BOM_UTF8):
+        line = line[len(codecs.BOM_UTF8):]
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        raise ValueError(f"Invalid UTF-8 on line {number}")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Any]:
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid JSON on line {number}")
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, str]]:
+    """Строки CSV с заголовком; пустые ячейки не передаются (берутся значения по умолчанию).
+
+    Запись разбирается, как только в ней закрыты все кавычки, поэтому поля
+    в кавычках могут занимать несколько строк.
+    """
+    header = None
+    record: List[str] = []
+    async for line in lines:
+        record.append(line)
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        values = next(csv.reader(["\n".join(record)]), [])
+        record = []
+        if header is None:
+            header = values
+        elif values:
+            yield {key: value for key, value in zip(header, values) if key and value != ""}
+    if record:
+        raise ValueError("Unterminated quoted field in CSV")
+
+
+async def read_import_rows(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    max_rows: Optional[int] = None,
+    max_line_bytes: Optional[int] = None,
+) -> List[Any]:
+    """Читает строки импорта; как только их больше max_rows, чтение тела прекращается"""
+    max_rows = settings.gift_bulk_max_rows if max_rows is None else max_rows
+    max_line_bytes = settings.gift_import_max_line_bytes if max_line_bytes is None else max_line_bytes
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        parse = parse_ndjson
+    elif media_type in CSV_TYPES:
+        parse = parse_csv
+    else:
+        raise ValueError("Unsupported import format, use NDJSON or CSV")
+    rows = []
+    async for row in parse(iter_lines(chunks, max_line_bytes)):
+        if len(rows) >= max_rows:
+            raise ValueError(f"Too many rows, at most {max_rows} allowed")
+        rows.append(row)
+    return rows
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
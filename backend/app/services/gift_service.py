@@ -1,9 +1,16 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from ..config import settings
 from ..models.gift import Gift
 from ..repositories.gift_repository import GiftRepository
+from ..repositories.rows import GiftRow
 from ..repositories.wishlist_repository import WishlistRepository
 from ..schemas.gift import GiftCreate, GiftUpdate
+from .gift_import import format_validation_error
+from .reservation_service import ReservationConflict
+from .unit_of_work import after_commit, transactional
+from .wishlist_cache import public_wishlist_cache
 
 
 class GiftService:
@@ -13,12 +20,13 @@ class GiftService:
         self.wishlist_repo = WishlistRepository(db)
 
     def _ensure_wishlist_owner(self, wishlist_id: int, user_id: int) -> None:
-        wishlist = self.wishlist_repo.get_by_id(wishlist_id)
-        if wishlist is None:
+        owned = self.wishlist_repo.get_ownership(wishlist_id, user_id)
+        if owned is None:
             raise ValueError("Wishlist not found")
-        if wishlist.user_id != user_id:
+        if not owned:
             raise PermissionError("Access denied to wishlist")
 
+    @transactional
     def create_for_user(
         self,
         owner_id: int,
@@ -26,13 +34,76 @@ class GiftService:
     ) -> Gift:
         self._ensure_wishlist_owner(data.wishlist_id, owner_id)
         gift = self.gift_repo.create(data)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, data.wishlist_id)
         return gift
 
+    @transactional
+    def bulk_create_for_user(
+        self,
+        owner_id: int,
+        rows: List[Any],
+        wishlist_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Пакетное создание подарков с результатом по каждой строке.
+
+        Невалидные строки и строки с чужими вишлистами пропускаются, остальные
+        вставляются одной транзакцией. wishlist_id подставляется в строки без него.
+        """
+        if len(rows) > settings.gift_bulk_max_rows:
+            raise ValueError(f"Too many rows, at most {settings.gift_bulk_max_rows} allowed")
+
+        results: List[Dict[str, Any]] = []
+        valid: List[GiftCreate] = []
+        for index, row in enumerate(rows):
+            result = {"index": index, "gift_id": None, "error": None}
+            results.append(result)
+            if not isinstance(row, dict):
+                result["error"] = "Row must be an object"
+                continue
+            if wishlist_id is not None:
+                row = {"wishlist_id": wishlist_id, **row}
+            try:
+                valid.append(GiftCreate.model_validate(row))
+            except ValidationError as e:
+                result["error"] = format_validation_error(e)
+
+        owners = self.wishlist_repo.get_owner_ids(data.wishlist_id for data in valid)
+        pending = [result for result in results if result["error"] is None]
+        to_insert = []
+        for result, data in zip(pending, valid):
+            owner = owners.get(data.wishlist_id)
+            if owner is None:
+                result["error"] = "Wishlist not found"
+            elif owner != owner_id:
+                result["error"] = "Access denied to wishlist"
+            else:
+                to_insert.append((result, data))
+
+        gift_ids = self.gift_repo.create_many([data for _, data in to_insert])
+        for (result, _), gift_id in zip(to_insert, gift_ids):
+            result["gift_id"] = gift_id
+        for touched in {data.wishlist_id for _, data in to_insert}:
+            after_commit(self.db, public_wishlist_cache.invalidate_wishlist, touched)
+
+        return {
+            "created": len(gift_ids),
+            "failed": len(results) - len(gift_ids),
+            "results": results,
+        }
+
+    def _ensure_can_set_status(self, gift: Gift, new_status: Optional[str]) -> None:
+        """Вручную освободить подарок нельзя, пока на него есть активная бронь"""
+        if new_status == "available" and gift.status == "reserved":
+            if self.gift_repo.has_active_reservation(gift.gift_id):
+                raise ReservationConflict("Gift has an active reservation")
+
     def get_for_owner(self, gift_id: int, owner_id: int) -> Gift:
-        gift = self.gift_repo.get_by_id(gift_id)
-        if not gift:
+        found = self.gift_repo.get_with_ownership(gift_id, owner_id)
+        if found is None:
             raise ValueError("Gift not found")
-        self._ensure_wishlist_owner(gift.wishlist_id, owner_id)
+        gift, owned = found
+        if not owned:
+            raise PermissionError("Access denied to wishlist")
         return gift
 
     def list_for_wishlist(
@@ -43,7 +114,8 @@ class GiftService:
         limit: int = 50,
         status: Optional[str] = None,
         search: Optional[str] = None,
-    ) -> List[Gift]:
+        cursor: Optional[str] = None,
+    ) -> List[GiftRow]:
         self._ensure_wishlist_owner(wishlist_id, owner_id)
         return self.gift_repo.list_by_wishlist(
             wishlist_id=wishlist_id,
@@ -51,8 +123,10 @@ class GiftService:
             limit=limit,
             status=status,
             search=search,
+            cursor=cursor,
         )
 
+    @transactional
     def update_for_owner(
         self,
         gift_id: int,
@@ -60,19 +134,27 @@ class GiftService:
         data: GiftUpdate,
     ) -> Gift:
         gift = self.get_for_owner(gift_id, owner_id)
+        old_wishlist_id = gift.wishlist_id
 
         if data.wishlist_id is not None and data.wishlist_id != gift.wishlist_id:
             self._ensure_wishlist_owner(data.wishlist_id, owner_id)
+        self._ensure_can_set_status(gift, data.status)
 
         updated = self.gift_repo.update(gift, data)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, old_wishlist_id)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, data.wishlist_id)
         return updated
 
+    @transactional
     def delete_for_owner(self, gift_id: int, owner_id: int) -> None:
         gift = self.get_for_owner(gift_id, owner_id)
         if gift.status == "reserved":
             raise ValueError("Cannot delete reserved gift")
+        wishlist_id = gift.wishlist_id
         self.gift_repo.delete(gift)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
 
+    @transactional
     def change_status_for_owner(
         self,
         gift_id: int,
@@ -82,4 +164,7 @@ class GiftService:
         gift = self.get_for_owner(gift_id, owner_id)
         if new_status not in ("available", "reserved"):
             raise ValueError("Invalid gift status")
-        return self.gift_repo.change_status(gift, new_status)
+        self._ensure_can_set_status(gift, new_status)
+        gift = self.gift_repo.change_status(gift, new_status)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, gift.wishlist_id)
+        return gift
@@ -0,0 +1,239 @@
+"""Фильтр Блума всех действующих unique_link.
+
+GET /wishlists/link/{unique_link} с заведомо несуществующей ссылкой (сканеры,
+устаревшие ссылки) отклоняется без запроса к БД. Фильтр строится потоковым
+проходом по таблице при запуске воркера, ссылки этого процесса добавляются
+сразу после записи, а ссылки других процессов дочитываются из журнала
+unique_link_log, когда фильтр ответил «нет» (не чаще раза в
+link_filter_sync_interval). Поэтому ложный отказ возможен только для ссылки,
+созданной другим процессом менее link_filter_sync_interval назад.
+
+Удалять из фильтра Блума нельзя: снятые ссылки остаются в нём до
+перестроения и дают лишь ложноположительные ответы (обычный запрос в БД).
+"""
+import hashlib
+import math
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.repositories.unique_link_repository import UniqueLinkRepository
+from app.services.single_flight import SingleFlight
+
+
+class BloomFilter:
+    """Битовый массив на size бит и hashes позиций на ключ (двойное хеширование blake2b)"""
+
+    def __init__(self, capacity: int, fp_rate: float, max_bytes: int):
+        bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.size = max(64, min(bits, max_bytes * 8))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def estimated_fp_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class UniqueLinkFilter:
+    """Фильтр ссылок процесса; пока не построен (или выключен), пропускает всё"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        fp_rate: float,
+        capacity: int,
+        max_bytes: int,
+        sync_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = enabled
+        self.fp_rate = fp_rate
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._bloom: Optional[BloomFilter] = None
+        self._seq = 0
+        self._synced_at = 0.0
+        # Ссылки, добавленные во время перестроения: переносятся в новый фильтр
+        self._pending: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # Одновременные отказы со старым фильтром ждут одно чтение журнала
+        self._sync_flight = SingleFlight("link_filter_sync")
+        self.checks = 0
+        self.rejected = 0
+        self.false_positives = 0
+        self.removed = 0
+        self.rebuilds = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def rebuild(self, db: Session) -> int:
+        """Потоковый проход по всем ссылкам; возвращает их число"""
+        if not self.enabled or db.get_bind().dialect.name != "sqlite":
+            return 0
+        if not self._rebuild_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._rebuild(db)
+        finally:
+            self._rebuild_lock.release()
+
+    def _rebuild(self, db: Session) -> int:
+        repo = UniqueLinkRepository(db)
+        with self._lock:
+            self._pending = []
+        try:
+            # pysqlite не открывает транзакцию на SELECT, и общего снимка у этих чтений нет.
+            # Поэтому seq читается до прохода по таблице: всё, что записано в журнал
+            # до него, проход уже увидит, а ссылки, записанные позже, имеют больший seq
+            # и дочитываются из журнала (повторное добавление в фильтр безвредно)
+            seq = repo.last_seq()
+            bloom = BloomFilter(max(self.capacity, 2 * repo.count_links()), self.fp_rate, self.max_bytes)
+            for unique_link in repo.iter_links(settings.export_batch_size):
+                bloom.add(unique_link)
+            db.rollback()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for unique_link in self._pending:
+                bloom.add(unique_link)
+            self._pending = None
+            self._bloom = bloom
+            self._seq = seq
+            self._synced_at = self._clock()
+            self.removed = 0
+            self.rebuilds += 1
+        if seq > settings.link_filter_log_keep:
+            repo.prune_log(seq - settings.link_filter_log_keep)
+            db.commit()
+        return bloom.count
+
+    def sync(self, db: Session) -> None:
+        """Дочитывает журнал ссылок после последнего известного seq"""
+        with self._lock:
+            bloom, seq = self._bloom, self._seq
+        if bloom is None:
+            return
+        repo = UniqueLinkRepository(db)
+        first = repo.first_seq()
+        # Журнал обрезан дальше прочитанного или фильтр переполнен — дешевле перестроить
+        if (first is not None and first > seq + 1) or bloom.count > bloom.capacity:
+            self.rebuild(db)
+            return
+        rows = repo.logged_since(seq)
+        with self._lock:
+            for row_seq, unique_link in rows:
+                self._bloom.add(unique_link)
+                self._seq = max(self._seq, row_seq)
+            self._synced_at = self._clock()
+
+    def add(self, unique_link: Optional[str]) -> None:
+        if not unique_link:
+            return
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(unique_link)
+            if self._pending is not None:
+                self._pending.append(unique_link)
+
+    def discard(self, unique_link: Optional[str]) -> None:
+        """Снятая ссылка остаётся в фильтре до перестроения; учитывается только в статистике"""
+        if unique_link and self._bloom is not None:
+            with self._lock:
+                self.removed += 1
+
+    def might_contain(self, unique_link: str) -> bool:
+        bloom = self._bloom
+        return bloom is None or unique_link in bloom
+
+    async def admits(self, unique_link: str, sync: Callable[[], Awaitable[None]]) -> bool:
+        """False — ссылки точно нет; перед отказом журнал дочитывается, если прошло sync_interval"""
+        with self._lock:
+            self.checks += 1
+        if self.might_contain(unique_link):
+            return True
+        if self._clock() - self._synced_at >= self.sync_interval:
+            await self._sync_flight.do("sync", sync)
+            if self.might_contain(unique_link):
+                return True
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def record_miss(self) -> None:
+        """Фильтр пропустил ссылку, которой нет в БД"""
+        if self._bloom is not None:
+            with self._lock:
+                self.false_positives += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            bloom = self._bloom
+            negatives = self.rejected + self.false_positives
+            return {
+                "ready": int(bloom is not None),
+                "links": bloom.count if bloom else 0,
+                "capacity": bloom.capacity if bloom else 0,
+                "bytes": bloom.nbytes if bloom else 0,
+                "hashes": bloom.hashes if bloom else 0,
+                "target_fp_rate": self.fp_rate,
+                "estimated_fp_rate": bloom.estimated_fp_rate() if bloom else 0.0,
+                "observed_fp_rate": self.false_positives / negatives if negatives else 0.0,
+                "checks": self.checks,
+                "rejected": self.rejected,
+                "false_positives": self.false_positives,
+                "removed": self.removed,
+                "rebuilds": self.rebuilds,
+            }
+
+    def clear(self) -> None:
+        """Сбрасывает фильтр (снова пропускает всё) и статистику"""
+        with self._lock:
+            self._bloom = None
+            self._seq = 0
+            self._synced_at = 0.0
+            self.checks = 0
+            self.rejected = 0
+            self.false_positives = 0
+            self.removed = 0
+            self.rebuilds = 0
+        self._sync_flight.clear()
+
+
+unique_link_filter = UniqueLinkFilter(
+    enabled=settings.link_filter,
+    fp_rate=settings.link_filter_fp_rate,
+    capacity=settings.link_filter_capacity,
+    max_bytes=settings.link_filter_max_bytes,
+    sync_interval=settings.link_filter_sync_interval,
+)
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context() -> "CryptContext":
+    """passlib и argon2-cffi импортируются при первом хешировании, а не при импорте приложения"""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def load_backend() -> None:
+    """Загружает бэкенд схемы по умолчанию (первый вызов импортирует argon2-cffi)"""
+    get_pwd_context().handler().get_backend()
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Очередь хеширования заполнена — запрос нужно повторить позже"""
+
+
+class PasswordHasher:
+    """Выполняет argon2 в отдельном пуле, чтобы вход и регистрация не занимали
+    потоки обработчиков. Число задач в очереди ограничено: при переполнении
+    новые задачи сразу отклоняются с PasswordHasherBusy."""
+
+    def __init__(self, mode: str = "thread", workers: int = 4, max_queue: int = 64):
+        if mode not in ("thread", "process"):
+            raise ValueError("Invalid password hasher mode")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="password-hasher",
+                        )
+        return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def _submit(self, fn, *args):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._release()
+
+    async def hash_async(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    def warm_up(self) -> None:
+        """Создаёт пул заранее; в режиме process запускает процессы и грузит в них бэкенд"""
+        executor = self._get_executor()
+        load_backend()
+        if self.mode == "process":
+            for future in [executor.submit(load_backend) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    mode=settings.password_hash_executor,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
@@ -1,63 +1,157 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from ..config import settings
 from ..models.reservation import Reservation
 from ..repositories.gift_repository import GiftRepository
 from ..repositories.reservation_repository import ReservationRepository
-from ..repositories.wishlist_repository import WishlistRepository
-from ..schemas.reservation import ReservationCreate, ReservationUpdate
+from ..repositories.rows import ReservationRow
+from ..schemas.reservation import ReservationUpdate
+from .unit_of_work import after_commit, transactional
+from .wishlist_cache import public_wishlist_cache
 
 
-class ReservationService:
-    def __init__(self, db: Session):
-        self.db = db
-        self.reservation_repo = ReservationRepository(db)
-        self.gift_repo = GiftRepository(db)
-        self.wishlist_repo = WishlistRepository(db)
+class ReservationConflict(ValueError):
+    """Подарок уже забронирован (в том числе конкурентным запросом)"""
 
-    def _ensure_can_access_gift(self, gift_id: int, user_id: int) -> None:
-        gift = self.gift_repo.get_by_id(gift_id)
-        if gift is None:
-            raise ValueError("Gift not found")
-        wishlist = self.wishlist_repo.get_by_id(gift.wishlist_id)
-        if wishlist is None:
-            raise ValueError("Wishlist not found")
-        if wishlist.is_private and wishlist.user_id != user_id:
-            raise PermissionError("Access denied to gift")
 
-    def reserve_gift(self, user_id: int, gift_id: int) -> Reservation:
-        gift = self.gift_repo.get_by_id(gift_id)
-        if gift is None:
-            raise ValueError("Gift not found")
+class _BatchRejected(Exception):
+    """Пакет в режиме atomic не прошёл целиком — транзакция откатывается"""
+
 
-        self._ensure_can_access_gift(gift_id, user_id)
+# Уникальные ограничения броней: нарушение значит, что подарок уже занят
+_CONFLICT_CONSTRAINTS = ("uq_reservations_active_gift", "uq_reservations_user_gift")
+_SQLITE_CONFLICT_MESSAGES = (
+    "UNIQUE constraint failed: reservations.gift_id",
+    "UNIQUE constraint failed: reservations.user_id, reservations.gift_id",
+)
 
-        if gift.status != "available":
-            raise ValueError("Gift is already reserved")
 
-        if gift.wishlist.user_id == user_id:
-            raise ValueError("Cannot reserve your own gift")
+def is_reservation_conflict(error: IntegrityError) -> bool:
+    """IntegrityError — нарушение уникальности брони, а не другого ограничения (внешний ключ, NOT NULL)"""
+    orig = error.orig
+    # psycopg2 кладёт имя в diag, asyncpg — прямо в исключение
+    constraint = getattr(getattr(orig, "diag", None), "constraint_name", None) or getattr(orig, "constraint_name", None)
+    if constraint is not None:
+        return constraint in _CONFLICT_CONSTRAINTS
+    return str(orig) in _SQLITE_CONFLICT_MESSAGES
 
-        existing = self.reservation_repo.get_by_user_and_gift(user_id, gift_id)
 
-        if existing:
-            if existing.cancelled_at is None:
-                raise ValueError("Gift is already reserved by this user")
+def reserve_error(state: Optional[Row], user_id: int) -> Optional[Exception]:
+    """Почему подарок нельзя забронировать по строке get_reservation_state; None — можно"""
+    if state is None:
+        return ValueError("Gift not found")
+    if state.is_private and state.owner_id != user_id:
+        return PermissionError("Access denied to gift")
+    if state.own_reservation_id is not None:
+        return ReservationConflict("Gift is already reserved by this user")
+    if state.status != "available":
+        return ReservationConflict("Gift is already reserved")
+    if state.owner_id == user_id:
+        return ValueError("Cannot reserve your own gift")
+    return None
 
-            return self.reservation_repo.reactivate(existing)
 
-        data = ReservationCreate(user_id=user_id, gift_id=gift_id)
-        return self.reservation_repo.create(data)
+class ReservationService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.reservation_repo = ReservationRepository(db)
+        self.gift_repo = GiftRepository(db)
+
+    @transactional
+    def reserve_gift(self, user_id: int, gift_id: int) -> Reservation:
+        try:
+            reserved = self.reservation_repo.reserve(user_id, gift_id)
+        except IntegrityError as e:
+            # Активная бронь уже есть, хотя статус подарка 'available' (uq_reservations_active_gift)
+            if not is_reservation_conflict(e):
+                raise
+            raise ReservationConflict("Gift is already reserved") from e
+        if reserved is None:
+            self._raise_reserve_error(user_id, gift_id)
+        reservation, wishlist_id = reserved
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        return reservation
 
+    def _raise_reserve_error(self, user_id: int, gift_id: int) -> None:
+        """Объясняет, почему условный UPDATE не забронировал подарок"""
+        state = self.reservation_repo.get_reservation_state(user_id, gift_id)
+        # Без причины — подарок освободили между UPDATE и проверкой, клиент может повторить запрос
+        raise reserve_error(state, user_id) or ReservationConflict("Gift is already reserved")
+
+    def reserve_gifts(self, user_id: int, gift_ids: List[int], atomic: bool = False) -> Dict[str, Any]:
+        """Бронирует несколько подарков одной транзакцией с результатом по каждому.
+
+        Состояние всех подарков (доступ к вишлисту, статус, своя бронь) читается
+        одним запросом, захват — одним условным UPDATE, поэтому конкурентные
+        брони по-прежнему не пересекаются. С atomic при любой ошибке не
+        бронируется ничего.
+        """
+        if len(gift_ids) > settings.reservation_batch_max_gifts:
+            raise ValueError(f"Too many gifts, at most {settings.reservation_batch_max_gifts} allowed")
+        results = [
+            {"index": index, "gift_id": gift_id, "reservation": None, "error": None}
+            for index, gift_id in enumerate(gift_ids)
+        ]
+        try:
+            self._reserve_batch(user_id, results, atomic)
+        except _BatchRejected:
+            for result in results:
+                result["reservation"] = None
+                result["error"] = result["error"] or "Not reserved: another gift in the batch failed"
+        reserved = sum(result["reservation"] is not None for result in results)
+        return {"reserved": reserved, "failed": len(results) - reserved, "results": results}
+
+    @transactional
+    def _reserve_batch(self, user_id: int, results: List[Dict[str, Any]], atomic: bool) -> None:
+        pending: Dict[int, Dict[str, Any]] = {}
+        for result in results:
+            if result["gift_id"] in pending:
+                result["error"] = "Duplicate gift in batch"
+            else:
+                pending[result["gift_id"]] = result
+
+        states = self.reservation_repo.get_reservation_states(user_id, list(pending))
+        for gift_id, result in list(pending.items()):
+            error = reserve_error(states.get(gift_id), user_id)
+            if error is not None:
+                result["error"] = str(error)
+                del pending[gift_id]
+        if atomic and len(pending) < len(results):
+            raise _BatchRejected()
+
+        try:
+            claimed = self.reservation_repo.reserve_many(user_id, list(pending))
+        except IntegrityError as e:
+            if not is_reservation_conflict(e):
+                raise
+            raise ReservationConflict("Gift is already reserved") from e
+        for gift_id, result in pending.items():
+            if gift_id in claimed:
+                result["reservation"] = claimed[gift_id][0]
+            else:
+                # Подарок заняли конкурентным запросом между проверкой и UPDATE
+                result["error"] = "Gift is already reserved"
+        if atomic and len(claimed) < len(pending):
+            raise _BatchRejected()
+        for wishlist_id in {wishlist_id for _, wishlist_id in claimed.values()}:
+            after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+
+    @transactional
     def cancel_for_user(self, reservation_id: int, user_id: int) -> Reservation:
-        reservation = self.reservation_repo.get_by_id(reservation_id)
-        if reservation is None:
+        found = self.reservation_repo.get_with_wishlist_id(reservation_id)
+        if found is None:
             raise ValueError("Reservation not found")
+        reservation, wishlist_id = found
         if reservation.user_id != user_id:
             raise PermissionError("Access denied to reservation")
         if reservation.cancelled_at is not None:
             return reservation 
-        return self.reservation_repo.cancel(reservation, datetime.utcnow())
+        cancelled = self.reservation_repo.cancel(reservation, datetime.utcnow())
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        return cancelled
 
     def get_for_user(
         self,
@@ -77,12 +171,14 @@ class ReservationService:
         offset: int = 0,
         limit: int = 50,
         only_active: bool = False,
-    ) -> List[Reservation]:
+        cursor: Optional[str] = None,
+    ) -> List[ReservationRow]:
         return self.reservation_repo.list_by_user(
             user_id=user_id,
             offset=offset,
             limit=limit,
             only_active=only_active,
+            cursor=cursor,
         )
 
     def list_for_gift(
@@ -92,14 +188,12 @@ class ReservationService:
         offset: int = 0,
         limit: int = 50,
         only_active: bool = False,
+        cursor: Optional[str] = None,
     ) -> List[Reservation]:
-        gift = self.gift_repo.get_by_id(gift_id)
-        if gift is None:
+        owned = self.gift_repo.get_ownership(gift_id, owner_id)
+        if owned is None:
             raise ValueError("Gift not found")
-        wishlist = self.wishlist_repo.get_by_id(gift.wishlist_id)
-        if wishlist is None:
-            raise ValueError("Wishlist not found")
-        if wishlist.user_id != owner_id:
+        if not owned:
             raise PermissionError("Access denied to reservations for this gift")
 
         return self.reservation_repo.list_by_gift(
@@ -107,12 +201,16 @@ class ReservationService:
             offset=offset,
             limit=limit,
             only_active=only_active,
+            cursor=cursor,
         )
 
 
 
+    @transactional
     def admin_delete(self, reservation_id: int) -> None:
-        reservation = self.reservation_repo.get_by_id(reservation_id)
-        if reservation is None:
+        found = self.reservation_repo.get_with_wishlist_id(reservation_id)
+        if found is None:
             raise ValueError("Reservation not found")
+        reservation, wishlist_id = found
         self.reservation_repo.delete(reservation)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
@@ -0,0 +1,19 @@
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from ..repositories.search_repository import SearchRepository
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.repo = SearchRepository(db)
+
+    def search(self, query: str, limit: int = 20) -> Dict[str, List]:
+        term = query.strip()
+        if not term:
+            raise ValueError("Search query is empty")
+        return {
+            "gifts": self.repo.search_gifts(term, limit=limit),
+            "wishlists": self.repo.search_wishlists(term, limit=limit),
+            "users": self.repo.search_users(term, limit=limit),
+        }
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных чтений (single-flight).
+
+    Первый вызов с ключом запускает загрузку отдельной задачей, остальные
+    вызовы с тем же ключом ждут её результат (или исключение), пока она не
+    завершится. Отмена одного из ожидающих (клиент закрыл соединение) не
+    отменяет загрузку для остальных. Результат общий, поэтому изменять его
+    нельзя; кэшем это не является — после завершения ключ забывается.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await load()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._calls.get(key)
+            # Задача из другого event loop (другой поток) не ожидается
+            if task is not None and task.get_loop() is loop:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(load())
+                self._calls[key] = task
+                self.executed += 1
+                task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+            if not task.cancelled() and task.exception() is not None:
+                self.errors += 1
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.executed = 0
+            self.coalesced = 0
+            self.errors = 0
+
@@ -0,0 +1,59 @@
+"""Единица работы: одна транзакция (один COMMIT) на вызов сервиса.
+
+Репозитории только добавляют изменения в сессию и делают flush; фиксирует их
+метод сервиса, помеченный @transactional. Если такой метод вызывает другой
+(сервис внутри сервиса), коммит делает только внешний. Сброс кэшей, который
+должен видеть уже зафиксированные данные, регистрируется через after_commit и
+выполняется после успешного COMMIT; при откате он отбрасывается.
+"""
+import functools
+from typing import Any, Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+
+F = TypeVar("F", bound=Callable)
+
+_DEPTH = "unit_of_work_depth"
+_AFTER_COMMIT = "unit_of_work_after_commit"
+
+
+def after_commit(db: Session, callback: Callable[..., Any], *args: Any) -> None:
+    """Вызывает callback(*args) после COMMIT текущей транзакции сессии"""
+    db.info.setdefault(_AFTER_COMMIT, []).append(functools.partial(callback, *args))
+
+
+def transactional(method: F) -> F:
+    """Метод сервиса выполняется в одной транзакции self.db: COMMIT в конце, ROLLBACK при ошибке"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        db: Session = self.db
+        depth = db.info.get(_DEPTH, 0)
+        db.info[_DEPTH] = depth + 1
+        try:
+            result = method(self, *args, **kwargs)
+            if depth == 0:
+                db.commit()
+            return result
+        except BaseException:
+            if depth == 0:
+                db.rollback()
+            raise
+        finally:
+            db.info[_DEPTH] = depth
+
+    return wrapper
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_after_commit(session: Session, transaction: SessionTransaction) -> None:
+    # После COMMIT список уже пуст; здесь он очищается при откате и закрытии сессии
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT, None)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+from app.services.single_flight import SingleFlight
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    """Облегчённое представление аутентифицированного пользователя"""
+
+    user_id: int
+    login: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(user_id=user.user_id, login=user.login, email=user.email)
+
+
+class UserPrincipalCache:
+    """Процессный LRU-кэш пользователей с ограничением по времени жизни записи"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is not None:
+                principal, expires_at = item
+                if expires_at > self._clock():
+                    self._items.move_to_end(user_id)
+                    self.hits += 1
+                    return principal
+                del self._items[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, principal: UserPrincipal) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[principal.user_id] = (principal, self._clock() + self.ttl)
+            self._items.move_to_end(principal.user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+user_cache = UserPrincipalCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
+# Одновременные чтения одного профиля (GET /users/me, /users/{id}) выполняются одной загрузкой
+user_read_flight = SingleFlight("user_read", enabled=settings.single_flight)
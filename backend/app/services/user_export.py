@@ -0,0 +1,158 @@
+"""Потоковая выгрузка всех данных пользователя: профиль, вишлисты, подарки и брони.
+
+Каждая таблица читается одним запросом с yield_per: курсор отдаёт строки
+пачками, а ответ собирается кусками фиксированного размера, поэтому память
+не зависит от размера аккаунта. Все запросы идут в одной явной транзакции
+чтения (begin_snapshot), так что выгрузка согласована: брони не ссылаются на
+подарки, которых в ней нет (в WAL-режиме SQLite она не блокирует запись).
+"""
+import zlib
+from typing import Iterable, Iterator, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.gift import Gift
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.repositories.rows import (
+    GIFT_ROW_COLUMNS,
+    RESERVATION_ROW_COLUMNS,
+    USER_ROW_COLUMNS,
+    WISHLIST_ROW_COLUMNS,
+    GiftRow,
+    ReservationRow,
+    UserRow,
+    WishlistRow,
+)
+from app.schemas.gift import GiftShort
+from app.schemas.reservation import ReservationRead
+from app.schemas.user import UserShort
+from app.schemas.wishlist import WishlistShort
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+GZIP_JSON_MEDIA_TYPE = "application/gzip"
+
+
+def dump_item(schema: Type[BaseModel], item) -> bytes:
+    return schema.__pydantic_serializer__.to_json(schema.model_validate(item, from_attributes=True))
+
+
+def chunked(parts: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """Склеивает мелкие фрагменты в куски не меньше size байт (кроме последнего)"""
+    buffer = bytearray()
+    for part in parts:
+        buffer += part
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class UserExport:
+    def __init__(
+        self,
+        db: Session,
+        user_id: int,
+        batch_size: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size or settings.export_batch_size
+        self.chunk_size = chunk_size or settings.export_chunk_size
+        self.user: Optional[UserRow] = None
+
+    def begin_snapshot(self) -> None:
+        """Открывает транзакцию, в которой все запросы выгрузки видят один снимок БД.
+
+        pysqlite не начинает транзакцию перед SELECT, и каждый запрос видел бы свой
+        снимок, поэтому BEGIN отправляется явно. В PostgreSQL снимок на всю
+        транзакцию даёт REPEATABLE READ (READ COMMITTED берёт снимок на каждый запрос).
+        """
+        connection = self.db.connection()
+        if connection.dialect.name == "sqlite":
+            if not connection.connection.dbapi_connection.in_transaction:
+                connection.exec_driver_sql("BEGIN")
+        else:
+            connection.exec_driver_sql("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+    def load_user(self) -> UserRow:
+        """Читается до начала ответа, чтобы отсутствие пользователя стало 404, а не оборванным потоком"""
+        self.begin_snapshot()
+        row = self.db.execute(select(*USER_ROW_COLUMNS).where(User.user_id == self.user_id)).first()
+        if row is None:
+            raise ValueError("User not found")
+        self.user = UserRow(*row)
+        return self.user
+
+    def _stream(self, stmt: Select, row_type: Type, schema: Type[BaseModel]) -> Iterator[bytes]:
+        result = self.db.execute(stmt.execution_options(yield_per=self.batch_size))
+        try:
+            for row in result:
+                yield dump_item(schema, row_type(*row))
+        finally:
+            result.close()
+
+    def sections(self) -> Iterator[Tuple[str, str, Iterator[bytes]]]:
+        """(раздел, тип записи, записи в JSON) в порядке выгрузки"""
+        user = self.user or self.load_user()
+        yield "user", "user", iter([dump_item(UserShort, user)])
+        yield "wishlists", "wishlist", self._stream(
+            select(*WISHLIST_ROW_COLUMNS)
+            .where(Wishlist.user_id == self.user_id)
+            .order_by(Wishlist.wishlist_id),
+            WishlistRow,
+            WishlistShort,
+        )
+        yield "gifts", "gift", self._stream(
+            select(*GIFT_ROW_COLUMNS)
+            .join(Wishlist, Wishlist.wishlist_id == Gift.wishlist_id)
+            .where(Wishlist.user_id == self.user_id)
+            .order_by(Gift.wishlist_id, Gift.gift_id),
+            GiftRow,
+            GiftShort,
+        )
+        yield "reservations", "reservation", self._stream(
+            select(*RESERVATION_ROW_COLUMNS)
+            .where(Reservation.user_id == self.user_id)
+            .order_by(Reservation.reservation_id),
+            ReservationRow,
+            ReservationRead,
+        )
+
+    def _ndjson_lines(self) -> Iterator[bytes]:
+        for _, record_type, items in self.sections():
+            prefix = b'{"type":"' + record_type.encode() + b'","data":'
+            for item in items:
+                yield prefix + item + b"}\n"
+
+    def ndjson(self) -> Iterator[bytes]:
+        """Одна запись на строку: {"type": "gift", "data": {...}}"""
+        return chunked(self._ndjson_lines(), self.chunk_size)
+
+    def _json_parts(self) -> Iterator[bytes]:
+        for index, (section, _, items) in enumerate(self.sections()):
+            yield (b"{" if index == 0 else b",") + b'"' + section.encode() + b'":'
+            if section == "user":
+                yield next(items)
+                continue
+            yield b"["
+            for position, item in enumerate(items):
+                yield item if position == 0 else b"," + item
+            yield b"]"
+        yield b"}"
+
+    def json_gzip(self) -> Iterator[bytes]:
+        """Один JSON-документ {"user": ..., "wishlists": [...], ...}, сжатый gzip на лету"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunked(self._json_parts(), self.chunk_size):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
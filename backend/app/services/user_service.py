@@ -1,39 +1,51 @@
 from typing import List, Optional
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from ..models.user import User
+from ..repositories.reservation_repository import ReservationRepository
+from ..repositories.rows import UserRow
 from ..repositories.user_repository import UserRepository
 from ..schemas.user import UserCreate, UserUpdate
-
-
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+from .password_hasher import hash_password, password_hasher, verify_password
+from .user_cache import user_cache
+from .unit_of_work import after_commit, transactional
+from .wishlist_cache import public_wishlist_cache
 
 
 class UserService:
     def __init__(self, db: Session):
         self.db = db
         self.repo = UserRepository(db)
+        self.reservation_repo = ReservationRepository(db)
 
     def _hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
+        return hash_password(password)
 
     def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return verify_password(plain_password, hashed_password)
 
-    def register(self, data: UserCreate) -> User:
-        if self.repo.get_by_login(data.login):
+    def ensure_identity_free(self, login: str, email: str) -> None:
+        if self.repo.get_by_login(login):
             raise ValueError("Login is already taken")
-        if self.repo.get_by_email(data.email):
+        if self.repo.get_by_email(email):
             raise ValueError("Email is already taken")
-        password_hash = self._hash_password(data.password)
+
+    @transactional
+    def register(self, data: UserCreate, password_hash: Optional[str] = None) -> User:
+        self.ensure_identity_free(data.login, data.email)
+        if password_hash is None:
+            password_hash = self._hash_password(data.password)
         return self.repo.create(data=data, password_hash=password_hash)
 
-    def authenticate(self, identifier: str, password: str) -> User:
+    def get_by_identifier(self, identifier: str) -> User:
         user = self.repo.get_by_login(identifier)
         if user is None:
             user = self.repo.get_by_email(identifier)
         if user is None:
             raise ValueError("User not found")
+        return user
+
+    def authenticate(self, identifier: str, password: str) -> User:
+        user = self.get_by_identifier(identifier)
         if not self._verify_password(password, user.password_hash):
             raise ValueError("Invalid credentials")
         return user
@@ -52,13 +64,16 @@ class UserService:
         offset: int = 0,
         limit: int = 50,
         search: Optional[str] = None,
-    ) -> List[User]:
-        return self.repo.list(offset=offset, limit=limit, search=search)
+        cursor: Optional[str] = None,
+    ) -> List[UserRow]:
+        return self.repo.list(offset=offset, limit=limit, search=search, cursor=cursor)
 
+    @transactional
     def update_profile(
         self,
         user_id: int,
         data: UserUpdate,
+        password_hash: Optional[str] = None,
     ) -> User:
         user = self.repo.get_by_id(user_id)
         if user is None:
@@ -72,14 +87,48 @@ class UserService:
             if self.repo.get_by_email(data.email):
                 raise ValueError("Email is already taken")
 
-        new_password_hash: Optional[str] = None
-        if data.password is not None:
+        new_password_hash: Optional[str] = password_hash
+        if data.password is not None and new_password_hash is None:
             new_password_hash = self._hash_password(data.password)
 
-        return self.repo.update(user=user, data=data, new_password_hash=new_password_hash)
+        updated = self.repo.update(user=user, data=data, new_password_hash=new_password_hash)
+        after_commit(self.db, user_cache.invalidate, user_id)
+        return updated
 
+    @transactional
     def delete_user(self, user_id: int) -> None:
         user = self.repo.get_by_id(user_id)
         if user is None:
             raise ValueError("User not found")
+        wishlist_ids = [wishlist.wishlist_id for wishlist in user.wishlists]
+        # Брони удаляются каскадом, поэтому их подарки освобождаются заранее
+        wishlist_ids += self.reservation_repo.release_user_gifts(user_id)
         self.repo.delete(user)
+        after_commit(self.db, user_cache.invalidate, user_id)
+        for wishlist_id in wishlist_ids:
+            after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+
+
+# Точки входа для async-обработчиков: service — ServiceRunner над UserService,
+# argon2 выполняется в пуле password_hasher, а не в потоке запроса.
+
+async def register_async(service, data: UserCreate) -> User:
+    # Занятый логин или email отклоняется до argon2, не занимая место в пуле хеширования;
+    # register проверяет ещё раз уже в транзакции записи
+    await service.ensure_identity_free(data.login, data.email)
+    password_hash = await password_hasher.hash_async(data.password)
+    return await service.register(data, password_hash=password_hash)
+
+
+async def authenticate_async(service, identifier: str, password: str) -> User:
+    user = await service.get_by_identifier(identifier)
+    if not await password_hasher.verify_async(password, user.password_hash):
+        raise ValueError("Invalid credentials")
+    return user
+
+
+async def update_profile_async(service, user_id: int, data: UserUpdate) -> User:
+    password_hash = None
+    if data.password is not None:
+        password_hash = await password_hasher.hash_async(data.password)
+    return await service.update_profile(user_id, data, password_hash=password_hash)
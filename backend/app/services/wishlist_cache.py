@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Set
+
+from app.config import settings
+from app.services.single_flight import SingleFlight
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    wishlist_id: int
+    version: int
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+def make_etag(wishlist_id: int, version: int) -> str:
+    """Сильный ETag из версии вишлиста: одинаковый во всех воркерах, меняется при любой записи"""
+    return f'"{wishlist_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class PublicWishlistCache:
+    """Кэш готовых ответов GET /wishlists/link/{unique_link}.
+
+    Запись отдаётся, только если её версия совпадает с текущей Wishlist.version
+    (её обработчик читает дешёвым запросом), поэтому изменения из соседних
+    процессов видны сразу. Сброс по wishlist_id лишь освобождает память раньше TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._links: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, unique_link: str, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._items.get(unique_link)
+            if entry is not None:
+                if entry.version == version and entry.expires_at > self._clock():
+                    self._items.move_to_end(unique_link)
+                    self.hits += 1
+                    return entry
+                self._remove(unique_link)
+            self.misses += 1
+            return None
+
+    def put(self, unique_link: str, wishlist_id: int, version: int, body: bytes) -> CachedResponse:
+        """Сохраняет ответ, прочитанный не раньше версии version"""
+        entry = CachedResponse(wishlist_id, version, body, make_etag(wishlist_id, version), self._clock() + self.ttl)
+        with self._lock:
+            if self.maxsize <= 0:
+                return entry
+            self._remove(unique_link)
+            self._items[unique_link] = entry
+            self._links.setdefault(wishlist_id, set()).add(unique_link)
+            while len(self._items) > self.maxsize:
+                self._remove(next(iter(self._items)))
+        return entry
+
+    def _remove(self, unique_link: str) -> None:
+        entry = self._items.pop(unique_link, None)
+        if entry is None:
+            return
+        links = self._links.get(entry.wishlist_id)
+        if links is not None:
+            links.discard(unique_link)
+            if not links:
+                del self._links[entry.wishlist_id]
+
+    def invalidate_wishlist(self, wishlist_id: Optional[int]) -> None:
+        if wishlist_id is None:
+            return
+        with self._lock:
+            self.invalidations += 1
+            for unique_link in list(self._links.get(wishlist_id, ())):
+                self._remove(unique_link)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+            self._items.clear()
+            self._links.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+public_wishlist_cache = PublicWishlistCache(
+    maxsize=settings.public_cache_size,
+    ttl=settings.public_cache_ttl,
+)
+# Одна загрузка на ссылку при промахе кэша, в том числе сразу после инвалидации
+public_wishlist_flight = SingleFlight("public_wishlist", enabled=settings.single_flight)
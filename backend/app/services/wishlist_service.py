@@ -1,9 +1,13 @@
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from ..models.wishlist import Wishlist
-from ..repositories.wishlist_repository import WishlistRepository
+from ..repositories.rows import WishlistRow
+from ..repositories.wishlist_repository import WishlistRepository, with_gifts
 from ..schemas.wishlist import WishlistCreate, WishlistUpdate
+from .link_filter import unique_link_filter
+from .unit_of_work import after_commit, transactional
+from .wishlist_cache import public_wishlist_cache
 
 
 class WishlistService:
@@ -14,6 +18,7 @@ class WishlistService:
     def _generate_unique_link(self) -> str:
         return uuid.uuid4().hex
 
+    @transactional
     def create_for_user(
         self,
         user_id: int,
@@ -31,10 +36,13 @@ class WishlistService:
             is_private=data.is_private,
             unique_link=unique_link,
         )
-        return self.repo.create(payload)
+        wishlist = self.repo.create(payload)
+        unique_link_filter.add(wishlist.unique_link)
+        return wishlist
 
-    def get_for_owner(self, wishlist_id: int, owner_id: int) -> Wishlist:
-        wishlist = self.repo.get_by_id(wishlist_id)
+    def get_for_owner(self, wishlist_id: int, owner_id: int, load_gifts: bool = False) -> Wishlist:
+        options = [with_gifts(reservation_counts=True)] if load_gifts else []
+        wishlist = self.repo.get_by_id(wishlist_id, options=options)
         if wishlist is None:
             raise ValueError("Wishlist not found")
         if wishlist.user_id != owner_id:
@@ -42,7 +50,14 @@ class WishlistService:
         return wishlist
 
     def get_public_by_link(self, unique_link: str) -> Optional[Wishlist]:
-        return self.repo.get_by_unique_link(unique_link=unique_link, only_public=True)
+        return self.repo.get_by_unique_link(
+            unique_link=unique_link,
+            only_public=True,
+            options=[with_gifts()],
+        )
+
+    def get_public_version(self, unique_link: str) -> Optional[Tuple[int, int]]:
+        return self.repo.get_public_version(unique_link)
 
     def list_for_user(
         self,
@@ -51,15 +66,18 @@ class WishlistService:
         limit: int = 50,
         include_private: bool = True,
         search: Optional[str] = None,
-    ) -> List[Wishlist]:
+        cursor: Optional[str] = None,
+    ) -> List[WishlistRow]:
         return self.repo.list_by_user(
             user_id=user_id,
             offset=offset,
             limit=limit,
             include_private=include_private,
             search=search,
+            cursor=cursor,
         )
 
+    @transactional
     def update_for_user(
         self,
         wishlist_id: int,
@@ -67,25 +85,47 @@ class WishlistService:
         data: WishlistUpdate,
     ) -> Wishlist:
         wishlist = self.get_for_owner(wishlist_id=wishlist_id, owner_id=owner_id)
+        old_link = wishlist.unique_link
 
         if data.is_private is True:
             if data.unique_link is not None:
                 wishlist = self.repo.set_unique_link(wishlist, None)
 
         updated = self.repo.update(wishlist=wishlist, data=data)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        if updated.unique_link != old_link:
+            unique_link_filter.add(updated.unique_link)
+            unique_link_filter.discard(old_link)
         return updated
 
+    @transactional
     def delete_for_user(self, wishlist_id: int, owner_id: int) -> None:
         wishlist = self.get_for_owner(wishlist_id=wishlist_id, owner_id=owner_id)
+        old_link = wishlist.unique_link
         self.repo.delete(wishlist)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        unique_link_filter.discard(old_link)
 
+    @transactional
     def regenerate_unique_link(self, wishlist_id: int, owner_id: int) -> Wishlist:
         wishlist = self.get_for_owner(wishlist_id=wishlist_id, owner_id=owner_id)
         if wishlist.is_private:
             raise ValueError("Cannot set unique link for private wishlist")
-        new_link = self._generate_unique_link()
-        return self.repo.set_unique_link(wishlist, new_link)
+        old_link, new_link = wishlist.unique_link, self._generate_unique_link()
+        wishlist = self.repo.set_unique_link(wishlist, new_link)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        unique_link_filter.add(new_link)
+        unique_link_filter.discard(old_link)
+        return wishlist
 
+    @transactional
     def clear_unique_link(self, wishlist_id: int, owner_id: int) -> Wishlist:
         wishlist = self.get_for_owner(wishlist_id=wishlist_id, owner_id=owner_id)
-        return self.repo.set_unique_link(wishlist, None)
+        old_link = wishlist.unique_link
+        wishlist = self.repo.set_unique_link(wishlist, None)
+        after_commit(self.db, public_wishlist_cache.invalidate_wishlist, wishlist_id)
+        unique_link_filter.discard(old_link)
+        return wishlist
+
+    def sync_link_filter(self) -> None:
+        unique_link_filter.sync(self.db)
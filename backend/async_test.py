@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import Base, to_async_url
+from app.dependencies import get_session
+from app.main import app
+from app.repositories.user_repository import AsyncUserRepository
+from app.repositories.wishlist_repository import AsyncWishlistRepository
+from app.schemas.user import UserCreate
+from app.schemas.wishlist import WishlistCreate
+from app.services.user_cache import user_cache
+from app.services.wishlist_cache import public_wishlist_cache
+
+
+@pytest.fixture
+def async_session_factory(tmp_path):
+    """Создаёт файловую БД, доступную через aiosqlite"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", poolclass=NullPool)
+
+    async def create_schema():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def client(async_session_factory):
+    """HTTP-клиент, у которого все обработчики работают с AsyncSession"""
+    async def override_session():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_session] = override_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    user_cache.clear()
+    public_wishlist_cache.clear()
+
+
+class TestAsyncUrl:
+    """Тесты выбора асинхронного драйвера"""
+
+    def test_sqlite_url_uses_aiosqlite(self):
+        assert to_async_url("sqlite:///./wishlist.db") == "sqlite+aiosqlite:///./wishlist.db"
+
+    def test_postgres_url_uses_asyncpg(self):
+        assert to_async_url("postgresql://u:p@db/wishlist") == "postgresql+asyncpg://u:p@db/wishlist"
+
+    def test_explicit_driver_is_kept(self):
+        assert to_async_url("postgresql+psycopg://db/wishlist") == "postgresql+psycopg://db/wishlist"
+
+
+class TestAsyncRepositories:
+    """Тесты асинхронных репозиториев"""
+
+    def test_create_and_fetch_user(self, async_session_factory):
+        async def scenario():
+            async with async_session_factory() as db:
+                repo = AsyncUserRepository(db)
+                user = await repo.create(
+                    UserCreate(login="async", email="async@example.com", password="password123"),
+                    password_hash="hash",
+                )
+                fetched = await repo.get_by_login("async")
+                return user.user_id, fetched.user_id
+
+        created_id, fetched_id = asyncio.run(scenario())
+        assert created_id == fetched_id
+
+    def test_list_wishlists_by_user(self, async_session_factory):
+        async def scenario():
+            async with async_session_factory() as db:
+                user = await AsyncUserRepository(db).create(
+                    UserCreate(login="owner", email="owner@example.com", password="password123"),
+                    password_hash="hash",
+                )
+                repo = AsyncWishlistRepository(db)
+                await repo.create(WishlistCreate(user_id=user.user_id, name="List", event_date="2026-01-01"))
+                return await repo.list_by_user(user.user_id)
+
+        wishlists = asyncio.run(scenario())
+        assert [w.name for w in wishlists] == ["List"]
+
+
+class TestAsyncRoutes:
+    """Тесты обработчиков в асинхронном режиме"""
+
+    def test_public_link_flow(self, client):
+        response = client.post(
+            "/users/register",
+            json={"login": "owner", "email": "owner@example.com", "password": "password123"},
+        )
+        assert response.status_code == 201
+
+        token = client.post("/users/token", data={"username": "owner", "password": "password123"}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+        wishlist = client.post(
+            "/wishlists/",
+            json={"user_id": 1, "name": "Birthday", "event_date": "2026-03-15"},
+            headers=headers,
+        ).json()
+        client.post(
+            "/gifts/",
+            json={"wishlist_id": wishlist["wishlist_id"], "name": "Book"},
+            headers=headers,
+        )
+
+        public = client.get(f"/wishlists/link/{wishlist['unique_link']}")
+        assert public.status_code == 200
+        assert [g["name"] for g in public.json()["gifts"]] == ["Book"]
+
+        me = client.get("/users/me", headers=headers)
+        assert me.json()["wishlists"][0]["name"] == "Birthday"
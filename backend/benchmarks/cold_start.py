@@ -0,0 +1,146 @@
+"""Холодный старт: время от запуска run.py до первого ответа и этапы запуска каждого воркера.
+
+Запускает сервер отдельным процессом на временной базе, ждёт первого ответа
+/health и отчётов app.boot от всех воркеров. Режим development выполняет
+миграции при старте, production только сверяет версию схемы.
+
+    python -m benchmarks.cold_start --workers 4
+    python -m benchmarks.cold_start --mode production --runs 5 --output cold.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+
+from benchmarks.load import git_commit
+
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_boot_reports(stream, reports: List[dict], output: List[str]) -> None:
+    """Отчёт app.boot — JSON в конце строки лога uvicorn"""
+    for line in stream:
+        output.append(line)
+        start = line.find('{"pid"')
+        if start != -1:
+            reports.append(json.loads(line[start:]))
+
+
+def run_once(mode: str, workers: int, database_url: str, timeout: float) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "PRODUCTION": str(mode == "production").lower(),
+        "DEBUG": "false",
+        "WORKERS": str(workers),
+        "PORT": str(port),
+    }
+    expected = workers if mode == "production" else 1
+    reports: List[dict] = []
+    output: List[str] = []
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "run.py"], cwd=BACKEND, env=env, text=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    reader = threading.Thread(target=read_boot_reports, args=(process.stderr, reports, output), daemon=True)
+    reader.start()
+    first_response = None
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline and (first_response is None or len(reports) < expected):
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup:\n" + "".join(output))
+            if first_response is None:
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                        first_response = time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+            time.sleep(0.02)
+        if first_response is None:
+            raise RuntimeError("Server did not answer within the timeout:\n" + "".join(output))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "first_response_ms": round(first_response * 1000, 2),
+        "workers": sorted(reports, key=lambda report: report["total_ms"]),
+    }
+
+
+def summarize(runs: List[dict]) -> dict:
+    totals = [worker["total_ms"] for run in runs for worker in run["workers"]]
+    first = [run["first_response_ms"] for run in runs]
+    phases = {}
+    for run in runs:
+        for worker in run["workers"]:
+            for phase, value in worker["phases_ms"].items():
+                phases.setdefault(phase, []).append(value)
+    return {
+        "first_response_ms": {"median": statistics.median(first), "max": max(first)},
+        "worker_boot_ms": {"median": statistics.median(totals), "max": max(totals)} if totals else None,
+        "phases_median_ms": {phase: statistics.median(values) for phase, values in phases.items()},
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["development", "production", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=4, help="воркеров в режиме production")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", type=Path, help="куда записать JSON (по умолчанию stdout)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    modes = ["development", "production"] if args.mode == "both" else [args.mode]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'cold.db'}"
+        # Боевой режим не выполняет DDL — схема готовится заранее, как при деплое
+        subprocess.run(
+            [sys.executable, "-m", "app.migrations", "upgrade"], cwd=BACKEND, check=True,
+            env={**os.environ, "DATABASE_URL": database_url}, stdout=subprocess.DEVNULL,
+        )
+        for mode in modes:
+            runs = [run_once(mode, args.workers, database_url, args.timeout) for _ in range(args.runs)]
+            summary = summarize(runs)
+            results.append({"mode": mode, "summary": summary, "runs": runs})
+            print(
+                f"{mode:>11} first response {summary['first_response_ms']['median']} ms, "
+                f"worker boot {summary['worker_boot_ms']['median']} ms",
+                file=sys.stderr, flush=True,
+            )
+
+    text = json.dumps({"commit": git_commit(), "config": {
+        "workers": args.workers, "runs": args.runs,
+    }, "results": results}, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Бюджет времени запуска: разбор `python -X importtime` для импорта приложения.
+
+Импорт выполняется в чистом процессе несколько раз; для каждого модуля берётся
+минимальное время из всех прогонов (так меньше шума от диска и планировщика).
+Отчёт: общее время, самые дорогие модули (суммарно и собственное время) и
+разбивка собственного времени по пакетам верхнего уровня.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --module app.main --runs 7 --top 30 --budget-ms 600
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+
+BACKEND = Path(__file__).resolve().parent.parent
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    records = []
+    for line in output.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def measure(module: str) -> List[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def best_of(runs: List[List[ImportRecord]]) -> Dict[str, ImportRecord]:
+    """Минимум по прогонам для каждого модуля (порядок и вложенность — из первого прогона)"""
+    best: Dict[str, ImportRecord] = {}
+    for records in runs:
+        for record in records:
+            current = best.get(record.module)
+            if current is None:
+                best[record.module] = ImportRecord(record.module, record.self_us, record.cumulative_us, record.depth)
+            else:
+                current.self_us = min(current.self_us, record.self_us)
+                current.cumulative_us = min(current.cumulative_us, record.cumulative_us)
+    return best
+
+
+def build_report(module: str, records: Dict[str, ImportRecord], top: int) -> dict:
+    by_package: Dict[str, int] = defaultdict(int)
+    for record in records.values():
+        by_package[record.module.split(".")[0]] += record.self_us
+    target = records.get(module)
+    ms = lambda us: round(us / 1000, 2)  # noqa: E731
+    return {
+        "module": module,
+        "total_ms": ms(target.cumulative_us) if target else None,
+        "modules": len(records),
+        "top_cumulative": [
+            {"module": r.module, "cumulative_ms": ms(r.cumulative_us), "self_ms": ms(r.self_us)}
+            for r in sorted(records.values(), key=lambda r: r.cumulative_us, reverse=True)[:top]
+        ],
+        "top_self": [
+            {"module": r.module, "self_ms": ms(r.self_us)}
+            for r in sorted(records.values(), key=lambda r: r.self_us, reverse=True)[:top]
+        ],
+        "packages": {
+            name: ms(us) for name, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"import {report['module']}: {report['total_ms']} ms, {report['modules']} modules")
+    print("\nby package (self time):")
+    for name, value in report["packages"].items():
+        print(f"  {value:>9.2f} ms  {name}")
+    print("\nslowest imports (cumulative / self):")
+    for item in report["top_cumulative"]:
+        print(f"  {item['cumulative_ms']:>9.2f} / {item['self_ms']:>7.2f} ms  {item['module']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, help="завершиться с кодом 1, если импорт дольше")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = build_report(args.module, best_of([measure(args.module) for _ in range(args.runs)]), args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.budget_ms is not None and (report["total_ms"] or 0) > args.budget_ms:
+        print(f"\nimport time {report['total_ms']} ms exceeds the budget of {args.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""Нагрузочный прогон API: задержки, RPS и число SQL-запросов на HTTP-запрос.
+
+Заполняет временную SQLite-базу (пользователи, вишлисты, подарки, брони) и
+гоняет сценарии через приложение в том же процессе (ASGI) и через uvicorn.
+Результат — JSON, который удобно сравнивать между коммитами.
+
+    python -m benchmarks.load --concurrency 32 --requests 2000 --output bench.json
+    python -m benchmarks.load --mode inprocess --scenario public_link --scenario gift_paging
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+
+PASSWORD = "password123"
+
+
+@dataclass
+class Dataset:
+    users: List[int] = field(default_factory=list)
+    logins: Dict[int, str] = field(default_factory=dict)
+    tokens: Dict[int, str] = field(default_factory=dict)
+    wishlists: Dict[int, int] = field(default_factory=dict)  # wishlist_id -> владелец
+    links: List[str] = field(default_factory=list)
+    free_gifts: List[int] = field(default_factory=list)
+    search_terms: List[str] = field(default_factory=list)
+    hot_gifts: List[int] = field(default_factory=list)
+
+    def take_hot_gifts(self, count: int = 20) -> None:
+        """Свежий набор свободных подарков, чтобы повторные прогоны не упирались в уже занятые"""
+        self.hot_gifts, self.free_gifts = self.free_gifts[:count], self.free_gifts[count:]
+
+
+def seed(args) -> Dataset:
+    """Быстрое заполнение через Core INSERT; пароль хешируется один раз на всех"""
+    from sqlalchemy import insert, select
+
+    from app.database import Base, engine
+    from app.models.gift import Gift, now_str
+    from app.models.reservation import Reservation
+    from app.models.user import User
+    from app.models.wishlist import Wishlist
+    from app.services.auth_service import create_access_token
+    from app.services.password_hasher import hash_password
+
+    rng = random.Random(args.seed)
+    Base.metadata.create_all(engine)
+    password_hash = hash_password(PASSWORD)
+    words = ["book", "lego", "coffee", "headphones", "scarf", "camera", "puzzle", "tea", "plant", "watch"]
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"login": f"user{i}", "email": f"user{i}@example.com", "password_hash": password_hash}
+            for i in range(args.users)
+        ])
+        users = dict(conn.execute(select(User.user_id, User.login)).all())
+        conn.execute(insert(Wishlist), [
+            {
+                "user_id": user_id,
+                "name": f"{rng.choice(words).title()} party {n}",
+                "event_date": "2026-06-01",
+                "is_private": 0,
+                "unique_link": f"bench-{user_id}-{n}",
+            }
+            for user_id in users
+            for n in range(args.wishlists)
+        ])
+        wishlists = dict(conn.execute(select(Wishlist.wishlist_id, Wishlist.user_id)).all())
+        conn.execute(insert(Gift), [
+            {
+                "wishlist_id": wishlist_id,
+                "name": f"{rng.choice(words).title()} #{n}",
+                "description": f"Would love a {rng.choice(words)}",
+                "price": round(rng.uniform(5, 300), 2),
+                "status": "available",
+                "created_at": now_str(),
+            }
+            for wishlist_id in wishlists
+            for n in range(args.gifts)
+        ])
+        gifts = conn.execute(select(Gift.gift_id, Gift.wishlist_id)).all()
+
+        reserved, reservations = set(), []
+        user_ids = list(users)
+        for gift_id, wishlist_id in rng.sample(gifts, int(len(gifts) * args.reserved_ratio)):
+            guest = rng.choice(user_ids)
+            if guest != wishlists[wishlist_id]:
+                reserved.add(gift_id)
+                reservations.append({"user_id": guest, "gift_id": gift_id, "reserved_date": now_str()})
+        if reservations:
+            conn.execute(insert(Reservation), reservations)
+            conn.execute(
+                Gift.__table__.update().where(Gift.gift_id.in_(reserved)).values(status="reserved")
+            )
+
+    return Dataset(
+        users=user_ids,
+        logins=users,
+        tokens={user_id: create_access_token({"sub": str(user_id)}) for user_id in user_ids},
+        wishlists=wishlists,
+        links=[f"bench-{user_id}-{n}" for user_id in user_ids for n in range(args.wishlists)],
+        free_gifts=[gift_id for gift_id, _ in gifts if gift_id not in reserved],
+        search_terms=words,
+    )
+
+
+Record = Callable[[httpx.Response, float], None]
+Scenario = Callable[[httpx.AsyncClient, Dataset, random.Random, Record], Awaitable[None]]
+
+
+async def timed(client: httpx.AsyncClient, record: Record, method: str, url: str, **kwargs) -> httpx.Response:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    record(response, time.perf_counter() - started)
+    return response
+
+
+def auth(dataset: Dataset, user_id: int) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {dataset.tokens[user_id]}"}
+
+
+async def public_link(client, dataset, rng, record):
+    """Просмотр публичного вишлиста по ссылке (треть запросов — повторные с ETag)"""
+    url = f"/wishlists/link/{rng.choice(dataset.links)}"
+    response = await timed(client, record, "GET", url)
+    if rng.random() < 0.33 and "etag" in response.headers:
+        await timed(client, record, "GET", url, headers={"If-None-Match": response.headers["etag"]})
+
+
+async def viral_link(client, dataset, rng, record):
+    """Все запросы к одной ссылке; примерно каждый десятый сбрасывает её кэш (толпа после инвалидации)"""
+    from app.services.wishlist_cache import public_wishlist_cache
+
+    link = dataset.links[0]
+    if rng.random() < 0.1:
+        entry = public_wishlist_cache.get(link)
+        if entry is not None:
+            public_wishlist_cache.invalidate_wishlist(entry.wishlist_id)
+    await timed(client, record, "GET", f"/wishlists/link/{link}")
+
+
+async def reservation_storm(client, dataset, rng, record):
+    """Много пользователей одновременно бронируют небольшой набор «горячих» подарков"""
+    gift_id = rng.choice(dataset.hot_gifts)
+    await timed(client, record, "POST", f"/reservations/gift/{gift_id}", headers=auth(dataset, rng.choice(dataset.users)))
+
+
+async def login_burst(client, dataset, rng, record):
+    """Всплеск входов: argon2 на каждый запрос"""
+    login = dataset.logins[rng.choice(dataset.users)]
+    await timed(client, record, "POST", "/users/token", data={"username": login, "password": PASSWORD})
+
+
+async def gift_paging(client, dataset, rng, record):
+    """Владелец листает подарки вишлиста по курсору до конца"""
+    wishlist_id = rng.choice(list(dataset.wishlists))
+    headers = auth(dataset, dataset.wishlists[wishlist_id])
+    params = {"limit": 20}
+    while True:
+        response = await timed(client, record, "GET", f"/gifts/wishlist/{wishlist_id}", params=params, headers=headers)
+        cursor = response.headers.get("x-next-cursor")
+        if response.status_code != 200 or cursor is None:
+            break
+        params = {"limit": 20, "cursor": cursor}
+
+
+async def my_wishlists(client, dataset, rng, record):
+    await timed(client, record, "GET", "/wishlists/my", headers=auth(dataset, rng.choice(dataset.users)))
+
+
+async def search(client, dataset, rng, record):
+    await timed(client, record, "GET", "/search/", params={"q": rng.choice(dataset.search_terms)})
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "public_link": public_link,
+    "viral_link": viral_link,
+    "reservation_storm": reservation_storm,
+    "login_burst": login_burst,
+    "gift_paging": gift_paging,
+    "my_wishlists": my_wishlists,
+    "search": search,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Считает SQL-запросы приложения (сервер uvicorn работает в этом же процессе)"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, dataset: Dataset, args, queries: QueryCounter) -> dict:
+    from app.services.user_cache import user_cache, user_read_flight
+    from app.services.wishlist_cache import public_wishlist_cache, public_wishlist_flight
+
+    user_cache.clear()
+    public_wishlist_cache.clear()
+    public_wishlist_flight.clear()
+    user_read_flight.clear()
+    dataset.take_hot_gifts()
+    scenario = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+
+    def record(response: httpx.Response, elapsed: float) -> None:
+        latencies.append(elapsed)
+        statuses[response.status_code] += 1
+
+    remaining = args.requests
+    rng = random.Random(args.seed)
+
+    async def worker(worker_rng: random.Random):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            try:
+                await scenario(client, dataset, worker_rng, record)
+            except httpx.HTTPError:
+                errors += 1
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "transport_errors": errors,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+        "queries_per_request": round((queries.count - queries_before) / max(len(latencies), 1), 2),
+        "single_flight_coalesced": public_wishlist_flight.coalesced + user_read_flight.coalesced,
+    }
+
+
+def start_uvicorn(app):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def run_mode(mode: str, app, dataset: Dataset, args, queries: QueryCounter) -> List[dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    server = thread = None
+    if mode == "uvicorn":
+        server, thread, base_url = start_uvicorn(app)
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+    results = []
+    try:
+        for name in args.scenario:
+            result = await run_scenario(client, name, dataset, args, queries)
+            results.append({"mode": mode, **result})
+            print(f"{mode:>9} {name:<18} {result['rps']:>8} rps  p95 {result['latency_ms']['p95']} ms", flush=True)
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="both")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="по умолчанию все сценарии")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="действий на сценарий")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--wishlists", type=int, default=3, help="вишлистов на пользователя")
+    parser.add_argument("--gifts", type=int, default=40, help="подарков в вишлисте")
+    parser.add_argument("--reserved-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="куда записать JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+    return args
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Настройки читаются при импорте приложения, поэтому БД подменяется до него
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'load.db'}"
+        os.environ["ASYNC_DB"] = "false"
+        from app.database import engine
+        from app.main import app
+        from app.services.password_hasher import password_hasher
+
+        started = time.perf_counter()
+        dataset = seed(args)
+        seed_seconds = round(time.perf_counter() - started, 2)
+        queries = QueryCounter(engine)
+
+        modes = ["inprocess", "uvicorn"] if args.mode == "both" else [args.mode]
+        results = []
+        for mode in modes:
+            results.extend(asyncio.run(run_mode(mode, app, dataset, args, queries)))
+        password_hasher.shutdown()
+        engine.dispose()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "dataset": {
+            "users": len(dataset.users),
+            "wishlists": len(dataset.wishlists),
+            "free_gifts": len(dataset.free_gifts),
+            "seed_seconds": seed_seconds,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Стоимость сериализации страницы подарков: прежний путь через ORM и новый через строки Row.
+
+Заполняет in-memory базу вишлистом из N подарков и замеряет по отдельности
+выборку (ORM-объекты / Row), валидацию (model_validate по одной / TypeAdapter
+списка) и запись JSON (response_model + json.dumps / orjson / pydantic-core),
+а также полный запрос GET /gifts/wishlist/{id} через ASGI.
+
+    python -m benchmarks.serialization --gifts 500 --repeat 200
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Callable, List
+
+import orjson
+
+
+def timeit(fn: Callable[[], object], repeat: int) -> dict:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--gifts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = "sqlite://"
+    from fastapi.testclient import TestClient
+    from pydantic import TypeAdapter
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    from app.dependencies import get_session
+    from app.main import app
+    from app.models.gift import Gift
+    from app.repositories.gift_repository import GiftRepository
+    from app.schemas.gift import GiftShort
+    from app.schemas.user import UserCreate
+    from app.schemas.wishlist import WishlistCreate
+    from app.serialization import list_adapter, validate_list
+    from app.services.auth_service import create_access_token
+    from app.services.gift_service import GiftService
+    from app.services.user_service import UserService
+    from app.services.wishlist_service import WishlistService
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = UserService(db).register(UserCreate(login="bench", email="bench@example.com", password="password123"))
+        wishlist = WishlistService(db).create_for_user(user.user_id, WishlistCreate(
+            user_id=user.user_id, name="Big", event_date="2026-01-01",
+        ))
+        rows = [
+            {"name": f"Gift {i}", "description": "Подробное описание подарка " * 4,
+             "price": i * 1.5, "store_link": f"https://shop.example.com/items/{i}"}
+            for i in range(args.gifts)
+        ]
+        GiftService(db).bulk_create_for_user(user.user_id, rows, wishlist_id=wishlist.wishlist_id)
+        user_id, wishlist_id = user.user_id, wishlist.wishlist_id
+
+    db = Session(engine)
+    orm_stmt = select(Gift).where(Gift.wishlist_id == wishlist_id).order_by(Gift.gift_id).limit(args.gifts)
+    repo = GiftRepository(db)
+
+    def load_orm():
+        db.expunge_all()
+        return list(db.execute(orm_stmt).scalars().all())
+
+    def load_rows():
+        return repo.list_by_wishlist(wishlist_id, limit=args.gifts)
+
+    orm_items, row_items = load_orm(), load_rows()
+    response_adapter = TypeAdapter(List[GiftShort])  # так FastAPI проверяет response_model
+    models = validate_list(GiftShort, row_items)
+
+    def legacy_json():
+        content = response_adapter.dump_python(response_adapter.validate_python(models), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    results = {
+        "load": {
+            "orm_entities": timeit(load_orm, args.repeat),
+            "row_tuples": timeit(load_rows, args.repeat),
+        },
+        "validate": {
+            "model_validate_each": timeit(lambda: [GiftShort.model_validate(g) for g in orm_items], args.repeat),
+            "type_adapter_rows": timeit(lambda: validate_list(GiftShort, row_items), args.repeat),
+        },
+        "serialize": {
+            "response_model_json_dumps": timeit(legacy_json, args.repeat),
+            "orjson_dumps": timeit(
+                lambda: orjson.dumps(response_adapter.dump_python(models, mode="json")), args.repeat
+            ),
+            "pydantic_dump_json": timeit(lambda: list_adapter(GiftShort).dump_json(models), args.repeat),
+        },
+    }
+    db.close()
+
+    def override_session():
+        session = Session(engine)
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_session] = override_session
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    url = f"/gifts/wishlist/{wishlist_id}?limit={args.gifts}"
+    assert len(client.get(url, headers=headers).json()) == args.gifts
+    results["request"] = {"get_gifts_page": timeit(lambda: client.get(url, headers=headers), args.repeat)}
+
+    print(json.dumps({"gifts": args.gifts, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
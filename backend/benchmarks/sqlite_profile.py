@@ -0,0 +1,126 @@
+"""Сравнение пропускной способности SQLite с профилем PRAGMA и без него.
+
+Несколько потоков выполняют смесь чтений (подарок по ID, страница подарков)
+и записей (изменение цены, новый подарок) в файловой БД.
+
+    python -m benchmarks.sqlite_profile --threads 8 --seconds 5 --write-ratio 0.2
+"""
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.database import Base, apply_sqlite_profile, sqlite_profile_pragmas
+from app.models.gift import Gift, now_str
+from app.models.user import User
+from app.models.wishlist import Wishlist
+
+
+def seed(engine, wishlists: int, gifts_per_wishlist: int) -> int:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"login": "bench", "email": "bench@example.com", "password_hash": "x"}])
+        conn.execute(insert(Wishlist), [
+            {"user_id": 1, "name": f"Wishlist {i}", "event_date": "2026-01-01", "is_private": 0}
+            for i in range(wishlists)
+        ])
+        conn.execute(insert(Gift), [
+            {"wishlist_id": w + 1, "name": f"Gift {w}-{g}", "status": "available", "created_at": now_str()}
+            for w in range(wishlists)
+            for g in range(gifts_per_wishlist)
+        ])
+    return wishlists * gifts_per_wishlist
+
+
+def worker(engine, stop: threading.Event, write_ratio: float, gift_count: int, wishlists: int, stats: dict, lock):
+    rng = random.Random()
+    reads = writes = errors = 0
+    while not stop.is_set():
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(
+                            update(Gift).where(Gift.gift_id == rng.randint(1, gift_count)).values(price=rng.random() * 100)
+                        )
+                    else:
+                        conn.execute(insert(Gift).values(
+                            wishlist_id=rng.randint(1, wishlists), name="New", status="available", created_at=now_str()
+                        ))
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(select(Gift).where(Gift.gift_id == rng.randint(1, gift_count))).first()
+                    else:
+                        conn.execute(
+                            select(Gift).where(Gift.wishlist_id == rng.randint(1, wishlists)).order_by(Gift.gift_id).limit(50)
+                        ).all()
+                reads += 1
+        except OperationalError:
+            errors += 1  # database is locked
+    with lock:
+        stats["reads"] += reads
+        stats["writes"] += writes
+        stats["errors"] += errors
+
+
+def run(profile: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.threads,
+        )
+        if profile:
+            apply_sqlite_profile(engine)
+        gift_count = seed(engine, args.wishlists, args.gifts)
+
+        stats = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=worker, args=(engine, stop, args.write_ratio, gift_count, args.wishlists, stats, lock))
+            for _ in range(args.threads)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    total = stats["reads"] + stats["writes"]
+    return {
+        "profile": profile,
+        "ops_per_sec": round(total / elapsed, 1),
+        "reads_per_sec": round(stats["reads"] / elapsed, 1),
+        "writes_per_sec": round(stats["writes"] / elapsed, 1),
+        "locked_errors": stats["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--wishlists", type=int, default=200)
+    parser.add_argument("--gifts", type=int, default=50, help="подарков в каждом вишлисте")
+    args = parser.parse_args()
+
+    results = [run(False, args), run(True, args)]
+    print(json.dumps({"pragmas": sqlite_profile_pragmas(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
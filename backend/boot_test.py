@@ -0,0 +1,122 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+import app.boot as boot_module
+from app.boot import SchemaVersionError, boot, prewarm_pool, verify_schema, warm_schemas
+from app.config import settings
+from app.main import app
+from app.migrations import head, upgrade
+from app.services.link_filter import unique_link_filter
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'boot.db'}", pool_size=5, max_overflow=0)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def production(monkeypatch, engine):
+    """Боевой режим поверх временной базы"""
+    monkeypatch.setattr(settings, "production", True)
+    monkeypatch.setattr(boot_module, "engine", engine)
+    yield engine
+    unique_link_filter.clear()
+
+
+class TestVerifySchema:
+    """Проверка версии схемы без DDL"""
+
+    def test_current_schema(self, engine):
+        """✅ Позитив: схема в последней версии"""
+        upgrade(engine)
+
+        assert verify_schema(engine) == head()
+
+    def test_empty_database(self, engine):
+        """❌ Негатив: таблицы schema_version нет"""
+        with pytest.raises(SchemaVersionError, match="not initialized"):
+            verify_schema(engine)
+
+    def test_outdated_schema(self, engine):
+        """❌ Негатив: версия отстаёт от последней миграции"""
+        upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM schema_version WHERE version = :v"), {"v": head()})
+
+        with pytest.raises(SchemaVersionError, match="does not match"):
+            verify_schema(engine)
+
+
+class TestPrewarm:
+    """Прогрев воркера"""
+
+    def test_pool_connections_are_opened(self, engine):
+        """✅ Позитив: соединения открыты заранее и возвращены в пул"""
+        assert prewarm_pool(engine, 3) == 3
+        assert engine.pool.checkedin() == 3
+        assert engine.pool.checkedout() == 0
+
+    def test_pool_size_limits_prewarm(self, engine):
+        """✅ Позитив: больше размера пула соединения не открываются"""
+        assert prewarm_pool(engine, 50) == 5
+
+    def test_schemas_are_complete(self):
+        """✅ Позитив: все модели pydantic готовы к валидации"""
+        assert warm_schemas() > 0
+
+
+class TestBoot:
+    """Запуск воркера в боевом режиме"""
+
+    def test_production_boot_skips_ddl(self, production):
+        """✅ Позитив: в боевом режиме база проверяется, но не меняется"""
+        upgrade(production)
+        statements = []
+        with production.connect() as conn:
+            conn.connection.dbapi_connection.set_trace_callback(statements.append)
+
+        report = boot()
+
+        assert {"import", "schema", "link_filter", "db_pool", "password_hasher", "schemas"} <= set(report.phases)
+        assert unique_link_filter.ready
+        assert report.total >= report.phases["import"]
+        assert not [s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER", "DROP"))]
+
+    def test_production_boot_fails_on_missing_schema(self, production):
+        """❌ Негатив: воркер не стартует на неподготовленной базе"""
+        with pytest.raises(SchemaVersionError):
+            with TestClient(app):
+                pass
+
+    def test_lifespan_reports_boot_metrics(self, production):
+        """✅ Позитив: время холодного старта видно в /metrics"""
+        upgrade(production)
+
+        with TestClient(app) as client:
+            body = client.get("/metrics").text
+
+        assert 'app_boot_seconds{phase="schema"}' in body
+        assert 'app_boot_seconds{phase="total"}' in body
+
+
+class TestLazyImports:
+    """Тяжёлые зависимости не загружаются при импорте приложения"""
+
+    def test_password_hashing_is_not_imported_eagerly(self):
+        """✅ Позитив: passlib и argon2 загружаются при первом хешировании"""
+        code = (
+            "import sys, app.main; "
+            "print(sorted({m.split('.')[0] for m in sys.modules} & {'passlib', 'argon2', 'bcrypt'}))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
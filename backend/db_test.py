@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, apply_sqlite_profile, pool_options, sqlite_profile_pragmas
+from app.schemas.gift import GiftCreate
+from app.schemas.user import UserCreate
+from app.schemas.wishlist import WishlistCreate
+from app.services.gift_service import GiftService
+from app.services.reservation_service import ReservationService
+from app.services.user_service import UserService
+from app.services.wishlist_service import WishlistService
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Файловая БД с применённым профилем SQLite"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}", connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestSqliteProfile:
+    """Тесты PRAGMA, выполняемых при подключении"""
+
+    def test_pragmas_applied_on_connect(self, engine):
+        """✅ Позитив: каждое соединение получает WAL, busy_timeout и внешние ключи"""
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == sqlite_profile_pragmas()["busy_timeout"]
+
+    def test_foreign_keys_enforced(self, engine):
+        """❌ Негатив: подарок в несуществующем вишлисте отклоняется самой БД"""
+        with engine.connect() as conn:
+            with pytest.raises(IntegrityError):
+                conn.execute(text(
+                    "INSERT INTO gifts (wishlist_id, name, status, created_at) "
+                    "VALUES (999, 'Orphan', 'available', '2025-01-01 00:00:00')"
+                ))
+
+    def test_cascading_deletes_with_foreign_keys(self, engine):
+        """✅ Позитив: удаление пользователя с вишлистами, подарками и бронями проходит"""
+        db = sessionmaker(bind=engine)()
+        owner = UserService(db).register(UserCreate(login="owner", email="owner@example.com", password="password123"))
+        guest = UserService(db).register(UserCreate(login="guest", email="guest@example.com", password="password123"))
+        wishlist = WishlistService(db).create_for_user(owner.user_id, WishlistCreate(
+            user_id=owner.user_id, name="Birthday", event_date="2025-12-31"
+        ))
+        gift = GiftService(db).create_for_user(owner.user_id, GiftCreate(wishlist_id=wishlist.wishlist_id, name="Book"))
+        ReservationService(db).reserve_gift(guest.user_id, gift.gift_id)
+
+        UserService(db).delete_user(owner.user_id)
+
+        assert db.execute(text("SELECT COUNT(*) FROM gifts")).scalar() == 0
+        assert db.execute(text("SELECT COUNT(*) FROM reservations")).scalar() == 0
+        db.close()
+
+    def test_memory_database_has_no_pool_options(self):
+        assert pool_options("sqlite://") == {}
+        assert pool_options("sqlite:///:memory:") == {}
+        assert "pool_size" in pool_options("sqlite:///./wishlist.db")
@@ -1,5 +1,5 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
@@ -9,6 +9,7 @@ from app.schemas.gift import GiftCreate, GiftUpdate
 from app.services.user_service import UserService
 from app.services.wishlist_service import WishlistService
 from app.services.gift_service import GiftService
+from app.services.reservation_service import ReservationConflict, ReservationService
 
 
 @pytest.fixture
@@ -312,6 +313,44 @@ class TestGiftRetrieval:
         assert len(second_page) == 2
         assert first_page[0].gift_id != second_page[0].gift_id
     
+    def test_list_gifts_with_cursor(self, db_session, test_user, test_wishlist):
+        """✅ Позитив: Постраничный обход подарков по курсору"""
+        from app.repositories.pagination import next_cursor
+        service = GiftService(db_session)
+        
+        for i in range(5):
+            service.create_for_user(test_user.user_id, GiftCreate(
+                wishlist_id=test_wishlist.wishlist_id,
+                name=f"Gift {i}"
+            ))
+        
+        seen = []
+        cursor = None
+        while True:
+            page = service.list_for_wishlist(
+                owner_id=test_user.user_id,
+                wishlist_id=test_wishlist.wishlist_id,
+                limit=2,
+                cursor=cursor
+            )
+            seen.extend(gift.name for gift in page)
+            cursor = next_cursor(page, 2, "gift_id")
+            if cursor is None:
+                break
+        
+        assert seen == [f"Gift {i}" for i in range(5)]
+    
+    def test_list_gifts_with_invalid_cursor(self, db_session, test_user, test_wishlist):
+        """❌ Негатив: Повреждённый курсор"""
+        service = GiftService(db_session)
+        
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            service.list_for_wishlist(
+                owner_id=test_user.user_id,
+                wishlist_id=test_wishlist.wishlist_id,
+                cursor="not-a-cursor"
+            )
+    
     def test_list_gifts_with_status_filter(self, db_session, test_user, test_wishlist):
         """✅ Позитив: Фильтрация подарков по статусу"""
         service = GiftService(db_session)
@@ -389,6 +428,28 @@ class TestGiftRetrieval:
         with pytest.raises(PermissionError, match="Access denied to wishlist"):
             service.get_for_owner(created_gift.gift_id, another_user.user_id)
     
+    def test_owner_fetch_is_single_query(self, db_session, test_user, another_user, created_gift):
+        """✅ Позитив: подарок и проверка владельца — один запрос, и для владельца, и для чужого"""
+        service = GiftService(db_session)
+        gift_id, owner_id, stranger_id = created_gift.gift_id, test_user.user_id, another_user.user_id
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            gift = service.get_for_owner(gift_id, owner_id)
+            with pytest.raises(PermissionError):
+                service.get_for_owner(gift_id, stranger_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+        assert gift.gift_id == gift_id
+        assert len(statements) == 2
+        assert all("JOIN wishlists" in statement for statement in statements)
+
     def test_list_gifts_from_another_user_wishlist(self, db_session, test_user, another_user, test_wishlist):
         """❌ Негатив: Попытка получить список подарков чужого вишлиста"""
         service = GiftService(db_session)
@@ -621,6 +682,19 @@ class TestGiftStatusManagement:
                 "reserved"
             )
 
+    def test_release_gift_with_active_reservation(self, db_session, test_user, another_user, created_gift):
+        """❌ Негатив: владелец не может вернуть в 'available' подарок с активной бронью"""
+        ReservationService(db_session).reserve_gift(another_user.user_id, created_gift.gift_id)
+        service = GiftService(db_session)
+
+        with pytest.raises(ReservationConflict, match="active reservation"):
+            service.change_status_for_owner(created_gift.gift_id, test_user.user_id, "available")
+        with pytest.raises(ReservationConflict, match="active reservation"):
+            service.update_for_owner(created_gift.gift_id, test_user.user_id, GiftUpdate(status="available"))
+
+        db_session.refresh(created_gift)
+        assert created_gift.status == "reserved"
+
 
 class TestGiftDeletion:
     """Тесты удаления подарков"""
@@ -733,3 +807,71 @@ class TestGiftValidation:
                 name="Gift",
                 status="pending"  # не в списке allowed values
             )
+
+
+class TestGiftBulkCreate:
+    """Тесты пакетного создания подарков"""
+
+    def test_bulk_create_many_rows(self, db_session, test_user, test_wishlist):
+        """✅ Позитив: 200 строк вставляются одной пачкой за несколько запросов"""
+        user_id, wishlist_id = test_user.user_id, test_wishlist.wishlist_id
+        rows = [{"name": f"Gift {i}", "price": i} for i in range(200)]
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            result = GiftService(db_session).bulk_create_for_user(user_id, rows, wishlist_id=wishlist_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert result["created"] == 200
+        assert result["failed"] == 0
+        assert len(statements) <= 3
+        gifts = GiftService(db_session).list_for_wishlist(user_id, wishlist_id, limit=500)
+        assert [g.gift_id for g in gifts] == [r["gift_id"] for r in result["results"]]
+        assert gifts[10].name == "Gift 10"
+
+    def test_bulk_create_reports_invalid_rows(self, db_session, test_user, test_wishlist):
+        """❌ Негатив: невалидные строки пропускаются, остальные создаются"""
+        rows = [
+            {"wishlist_id": test_wishlist.wishlist_id, "name": "Good"},
+            {"wishlist_id": test_wishlist.wishlist_id, "name": ""},
+            {"wishlist_id": test_wishlist.wishlist_id, "name": "Cheap", "price": -1},
+            "not an object",
+        ]
+
+        result = GiftService(db_session).bulk_create_for_user(test_user.user_id, rows)
+
+        assert result["created"] == 1
+        assert result["results"][0]["gift_id"] is not None
+        assert result["results"][1]["error"].startswith("name:")
+        assert result["results"][2]["error"].startswith("price:")
+        assert result["results"][3]["error"] == "Row must be an object"
+
+    def test_bulk_create_checks_wishlist_owner(self, db_session, test_user, another_user, test_wishlist):
+        """❌ Негатив: строки с чужим или несуществующим вишлистом отклоняются"""
+        rows = [
+            {"wishlist_id": test_wishlist.wishlist_id, "name": "Foreign"},
+            {"wishlist_id": 99999, "name": "Lost"},
+        ]
+
+        result = GiftService(db_session).bulk_create_for_user(another_user.user_id, rows)
+
+        assert result["created"] == 0
+        assert [r["error"] for r in result["results"]] == ["Access denied to wishlist", "Wishlist not found"]
+
+    def test_bulk_create_row_limit(self, db_session, test_user, test_wishlist, monkeypatch):
+        """❌ Негатив: слишком большой пакет отклоняется целиком"""
+        from app.config import settings
+        monkeypatch.setattr(settings, "gift_bulk_max_rows", 2)
+
+        with pytest.raises(ValueError, match="Too many rows"):
+            GiftService(db_session).bulk_create_for_user(
+                test_user.user_id,
+                [{"name": "A"}, {"name": "B"}, {"name": "C"}],
+                wishlist_id=test_wishlist.wishlist_id,
+            )
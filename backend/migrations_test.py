@@ -0,0 +1,221 @@
+import pytest
+from pathlib import Path
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.migrations import MIGRATIONS, current_version, head, upgrade
+from app.migrations.check import check_schema, full_scans
+from app.repositories.gift_repository import GiftRepository
+from app.repositories.reservation_repository import ReservationRepository
+from app.repositories.wishlist_repository import WishlistRepository
+
+# Схема до появления миграций: так её создавал create_all старых моделей
+LEGACY_SCHEMA = """
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY, login TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL, created_at TEXT NOT NULL
+);
+CREATE TABLE wishlists (
+    wishlist_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(user_id),
+    name TEXT NOT NULL, event_date TEXT NOT NULL, is_private INTEGER DEFAULT 0,
+    unique_link TEXT UNIQUE, created_at TEXT NOT NULL
+);
+CREATE TABLE gifts (
+    gift_id INTEGER PRIMARY KEY, wishlist_id INTEGER NOT NULL REFERENCES wishlists(wishlist_id),
+    name TEXT NOT NULL, description TEXT, price REAL, store_link TEXT,
+    status TEXT DEFAULT 'available', created_at TEXT NOT NULL
+);
+CREATE TABLE reservations (
+    reservation_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(user_id),
+    gift_id INTEGER NOT NULL REFERENCES gifts(gift_id), reserved_date TEXT NOT NULL, cancelled_at TEXT,
+    CONSTRAINT uq_reservations_user_gift UNIQUE (user_id, gift_id)
+);
+CREATE INDEX ix_reservations_user_id ON reservations (user_id);
+CREATE INDEX ix_reservations_gift_id ON reservations (gift_id);
+
+INSERT INTO users VALUES (1, 'owner', 'x', 'owner@example.com', '2025-01-01'), (2, 'friend', 'x', 'friend@example.com', '2025-01-01');
+INSERT INTO wishlists VALUES (1, 1, 'Birthday', '2026-01-01', 0, 'link-1', '2025-01-01');
+INSERT INTO gifts VALUES
+    (1, 1, 'Book', NULL, 10, NULL, 'available', '2025-01-01'),
+    (2, 1, 'Lamp', NULL, 25, NULL, 'reserved', '2025-01-01'),
+    (3, 1, 'Pen', NULL, NULL, NULL, 'available', '2025-01-01');
+INSERT INTO reservations VALUES (1, 2, 2, '2025-01-02', NULL);
+"""
+
+# Триггеры статуса подарка из старого shema.sql
+LEGACY_TRIGGERS = """
+CREATE TRIGGER trigger_reserve_gift BEFORE INSERT ON reservations FOR EACH ROW WHEN NEW.cancelled_at IS NULL
+BEGIN
+    SELECT CASE WHEN (SELECT status FROM gifts WHERE gift_id = NEW.gift_id) != 'available'
+        THEN RAISE(ABORT, 'Gift is already reserved') END;
+    UPDATE gifts SET status = 'reserved' WHERE gift_id = NEW.gift_id;
+END;
+CREATE TRIGGER trigger_cancel_reservation AFTER UPDATE OF cancelled_at ON reservations FOR EACH ROW
+WHEN NEW.cancelled_at IS NOT NULL AND OLD.cancelled_at IS NULL
+BEGIN
+    UPDATE gifts SET status = 'available' WHERE gift_id = OLD.gift_id;
+END;
+CREATE TRIGGER trigger_reactivate_reservation AFTER UPDATE OF cancelled_at ON reservations FOR EACH ROW
+WHEN NEW.cancelled_at IS NULL AND OLD.cancelled_at IS NOT NULL
+BEGIN
+    SELECT CASE WHEN (SELECT status FROM gifts WHERE gift_id = NEW.gift_id) != 'available'
+        THEN RAISE(ABORT, 'Gift is already reserved by someone else') END;
+    UPDATE gifts SET status = 'reserved' WHERE gift_id = NEW.gift_id;
+END;
+"""
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def legacy_engine(engine):
+    with engine.begin() as conn:
+        conn.connection.dbapi_connection.executescript(LEGACY_SCHEMA)
+    return engine
+
+
+def index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+class TestUpgrade:
+    """Применение миграций"""
+
+    def test_fresh_database_is_stamped_with_head(self, engine):
+        """✅ Позитив: новая база создаётся по моделям и сразу получает последнюю версию"""
+        assert upgrade(engine) == []
+
+        with engine.connect() as conn:
+            assert current_version(conn) == head() == MIGRATIONS[-1].version
+            assert check_schema(conn) == []
+
+    def test_legacy_database_is_migrated(self, legacy_engine):
+        """✅ Позитив: старая база получает столбцы счётчиков, индексы и заполненные счётчики"""
+        applied = upgrade(legacy_engine)
+
+        assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+        with legacy_engine.connect() as conn:
+            assert current_version(conn) == head()
+            assert check_schema(conn) == []
+            row = conn.execute(text(
+                "SELECT gift_count, reserved_count, available_total_price, version FROM wishlists"
+            )).one()
+        assert tuple(row) == (3, 1, 10.0, 1)
+        names = index_names(legacy_engine, "reservations")
+        assert "ix_reservations_user_id_cancelled_at" in names
+        assert "ix_reservations_user_id" not in names
+        assert "ix_gifts_wishlist_id" not in index_names(legacy_engine, "gifts")
+
+    def test_covered_gift_index_is_dropped_after_migration_2(self, legacy_engine):
+        """✅ Позитив: одиночный индекс gifts(wishlist_id), созданный миграцией 2, удаляется"""
+        upgrade(legacy_engine)
+        with legacy_engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_gifts_wishlist_id ON gifts (wishlist_id)"))
+            conn.execute(text("DELETE FROM schema_version WHERE version > 2"))
+
+        upgrade(legacy_engine)
+
+        assert "ix_gifts_wishlist_id" not in index_names(legacy_engine, "gifts")
+        assert "ix_gifts_wishlist_id_status" in index_names(legacy_engine, "gifts")
+
+    def test_upgrade_is_idempotent(self, legacy_engine):
+        """✅ Позитив: повторный запуск ничего не применяет"""
+        upgrade(legacy_engine)
+
+        assert upgrade(legacy_engine) == []
+
+    def test_duplicate_active_reservations_are_resolved(self, legacy_engine):
+        """✅ Позитив: из двух активных броней подарка остаётся самая ранняя, статус и счётчики сверяются"""
+        with legacy_engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO reservations (reservation_id, user_id, gift_id, reserved_date) VALUES "
+                "(2, 1, 1, '2025-01-04'), (3, 2, 1, '2025-01-03')"
+            ))
+
+        upgrade(legacy_engine)
+
+        with legacy_engine.connect() as conn:
+            active = conn.execute(text(
+                "SELECT reservation_id FROM reservations WHERE gift_id = 1 AND cancelled_at IS NULL"
+            )).scalars().all()
+            status = conn.execute(text("SELECT status FROM gifts WHERE gift_id = 1")).scalar()
+            row = conn.execute(text("SELECT gift_count, reserved_count, available_total_price FROM wishlists")).one()
+        assert active == [3]
+        assert status == "reserved"
+        assert tuple(row) == (3, 2, 0.0)
+
+    def test_legacy_reservation_triggers_are_dropped(self, legacy_engine):
+        """✅ Позитив: триггеры статуса из старого shema.sql удаляются, бронь проходит"""
+        with legacy_engine.begin() as conn:
+            conn.connection.dbapi_connection.executescript(LEGACY_TRIGGERS)
+
+        upgrade(legacy_engine)
+
+        with legacy_engine.connect() as conn:
+            triggers = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        assert not triggers & {"trigger_reserve_gift", "trigger_cancel_reservation", "trigger_reactivate_reservation"}
+        with Session(bind=legacy_engine) as db:
+            assert ReservationRepository(db).reserve(2, 1) is not None
+            db.commit()
+
+    def test_schema_file_matches_head(self, engine):
+        """✅ Позитив: shema.sql соответствует последней миграции"""
+        script = (Path(__file__).parent / "shema.sql").read_text(encoding="utf-8")
+        with engine.begin() as conn:
+            conn.connection.dbapi_connection.executescript(script)
+
+        assert upgrade(engine) == []
+        with engine.connect() as conn:
+            assert current_version(conn) == head()
+            assert check_schema(conn) == []
+
+
+class TestIndexCheck:
+    """Проверка индексов под фильтры"""
+
+    def test_legacy_schema_is_flagged(self, legacy_engine):
+        """❌ Негатив: фильтры без индексов попадают в отчёт"""
+        with legacy_engine.connect() as conn:
+            problems = check_schema(conn)
+
+        assert "wishlists(user_id) is filtered on but not indexed" in problems
+        assert "gifts(wishlist_id, status) is filtered on but not indexed" in problems
+
+    def test_active_reservation_is_unique_per_gift(self, legacy_engine):
+        """❌ Негатив: вторая активная бронь того же подарка нарушает частичный индекс"""
+        upgrade(legacy_engine)
+
+        with pytest.raises(IntegrityError):
+            with legacy_engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO reservations (user_id, gift_id, reserved_date) VALUES (1, 2, '2025-01-03')"
+                ))
+
+    def test_list_queries_use_indexes(self, legacy_engine):
+        """✅ Позитив: списки подарков, вишлистов и броней не просматривают таблицы целиком"""
+        upgrade(legacy_engine)
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(legacy_engine, "before_cursor_execute", on_execute)
+        with Session(bind=legacy_engine) as db:
+            GiftRepository(db).list_by_wishlist(1, status="available")
+            GiftRepository(db).list_by_wishlist(1)
+            WishlistRepository(db).list_by_user(1)
+            ReservationRepository(db).list_by_user(2, only_active=True)
+            ReservationRepository(db).list_by_gift(2, only_active=True)
+        event.remove(legacy_engine, "before_cursor_execute", on_execute)
+
+        tables = ("users", "wishlists", "gifts", "reservations")
+        with legacy_engine.connect() as conn:
+            scans = [line for statement, params in statements for line in full_scans(conn, statement, params, tables)]
+        assert len(statements) == 5
+        assert scans == []
@@ -1,15 +1,21 @@
+import sqlite3
+import threading
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
+from app.models.wishlist import Wishlist
+from app.repositories.reservation_repository import ReservationRepository
 from app.schemas.user import UserCreate
 from app.schemas.wishlist import WishlistCreate
 from app.schemas.gift import GiftCreate
 from app.services.user_service import UserService
 from app.services.wishlist_service import WishlistService
 from app.services.gift_service import GiftService
-from app.services.reservation_service import ReservationService
+from app.services.reservation_service import ReservationConflict, ReservationService
 
 
 @pytest.fixture
@@ -168,6 +174,29 @@ class TestReservationList:
         assert len(reservations) == 1
         assert reservations[0].gift_id == owner_gift.gift_id
 
+    def test_list_reservations_for_gift_two_queries(self, db_session, owner_user, owner_gift, reservation_service):
+        """✅ Позитив: проверка владельца — один запрос с JOIN, ещё один — сами резервации"""
+        gift_id, owner_id = owner_gift.gift_id, owner_user.user_id
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            reservation_service.list_for_gift(gift_id=gift_id, owner_id=owner_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+        assert len(statements) == 2
+        assert "JOIN wishlists" in statements[0]
+
+    def test_list_reservations_for_missing_gift(self, db_session, owner_user, reservation_service):
+        """❌ Негатив: несуществующий подарок отличается от чужого"""
+        with pytest.raises(ValueError, match="Gift not found"):
+            reservation_service.list_for_gift(gift_id=99999, owner_id=owner_user.user_id)
+
     def test_list_reservations_for_gift_not_owner_forbidden(self, db_session, owner_gift, other_user, reservation_service):
         """❌ Негатив: чужой пользователь пытается посмотреть резервации чужого подарка"""
         with pytest.raises(PermissionError):
@@ -204,6 +233,25 @@ class TestReservationCancel:
         )
         assert cancelled_again.cancelled_at == cancelled.cancelled_at
 
+    def test_cancel_reads_reservation_once(self, db_session, owner_gift, other_user, reservation_service):
+        """✅ Позитив: отмена читает бронь вместе с wishlist_id одним SELECT, без подгрузки подарка"""
+        reservation_id = reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id).reservation_id
+        user_id = other_user.user_id
+        db_session.expunge_all()
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lstrip().split()[0].upper())
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            reservation_service.cancel_for_user(reservation_id, user_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert statements.count("SELECT") == 1
+
     def test_cancel_reservation_not_owner_forbidden(self, db_session, owner_gift, owner_user, other_user, reservation_service):
         """❌ Негатив: один пользователь пытается отменить бронь другого"""
         reservation = reservation_service.reserve_gift(
@@ -264,3 +312,307 @@ class TestReservationGet:
                 reservation_id=99999,
                 user_id=other_user.user_id,
             )
+
+
+class TestReservationGiftStatus:
+    """Тесты перехода статуса подарка при бронировании"""
+
+    def test_reserve_and_cancel_switch_status(self, db_session, owner_gift, other_user, reservation_service):
+        """✅ Позитив: бронь переводит подарок в reserved, отмена — обратно в available"""
+        reservation = reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+        db_session.refresh(owner_gift)
+        assert owner_gift.status == "reserved"
+
+        reservation_service.cancel_for_user(reservation.reservation_id, other_user.user_id)
+        db_session.refresh(owner_gift)
+        assert owner_gift.status == "available"
+
+    def test_reserve_again_after_cancel(self, db_session, owner_gift, other_user, reservation_service):
+        """✅ Позитив: повторная бронь реактивирует отменённую запись"""
+        first = reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+        reservation_service.cancel_for_user(first.reservation_id, other_user.user_id)
+
+        second = reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+
+        assert second.reservation_id == first.reservation_id
+        assert second.cancelled_at is None
+
+    def test_reserved_gift_conflict(self, db_session, owner_gift, other_user, reservation_service):
+        """❌ Негатив: подарок, забронированный другим пользователем"""
+        reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+        third = UserService(db_session).register(UserCreate(
+            login="third",
+            email="third@example.com",
+            password="password123"
+        ))
+
+        with pytest.raises(ReservationConflict, match="Gift is already reserved"):
+            reservation_service.reserve_gift(third.user_id, owner_gift.gift_id)
+
+    def test_private_gift_forbidden(self, db_session, owner_user, other_user, reservation_service):
+        """❌ Негатив: подарок из чужого приватного вишлиста"""
+        wishlist = WishlistService(db_session).create_for_user(owner_user.user_id, WishlistCreate(
+            user_id=owner_user.user_id,
+            name="Private",
+            event_date="2025-12-31",
+            is_private=True
+        ))
+        gift = GiftService(db_session).create_for_user(owner_user.user_id, GiftCreate(
+            wishlist_id=wishlist.wishlist_id,
+            name="Secret"
+        ))
+
+        with pytest.raises(PermissionError):
+            reservation_service.reserve_gift(other_user.user_id, gift.gift_id)
+
+    def test_deleting_guest_releases_gift(self, db_session, owner_gift, owner_wishlist, other_user, reservation_service):
+        """✅ Позитив: удаление гостя освобождает его брони, подарок снова можно забронировать"""
+        reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+
+        UserService(db_session).delete_user(other_user.user_id)
+
+        db_session.refresh(owner_gift)
+        db_session.refresh(owner_wishlist)
+        assert owner_gift.status == "available"
+        assert owner_wishlist.reserved_count == 0
+        assert owner_wishlist.available_total_price == 100.0
+        third = UserService(db_session).register(UserCreate(
+            login="third",
+            email="third@example.com",
+            password="password123"
+        ))
+        reservation = reservation_service.reserve_gift(third.user_id, owner_gift.gift_id)
+        assert reservation.cancelled_at is None
+
+    def test_active_reservation_with_available_status(self, db_session, owner_gift, other_user, reservation_service):
+        """❌ Негатив: статус 'available' при активной брони — конфликт, а не ошибка БД"""
+        reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+        db_session.execute(text("UPDATE gifts SET status = 'available'"))
+        db_session.commit()
+        third = UserService(db_session).register(UserCreate(
+            login="third",
+            email="third@example.com",
+            password="password123"
+        ))
+
+        with pytest.raises(ReservationConflict, match="Gift is already reserved"):
+            reservation_service.reserve_gift(third.user_id, owner_gift.gift_id)
+        with pytest.raises(ReservationConflict, match="Gift is already reserved"):
+            reservation_service.reserve_gifts(third.user_id, [owner_gift.gift_id])
+
+    def test_other_integrity_error_is_not_conflict(self, db_session, owner_gift, other_user, reservation_service, monkeypatch):
+        """❌ Негатив: нарушение не уникальности брони (например, внешнего ключа) не выдаётся за конфликт"""
+        def broken(self, *args):
+            raise IntegrityError("INSERT INTO reservations", {}, sqlite3.IntegrityError("FOREIGN KEY constraint failed"))
+
+        monkeypatch.setattr(ReservationRepository, "reserve", broken)
+        monkeypatch.setattr(ReservationRepository, "reserve_many", broken)
+
+        with pytest.raises(IntegrityError):
+            reservation_service.reserve_gift(other_user.user_id, owner_gift.gift_id)
+        with pytest.raises(IntegrityError):
+            reservation_service.reserve_gifts(other_user.user_id, [owner_gift.gift_id])
+
+    def test_reserve_statement_count(self, db_session, owner_gift, other_user, reservation_service):
+        """✅ Позитив: успешная бронь — условный UPDATE, счётчики вишлиста и upsert, без SELECT"""
+        gift_id, user_id = owner_gift.gift_id, other_user.user_id
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            reservation_service.reserve_gift(user_id, gift_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+        assert len(statements) == 3
+        assert not any(st.lstrip().startswith("SELECT") for st in statements)
+
+
+class TestReservationBatch:
+    """Тесты пакетной брони нескольких подарков"""
+
+    @pytest.fixture
+    def gifts(self, db_session, owner_user, owner_wishlist):
+        service = GiftService(db_session)
+        return [
+            service.create_for_user(
+                owner_user.user_id,
+                GiftCreate(wishlist_id=owner_wishlist.wishlist_id, name=f"Gift {i}", price=10.0),
+            ).gift_id
+            for i in range(3)
+        ]
+
+    def _counters(self, db_session, wishlist_id):
+        db_session.expire_all()
+        wishlist = db_session.get(Wishlist, wishlist_id)
+        return wishlist.reserved_count, wishlist.available_total_price
+
+    def test_reserve_all(self, db_session, owner_wishlist, other_user, gifts, reservation_service):
+        """✅ Позитив: все подарки бронируются, счётчики вишлиста сходятся"""
+        wishlist_id, user_id = owner_wishlist.wishlist_id, other_user.user_id
+
+        result = reservation_service.reserve_gifts(user_id, gifts)
+
+        assert result["reserved"] == 3 and result["failed"] == 0
+        assert [r["reservation"].gift_id for r in result["results"]] == gifts
+        assert self._counters(db_session, wishlist_id) == (3, 0.0)
+
+    def test_single_commit_and_constant_statements(self, db_session, other_user, gifts, reservation_service):
+        """✅ Позитив: один COMMIT и число запросов не зависит от числа подарков"""
+        user_id = other_user.user_id
+        statements, commits = [], []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def on_commit(conn):
+            commits.append(conn)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        event.listen(engine, "commit", on_commit)
+        try:
+            reservation_service.reserve_gifts(user_id, gifts)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+            event.remove(engine, "commit", on_commit)
+
+        # Состояние подарков, захват, счётчики одного вишлиста и upsert броней
+        assert len(statements) == 4
+        assert len(commits) == 1
+
+    def test_per_item_results(self, db_session, owner_user, owner_wishlist, other_user, gifts, reservation_service):
+        """❌ Негатив: занятые, свои, повторные и несуществующие подарки не мешают остальным"""
+        user_id = other_user.user_id
+        reservation_service.reserve_gift(user_id, gifts[0])
+        own = WishlistService(db_session).create_for_user(
+            user_id, WishlistCreate(user_id=user_id, name="Mine", event_date="2025-12-31"),
+        )
+        own_gift = GiftService(db_session).create_for_user(
+            user_id, GiftCreate(wishlist_id=own.wishlist_id, name="Mine"),
+        ).gift_id
+
+        result = reservation_service.reserve_gifts(user_id, [gifts[0], gifts[1], gifts[1], own_gift, 99999])
+
+        assert [r["error"] for r in result["results"]] == [
+            "Gift is already reserved by this user",
+            None,
+            "Duplicate gift in batch",
+            "Cannot reserve your own gift",
+            "Gift not found",
+        ]
+        assert result["reserved"] == 1 and result["failed"] == 4
+
+    def test_private_wishlist_denied(self, db_session, owner_user, other_user, gifts, reservation_service):
+        """❌ Негатив: подарки чужого приватного вишлиста не бронируются"""
+        user_id = other_user.user_id
+        private = WishlistService(db_session).create_for_user(
+            owner_user.user_id,
+            WishlistCreate(user_id=owner_user.user_id, name="Private", event_date="2025-12-31", is_private=True),
+        )
+        hidden = GiftService(db_session).create_for_user(
+            owner_user.user_id, GiftCreate(wishlist_id=private.wishlist_id, name="Hidden"),
+        ).gift_id
+
+        result = reservation_service.reserve_gifts(user_id, [gifts[0], hidden])
+
+        assert [r["error"] for r in result["results"]] == [None, "Access denied to gift"]
+
+    def test_atomic_reserves_nothing_on_error(self, db_session, owner_wishlist, other_user, gifts, reservation_service):
+        """❌ Негатив: в режиме atomic одна ошибка отменяет весь пакет"""
+        wishlist_id, user_id = owner_wishlist.wishlist_id, other_user.user_id
+
+        result = reservation_service.reserve_gifts(user_id, [gifts[0], 99999], atomic=True)
+
+        assert result["reserved"] == 0
+        assert [r["error"] for r in result["results"]] == [
+            "Not reserved: another gift in the batch failed",
+            "Gift not found",
+        ]
+        assert self._counters(db_session, wishlist_id) == (0, 30.0)
+        assert reservation_service.list_for_user(user_id) == []
+
+    def test_atomic_rolls_back_lost_race(self, db_session, owner_wishlist, other_user, gifts, reservation_service, monkeypatch):
+        """❌ Негатив: если подарок заняли между проверкой и UPDATE, atomic-пакет откатывается"""
+        wishlist_id, user_id = owner_wishlist.wishlist_id, other_user.user_id
+        reserve_many = ReservationRepository.reserve_many
+        monkeypatch.setattr(
+            ReservationRepository, "reserve_many",
+            lambda self, user_id, gift_ids: reserve_many(self, user_id, gift_ids[1:]),
+        )
+
+        result = reservation_service.reserve_gifts(user_id, gifts, atomic=True)
+
+        assert result["reserved"] == 0
+        assert result["results"][0]["error"] == "Gift is already reserved"
+        assert self._counters(db_session, wishlist_id) == (0, 30.0)
+
+    def test_too_many_gifts(self, other_user, reservation_service):
+        """❌ Негатив: размер пакета ограничен настройкой"""
+        with pytest.raises(ValueError, match="Too many gifts"):
+            reservation_service.reserve_gifts(other_user.user_id, list(range(1, 1000)))
+
+
+class TestConcurrentReservation:
+    """Стресс-тест: много пользователей одновременно бронируют один подарок"""
+
+    def test_only_one_reservation_wins(self, tmp_path):
+        """✅ Позитив: из конкурентных запросов успешен ровно один"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'race.db'}",
+            connect_args={"check_same_thread": False, "timeout": 30},
+        )
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(bind=engine)
+
+        with SessionLocal() as db:
+            owner = UserService(db).register(UserCreate(
+                login="owner",
+                email="owner@example.com",
+                password="password123"
+            ))
+            wishlist = WishlistService(db).create_for_user(owner.user_id, WishlistCreate(
+                user_id=owner.user_id,
+                name="Race",
+                event_date="2025-12-31"
+            ))
+            gift_id = GiftService(db).create_for_user(owner.user_id, GiftCreate(
+                wishlist_id=wishlist.wishlist_id,
+                name="Last one"
+            )).gift_id
+            user_ids = [
+                UserService(db).register(UserCreate(
+                    login=f"user{i}",
+                    email=f"user{i}@example.com",
+                    password="password123"
+                )).user_id
+                for i in range(16)
+            ]
+
+        barrier = threading.Barrier(len(user_ids))
+        results = []
+
+        def reserve(user_id):
+            with SessionLocal() as db:
+                barrier.wait()
+                try:
+                    ReservationService(db).reserve_gift(user_id, gift_id)
+                    results.append("ok")
+                except ReservationConflict:
+                    results.append("conflict")
+
+        threads = [threading.Thread(target=reserve, args=(user_id,)) for user_id in user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results.count("ok") == 1
+        assert results.count("conflict") == len(user_ids) - 1
+        with SessionLocal() as db:
+            assert len(ReservationService(db).reservation_repo.list_by_gift(gift_id, only_active=True)) == 1
+        engine.dispose()
@@ -1,10 +1,35 @@
+import copy
+
 import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
 from app.config import settings
 
+
+def log_config() -> dict:
+	"""Логи uvicorn и отчёт о запуске каждого воркера (логгер app.boot)"""
+	config = copy.deepcopy(LOGGING_CONFIG)
+	config["loggers"]["app.boot"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
+	return config
+
+
 if __name__ == "__main__":
-	uvicorn.run(
-		'app.main:app',
-		port=8000,
-		reload=settings.debug,
-		log_level='info',
-	)
\ No newline at end of file
+	if settings.production:
+		# Несколько процессов без reload; схему заранее готовит python -m app.migrations upgrade
+		uvicorn.run(
+			'app.main:app',
+			host=settings.host,
+			port=settings.port,
+			workers=settings.workers,
+			log_level='info',
+			log_config=log_config(),
+		)
+	else:
+		uvicorn.run(
+			'app.main:app',
+			host=settings.host,
+			port=settings.port,
+			reload=settings.debug,
+			log_level='info',
+			log_config=log_config(),
+		)
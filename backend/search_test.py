@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.gift import GiftCreate, GiftUpdate
+from app.schemas.user import UserCreate
+from app.schemas.wishlist import WishlistCreate
+from app.services.gift_service import GiftService
+from app.services.search_service import SearchService
+from app.services.user_service import UserService
+from app.services.wishlist_service import WishlistService
+
+
+@pytest.fixture
+def db_session():
+    """Создаёт временную in-memory БД (вместе с FTS5-индексами) для каждого теста"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def owner(db_session):
+    return UserService(db_session).register(UserCreate(
+        login="owner",
+        email="owner@example.com",
+        password="password123"
+    ))
+
+
+def make_wishlist(db_session, owner, name, is_private=False):
+    return WishlistService(db_session).create_for_user(owner.user_id, WishlistCreate(
+        user_id=owner.user_id,
+        name=name,
+        event_date="2026-01-01",
+        is_private=is_private
+    ))
+
+
+def make_gift(db_session, owner, wishlist, name, description=None):
+    return GiftService(db_session).create_for_user(owner.user_id, GiftCreate(
+        wishlist_id=wishlist.wishlist_id,
+        name=name,
+        description=description
+    ))
+
+
+class TestGiftSearch:
+    """Поиск подарков через полнотекстовый индекс"""
+
+    def test_substring_in_name_and_description(self, db_session, owner):
+        """✅ Позитив: подстрока ищется и в названии, и в описании"""
+        wishlist = make_wishlist(db_session, owner, "Birthday")
+        make_gift(db_session, owner, wishlist, "PlayStation 5")
+        make_gift(db_session, owner, wishlist, "Console", "Like a playstation but cheaper")
+        make_gift(db_session, owner, wishlist, "Book")
+
+        gifts = GiftService(db_session).list_for_wishlist(owner.user_id, wishlist.wishlist_id, search="aystat")
+
+        assert sorted(g.name for g in gifts) == ["Console", "PlayStation 5"]
+
+    def test_index_follows_update_and_delete(self, db_session, owner):
+        """✅ Позитив: изменения и удаления сразу видны в поиске"""
+        wishlist = make_wishlist(db_session, owner, "Birthday")
+        gift = make_gift(db_session, owner, wishlist, "Keyboard")
+        service = GiftService(db_session)
+
+        service.update_for_owner(gift.gift_id, owner.user_id, GiftUpdate(name="Headphones"))
+        assert service.list_for_wishlist(owner.user_id, wishlist.wishlist_id, search="keyboard") == []
+        assert len(service.list_for_wishlist(owner.user_id, wishlist.wishlist_id, search="phones")) == 1
+
+        service.delete_for_owner(gift.gift_id, owner.user_id)
+        assert service.list_for_wishlist(owner.user_id, wishlist.wishlist_id, search="phones") == []
+
+    def test_short_term_falls_back_to_like(self, db_session, owner):
+        """✅ Позитив: строки короче трёх символов тоже находятся"""
+        wishlist = make_wishlist(db_session, owner, "Birthday")
+        make_gift(db_session, owner, wishlist, "TV")
+
+        gifts = GiftService(db_session).list_for_wishlist(owner.user_id, wishlist.wishlist_id, search="tv")
+
+        assert [g.name for g in gifts] == ["TV"]
+
+
+class TestGlobalSearch:
+    """Глобальный поиск по подаркам, вишлистам и пользователям"""
+
+    def test_private_wishlists_are_hidden(self, db_session, owner):
+        """✅ Позитив: приватные вишлисты и их подарки не попадают в выдачу"""
+        public = make_wishlist(db_session, owner, "Public party")
+        private = make_wishlist(db_session, owner, "Secret party", is_private=True)
+        make_gift(db_session, owner, public, "Party hat")
+        make_gift(db_session, owner, private, "Party cake")
+
+        results = SearchService(db_session).search("party")
+
+        assert [w.name for w in results["wishlists"]] == ["Public party"]
+        assert [g.name for g in results["gifts"]] == ["Party hat"]
+
+    def test_users_by_login_or_email(self, db_session, owner):
+        """✅ Позитив: пользователи ищутся по логину и по почте"""
+        UserService(db_session).register(UserCreate(
+            login="alice",
+            email="wonder@example.com",
+            password="password123"
+        ))
+
+        assert [u.login for u in SearchService(db_session).search("lic")["users"]] == ["alice"]
+        assert [u.login for u in SearchService(db_session).search("wonder")["users"]] == ["alice"]
+
+    def test_empty_query(self, db_session):
+        """❌ Негатив: пустой запрос"""
+        with pytest.raises(ValueError, match="Search query is empty"):
+            SearchService(db_session).search("   ")
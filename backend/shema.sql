@@ -1,10 +1,15 @@
 PRAGMA foreign_keys = ON;
 
+DROP TABLE IF EXISTS gifts_fts;
+DROP TABLE IF EXISTS wishlists_fts;
+DROP TABLE IF EXISTS users_fts;
+DROP TABLE IF EXISTS unique_link_log;
 DROP TABLE IF EXISTS logs;
 DROP TABLE IF EXISTS reservations;
 DROP TABLE IF EXISTS gifts;
 DROP TABLE IF EXISTS wishlists;
 DROP TABLE IF EXISTS users;
+DROP TABLE IF EXISTS schema_version;
 
 CREATE TABLE users (
     user_id     INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,10 +30,14 @@ CREATE TABLE wishlists (
     is_private  INTEGER DEFAULT 0,
     unique_link TEXT UNIQUE,
     created_at  TEXT NOT NULL ,
+    gift_count            INTEGER NOT NULL DEFAULT 0,
+    reserved_count        INTEGER NOT NULL DEFAULT 0,
+    available_total_price REAL NOT NULL DEFAULT 0,
+    version               INTEGER NOT NULL DEFAULT 1,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
-CREATE INDEX idx_wishlists_user_id ON wishlists(user_id);
+CREATE INDEX ix_wishlists_user_id_wishlist_id ON wishlists(user_id, wishlist_id);
 CREATE INDEX idx_wishlists_unique_link ON wishlists(unique_link);
 
 CREATE TABLE gifts (
@@ -43,8 +52,7 @@ CREATE TABLE gifts (
     FOREIGN KEY (wishlist_id) REFERENCES wishlists(wishlist_id) ON DELETE CASCADE
 );
 
-CREATE INDEX idx_gifts_wishlist_id ON gifts(wishlist_id);
-CREATE INDEX idx_gifts_status ON gifts(status);
+CREATE INDEX ix_gifts_wishlist_id_status ON gifts(wishlist_id, status);
 
 CREATE TABLE reservations (
     reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,9 +65,24 @@ CREATE TABLE reservations (
     UNIQUE(user_id, gift_id)
 );
 
-CREATE INDEX idx_reservations_user_id ON reservations(user_id);
-CREATE INDEX idx_reservations_gift_id ON reservations(gift_id);
-CREATE INDEX idx_reservations_cancelled_at ON reservations(cancelled_at);
+CREATE INDEX ix_reservations_user_id_cancelled_at ON reservations(user_id, cancelled_at);
+CREATE INDEX ix_reservations_gift_id_cancelled_at ON reservations(gift_id, cancelled_at);
+-- Не больше одной активной брони на подарок
+CREATE UNIQUE INDEX uq_reservations_active_gift ON reservations(gift_id) WHERE cancelled_at IS NULL;
+
+-- Версия схемы (app/migrations): файл соответствует последней миграции
+CREATE TABLE schema_version (
+    version     INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at  TEXT NOT NULL
+);
+
+INSERT INTO schema_version (version, description, applied_at) VALUES
+    (1, 'wishlist counters', datetime('now')),
+    (2, 'indexes for list and reservation queries', datetime('now')),
+    (3, 'unique link log for the link filter', datetime('now')),
+    (4, 'drop legacy reservation triggers', datetime('now')),
+    (5, 'drop single-column gifts.wishlist_id index', datetime('now'));
 
 CREATE TABLE logs (
     log_id     INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -71,49 +94,8 @@ CREATE TABLE logs (
 );
 
 
-CREATE TRIGGER trigger_reserve_gift
-BEFORE INSERT ON reservations
-FOR EACH ROW
-WHEN NEW.cancelled_at IS NULL 
-BEGIN
-    SELECT
-        CASE
-            WHEN (SELECT status FROM gifts WHERE gift_id = NEW.gift_id) != 'available'
-            THEN RAISE(ABORT, 'Gift is already reserved')
-        END;
-
-
-    UPDATE gifts
-    SET status = 'reserved'
-    WHERE gift_id = NEW.gift_id;
-END;
-
-
-CREATE TRIGGER trigger_cancel_reservation
-AFTER UPDATE OF cancelled_at ON reservations
-FOR EACH ROW
-WHEN NEW.cancelled_at IS NOT NULL AND OLD.cancelled_at IS NULL 
-BEGIN
-    UPDATE gifts
-    SET status = 'available'
-    WHERE gift_id = OLD.gift_id;
-END;
-
-CREATE TRIGGER trigger_reactivate_reservation
-AFTER UPDATE OF cancelled_at ON reservations
-FOR EACH ROW
-WHEN NEW.cancelled_at IS NULL AND OLD.cancelled_at IS NOT NULL  
-BEGIN
-    SELECT
-        CASE
-            WHEN (SELECT status FROM gifts WHERE gift_id = NEW.gift_id) != 'available'
-            THEN RAISE(ABORT, 'Gift is already reserved by someone else')
-        END;
-
-    UPDATE gifts
-    SET status = 'reserved'
-    WHERE gift_id = NEW.gift_id;
-END;
+-- Статус подарка переключает само приложение (ReservationRepository.reserve/cancel):
+-- условный UPDATE gifts ... WHERE status = 'available' в одной транзакции с бронью.
 
 CREATE TRIGGER trigger_log_reservation
 AFTER INSERT ON reservations
@@ -123,3 +105,31 @@ BEGIN
     INSERT INTO logs (user_id, action_type, details, timestamp)
     VALUES (NEW.user_id, 'RESERVE_GIFT', 'Gift ID: ' || NEW.gift_id, datetime('now'));
 END;
+
+
+-- Журнал новых unique_link: по нему воркеры досинхронизируют фильтр ссылок (app/services/link_filter.py)
+CREATE TABLE unique_link_log (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    unique_link TEXT NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS unique_link_log_ai AFTER INSERT ON wishlists WHEN new.unique_link IS NOT NULL BEGIN INSERT INTO unique_link_log (unique_link) VALUES (new.unique_link); END;
+CREATE TRIGGER IF NOT EXISTS unique_link_log_au AFTER UPDATE OF unique_link ON wishlists WHEN new.unique_link IS NOT NULL BEGIN INSERT INTO unique_link_log (unique_link) VALUES (new.unique_link); END;
+
+
+-- Полнотекстовый поиск (FTS5, trigram): индексы синхронизируются триггерами
+
+CREATE VIRTUAL TABLE IF NOT EXISTS gifts_fts USING fts5(name, description, content='gifts', content_rowid='gift_id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS gifts_fts_ai AFTER INSERT ON gifts BEGIN INSERT INTO gifts_fts(rowid, name, description) VALUES (new.gift_id, new.name, new.description); END;
+CREATE TRIGGER IF NOT EXISTS gifts_fts_ad AFTER DELETE ON gifts BEGIN INSERT INTO gifts_fts(gifts_fts, rowid, name, description) VALUES ('delete', old.gift_id, old.name, old.description); END;
+CREATE TRIGGER IF NOT EXISTS gifts_fts_au AFTER UPDATE OF name, description ON gifts BEGIN INSERT INTO gifts_fts(gifts_fts, rowid, name, description) VALUES ('delete', old.gift_id, old.name, old.description); INSERT INTO gifts_fts(rowid, name, description) VALUES (new.gift_id, new.name, new.description); END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS wishlists_fts USING fts5(name, content='wishlists', content_rowid='wishlist_id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS wishlists_fts_ai AFTER INSERT ON wishlists BEGIN INSERT INTO wishlists_fts(rowid, name) VALUES (new.wishlist_id, new.name); END;
+CREATE TRIGGER IF NOT EXISTS wishlists_fts_ad AFTER DELETE ON wishlists BEGIN INSERT INTO wishlists_fts(wishlists_fts, rowid, name) VALUES ('delete', old.wishlist_id, old.name); END;
+CREATE TRIGGER IF NOT EXISTS wishlists_fts_au AFTER UPDATE OF name ON wishlists BEGIN INSERT INTO wishlists_fts(wishlists_fts, rowid, name) VALUES ('delete', old.wishlist_id, old.name); INSERT INTO wishlists_fts(rowid, name) VALUES (new.wishlist_id, new.name); END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(login, email, content='users', content_rowid='user_id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN INSERT INTO users_fts(rowid, login, email) VALUES (new.user_id, new.login, new.email); END;
+CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN INSERT INTO users_fts(users_fts, rowid, login, email) VALUES ('delete', old.user_id, old.login, old.email); END;
+CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF login, email ON users BEGIN INSERT INTO users_fts(users_fts, rowid, login, email) VALUES ('delete', old.user_id, old.login, old.email); INSERT INTO users_fts(rowid, login, email) VALUES (new.user_id, new.login, new.email); END;
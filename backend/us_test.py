@@ -1,10 +1,15 @@
+import asyncio
+
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
-from app.schemas.user import UserCreate, UserUpdate
-from app.services.user_service import UserService
+from app.repositories.rows import UserRow
+from app.schemas.user import UserCreate, UserShort, UserUpdate
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+from app.services.user_cache import UserPrincipal, UserPrincipalCache, user_cache
+from app.services.user_service import UserService, authenticate_async, register_async
 
 
 @pytest.fixture
@@ -258,6 +263,25 @@ class TestUserRetrieval:
         assert len(users) == 3
         assert all(user.user_id is not None for user in users)
     
+    def test_list_users_skips_password_hash(self, db_session, registered_user):
+        """✅ Позитив: список читает только столбцы UserShort, без password_hash"""
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            users = UserService(db_session).list_users()
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+        assert isinstance(users[0], UserRow)
+        assert set(UserShort.model_fields) <= set(UserRow.__slots__)
+        assert "password_hash" not in statements[0]
+        assert UserShort.model_validate(users[0]).login == registered_user.login
+
     def test_list_users_with_pagination(self, db_session):
         """✅ Позитив: Пагинация списка пользователей"""
         service = UserService(db_session)
@@ -277,6 +301,24 @@ class TestUserRetrieval:
         assert len(second_page) == 2
         assert first_page[0].user_id != second_page[0].user_id
     
+    def test_list_users_with_cursor(self, db_session):
+        """✅ Позитив: Следующая страница по курсору продолжает предыдущую"""
+        from app.repositories.pagination import next_cursor
+        service = UserService(db_session)
+        
+        for i in range(5):
+            service.register(UserCreate(
+                login=f"user{i}",
+                email=f"user{i}@example.com",
+                password="password123"
+            ))
+        
+        first_page = service.list_users(limit=3)
+        second_page = service.list_users(limit=3, cursor=next_cursor(first_page, 3, "user_id"))
+        
+        assert [u.login for u in first_page + second_page] == [f"user{i}" for i in range(5)]
+        assert next_cursor(second_page, 3, "user_id") is None
+    
     def test_list_users_with_search(self, db_session):
         """✅ Позитив: Поиск пользователей по подстроке"""
         service = UserService(db_session)
@@ -474,4 +516,132 @@ class TestUserDeletion:
         service = UserService(db_session)
         
         with pytest.raises(ValueError, match="User not found"):
-            service.delete_user(99999)
\ No newline at end of file
+            service.delete_user(99999)
+
+
+class TestUserPrincipalCache:
+    """Тесты кэша пользователей для аутентификации"""
+
+    def test_hit_and_miss_counters(self):
+        """✅ Позитив: повторное чтение попадает в кэш"""
+        cache = UserPrincipalCache(maxsize=10, ttl=60)
+        assert cache.get(1) is None
+        cache.put(UserPrincipal(user_id=1, login="a", email="a@example.com"))
+
+        assert cache.get(1).login == "a"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_expired_entry_is_miss(self):
+        """✅ Позитив: запись с истёкшим TTL не возвращается"""
+        now = [0.0]
+        cache = UserPrincipalCache(maxsize=10, ttl=5, clock=lambda: now[0])
+        cache.put(UserPrincipal(user_id=1, login="a", email="a@example.com"))
+        now[0] = 6.0
+
+        assert cache.get(1) is None
+
+    def test_least_recently_used_is_evicted(self):
+        """✅ Позитив: при переполнении вытесняется самая старая запись"""
+        cache = UserPrincipalCache(maxsize=2, ttl=60)
+        for user_id in (1, 2):
+            cache.put(UserPrincipal(user_id=user_id, login=str(user_id), email="x@example.com"))
+        cache.get(1)
+        cache.put(UserPrincipal(user_id=3, login="3", email="x@example.com"))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+
+    def test_update_profile_invalidates_entry(self, db_session, registered_user):
+        """✅ Позитив: обновление профиля сбрасывает закэшированного пользователя"""
+        user_cache.put(UserPrincipal.from_user(registered_user))
+
+        UserService(db_session).update_profile(registered_user.user_id, UserUpdate(login="renamed"))
+
+        assert user_cache.get(registered_user.user_id) is None
+
+    def test_delete_user_invalidates_entry(self, db_session, registered_user):
+        """✅ Позитив: удаление пользователя сбрасывает закэшированного пользователя"""
+        user_id = registered_user.user_id
+        user_cache.put(UserPrincipal.from_user(registered_user))
+
+        UserService(db_session).delete_user(user_id)
+
+        assert user_cache.get(user_id) is None
+
+
+class InlineRunner:
+    """Асинхронная обёртка над сервисом без пула потоков: in-memory SQLite привязан к потоку"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def __getattr__(self, name):
+        method = getattr(self.service, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class TestPasswordHasher:
+    """Тесты вынесенного в пул хеширования паролей"""
+
+    def test_hash_and_verify_in_pool(self):
+        """✅ Позитив: хеш, посчитанный в пуле, проверяется"""
+        hasher = PasswordHasher(mode="thread", workers=1, max_queue=4)
+
+        async def scenario():
+            hashed = await hasher.hash_async("password123")
+            return await hasher.verify_async("password123", hashed)
+
+        try:
+            assert asyncio.run(scenario()) is True
+            assert hasher.queue_depth == 0
+        finally:
+            hasher.shutdown()
+
+    def test_full_queue_rejects_immediately(self):
+        """❌ Негатив: при заполненной очереди задача отклоняется без ожидания"""
+        hasher = PasswordHasher(mode="thread", workers=1, max_queue=0)
+
+        with pytest.raises(PasswordHasherBusy):
+            asyncio.run(hasher.hash_async("password123"))
+        assert hasher.rejected == 1
+
+    def test_register_and_authenticate_async(self, db_session, sample_user_data):
+        """✅ Позитив: async-точки входа регистрируют и аутентифицируют пользователя"""
+        service = InlineRunner(UserService(db_session))
+
+        async def scenario():
+            created = await register_async(service, sample_user_data)
+            user = await authenticate_async(service, sample_user_data.login, sample_user_data.password)
+            return created.user_id, user.user_id
+
+        created_id, user_id = asyncio.run(scenario())
+        assert created_id == user_id
+
+    def test_register_async_taken_login_skips_hashing(self, db_session, registered_user, sample_user_data, monkeypatch):
+        """❌ Негатив: занятый логин отклоняется до хеширования, пул argon2 не занимается"""
+        from app.services import user_service
+
+        hashed = []
+
+        async def hash_async(password):
+            hashed.append(password)
+            return "hash"
+
+        monkeypatch.setattr(user_service.password_hasher, "hash_async", hash_async)
+        service = InlineRunner(UserService(db_session))
+
+        with pytest.raises(ValueError, match="Login is already taken"):
+            asyncio.run(register_async(service, sample_user_data))
+        assert hashed == []
+
+    def test_authenticate_async_wrong_password(self, db_session, registered_user):
+        """❌ Негатив: неверный пароль через async-точку входа"""
+        service = InlineRunner(UserService(db_session))
+
+        with pytest.raises(ValueError, match="Invalid credentials"):
+            asyncio.run(authenticate_async(service, registered_user.login, "wrongpassword"))
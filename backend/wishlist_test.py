@@ -1,11 +1,17 @@
 import pytest
 from datetime import date
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.database import Base
+from app.models.wishlist import Wishlist
+from app.schemas.gift import GiftCreate, GiftUpdate
 from app.schemas.user import UserCreate
-from app.schemas.wishlist import WishlistCreate, WishlistUpdate
+from app.schemas.wishlist import WishlistCreate, WishlistRead, WishlistShort, WishlistUpdate
+from app.repositories.rows import WishlistRow
+from app.repositories.wishlist_repository import WishlistRepository
+from app.services.gift_service import GiftService
+from app.services.reservation_service import ReservationService
 from app.services.user_service import UserService
 from app.services.wishlist_service import WishlistService
 
@@ -187,6 +193,28 @@ class TestListWishlists:
         assert wishlists[0].wishlist_id == public_wishlist.wishlist_id
         assert wishlists[0].is_private == 0
 
+    def test_list_selects_only_short_columns(self, db_session, wishlist_service, test_user, public_wishlist):
+        """✅ Позитив: список читает только столбцы WishlistShort и не создаёт ORM-объекты"""
+        user_id, name = test_user.user_id, public_wishlist.name
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        db_session.expunge_all()
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            wishlists = wishlist_service.list_for_user(user_id=user_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+        assert isinstance(wishlists[0], WishlistRow)
+        assert set(WishlistShort.model_fields) <= set(WishlistRow.__slots__)
+        assert len(statements) == 1 and "gifts" not in statements[0]
+        assert not any(isinstance(obj, Wishlist) for obj in db_session.identity_map.values())
+        assert WishlistShort.model_validate(wishlists[0]).name == name
+
 
 class TestRegenerateUniqueLink:
     """Тесты регенерации уникальной ссылки"""
@@ -272,3 +300,238 @@ class TestDeleteWishlist:
                 wishlist_id=public_wishlist.wishlist_id,
                 owner_id=another_user.user_id,
             )
+
+
+class TestWishlistReadQueries:
+    """Число запросов при чтении вишлиста не зависит от количества подарков"""
+
+    @staticmethod
+    def _add_gifts(db_session, owner, wishlist, count):
+        service = GiftService(db_session)
+        for i in range(count):
+            service.create_for_user(
+                owner.user_id,
+                GiftCreate(wishlist_id=wishlist.wishlist_id, name=f"Gift {i}"),
+            )
+
+    @staticmethod
+    def _count_queries(db_session, read):
+        """Выполняет чтение и сериализацию в новой сессии и считает SQL-запросы"""
+        engine = db_session.get_bind()
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            with Session(bind=engine) as session:
+                WishlistRead.model_validate(read(WishlistService(session)))
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+        return len(statements)
+
+    @pytest.mark.parametrize("gift_count", [1, 25])
+    def test_public_link_query_count_is_fixed(self, db_session, test_user, public_wishlist, gift_count):
+        """✅ Позитив: публичная ссылка — 2 запроса (вишлист + подарки)"""
+        self._add_gifts(db_session, test_user, public_wishlist, gift_count)
+        link = public_wishlist.unique_link
+
+        queries = self._count_queries(db_session, lambda service: service.get_public_by_link(link))
+
+        assert queries == 2
+
+    @pytest.mark.parametrize("gift_count", [1, 25])
+    def test_owner_read_query_count_is_fixed(self, db_session, test_user, public_wishlist, gift_count):
+        """✅ Позитив: чтение владельцем — 2 запроса, включая счётчики броней"""
+        self._add_gifts(db_session, test_user, public_wishlist, gift_count)
+        wl_id, owner_id = public_wishlist.wishlist_id, test_user.user_id
+
+        queries = self._count_queries(
+            db_session,
+            lambda service: service.get_for_owner(wl_id, owner_id, load_gifts=True),
+        )
+
+        assert queries == 2
+
+    def test_owner_read_includes_reservation_counts(self, db_session, test_user, public_wishlist):
+        """✅ Позитив: владельцу возвращается число активных броней по каждому подарку"""
+        self._add_gifts(db_session, test_user, public_wishlist, 1)
+
+        wishlist = WishlistService(db_session).get_for_owner(
+            public_wishlist.wishlist_id, test_user.user_id, load_gifts=True
+        )
+
+        assert [gift.active_reservations for gift in wishlist.gifts] == [0]
+
+
+class TestWishlistCounters:
+    """Денормализованные счётчики вишлиста"""
+
+    @staticmethod
+    def _counters(db_session, wishlist_id):
+        db_session.expire_all()
+        wishlist = WishlistRepository(db_session).get_by_id(wishlist_id)
+        return wishlist.gift_count, wishlist.reserved_count, wishlist.available_total_price
+
+    def test_counters_follow_gift_and_reservation_changes(self, db_session, test_user, another_user, public_wishlist):
+        """✅ Позитив: создание, изменение цены, бронь, отмена и удаление меняют счётчики"""
+        wl_id = public_wishlist.wishlist_id
+        gifts = GiftService(db_session)
+        book = gifts.create_for_user(test_user.user_id, GiftCreate(wishlist_id=wl_id, name="Book", price=10))
+        gifts.create_for_user(test_user.user_id, GiftCreate(wishlist_id=wl_id, name="Pen", price=5))
+        assert self._counters(db_session, wl_id) == (2, 0, 15.0)
+
+        gifts.update_for_owner(book.gift_id, test_user.user_id, GiftUpdate(price=20))
+        assert self._counters(db_session, wl_id) == (2, 0, 25.0)
+
+        reservation = ReservationService(db_session).reserve_gift(another_user.user_id, book.gift_id)
+        assert self._counters(db_session, wl_id) == (2, 1, 5.0)
+
+        ReservationService(db_session).cancel_for_user(reservation.reservation_id, another_user.user_id)
+        assert self._counters(db_session, wl_id) == (2, 0, 25.0)
+
+        gifts.delete_for_owner(book.gift_id, test_user.user_id)
+        assert self._counters(db_session, wl_id) == (1, 0, 5.0)
+
+    def test_moving_gift_between_wishlists(self, db_session, test_user, public_wishlist, private_wishlist):
+        """✅ Позитив: перенос подарка уменьшает один вишлист и увеличивает другой"""
+        gift = GiftService(db_session).create_for_user(
+            test_user.user_id, GiftCreate(wishlist_id=public_wishlist.wishlist_id, name="Lamp", price=7)
+        )
+
+        GiftService(db_session).update_for_owner(
+            gift.gift_id, test_user.user_id, GiftUpdate(wishlist_id=private_wishlist.wishlist_id)
+        )
+
+        assert self._counters(db_session, public_wishlist.wishlist_id) == (0, 0, 0.0)
+        assert self._counters(db_session, private_wishlist.wishlist_id) == (1, 0, 7.0)
+
+    def test_bulk_create_updates_counters(self, db_session, test_user, public_wishlist):
+        """✅ Позитив: пакетное создание учитывается одним обновлением"""
+        rows = [{"name": f"Gift {i}", "price": 2} for i in range(10)]
+        GiftService(db_session).bulk_create_for_user(test_user.user_id, rows, wishlist_id=public_wishlist.wishlist_id)
+
+        assert self._counters(db_session, public_wishlist.wishlist_id) == (10, 0, 20.0)
+
+    def test_reconcile_fixes_drift(self, db_session, test_user, public_wishlist):
+        """❌ Негатив: счётчики, испорченные в обход репозиториев, восстанавливаются"""
+        GiftService(db_session).create_for_user(
+            test_user.user_id, GiftCreate(wishlist_id=public_wishlist.wishlist_id, name="Book", price=3)
+        )
+        db_session.execute(update(Wishlist).values(gift_count=99))
+        db_session.commit()
+
+        fixed = WishlistRepository(db_session).reconcile_counters()
+
+        assert fixed == 1
+        assert self._counters(db_session, public_wishlist.wishlist_id) == (1, 0, 3.0)
+        assert WishlistRepository(db_session).reconcile_counters() == 0
+
+    def test_dashboard_is_single_query(self, db_session, test_user, public_wishlist):
+        """✅ Позитив: список вишлистов со счётчиками — один запрос без подгрузки подарков"""
+        GiftService(db_session).create_for_user(
+            test_user.user_id, GiftCreate(wishlist_id=public_wishlist.wishlist_id, name="Book", price=3)
+        )
+        owner_id = test_user.user_id
+        engine = db_session.get_bind()
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            with Session(bind=engine) as session:
+                items = [WishlistShort.model_validate(w) for w in WishlistService(session).list_for_user(owner_id)]
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+        assert len(statements) == 1
+        assert items[0].gift_count == 1
+        assert items[0].available_total_price == 3.0
+
+
+class TestUnitOfWork:
+    """Тесты единицы работы: один COMMIT на вызов сервиса"""
+
+    @pytest.fixture
+    def commits(self, db_session):
+        engine = db_session.get_bind()
+        counter = []
+
+        def on_commit(conn):
+            counter.append(conn)
+
+        event.listen(engine, "commit", on_commit)
+        yield counter
+        event.remove(engine, "commit", on_commit)
+
+    def test_update_with_link_change_commits_once(self, db_session, test_user, public_wishlist, commits):
+        """✅ Позитив: смена ссылки и полей вишлиста — одна транзакция, версия из RETURNING"""
+        version = public_wishlist.version
+
+        updated = WishlistService(db_session).update_for_user(
+            public_wishlist.wishlist_id,
+            test_user.user_id,
+            WishlistUpdate(name="Renamed", is_private=True, unique_link="private-link"),
+        )
+
+        assert len(commits) == 1
+        assert updated.version == version + 2
+        assert updated.unique_link == "private-link"
+
+    def test_invalidation_runs_after_commit(self, db_session, test_user, public_wishlist, commits, monkeypatch):
+        """✅ Позитив: кэш сбрасывается только после COMMIT"""
+        from app.services import wishlist_service
+
+        events = []
+        monkeypatch.setattr(
+            wishlist_service.public_wishlist_cache, "invalidate_wishlist",
+            lambda wishlist_id: events.append(("invalidate", len(commits))),
+        )
+
+        WishlistService(db_session).regenerate_unique_link(public_wishlist.wishlist_id, test_user.user_id)
+
+        assert events == [("invalidate", 1)]
+
+    def test_error_rolls_back_whole_call(self, db_session, test_user, public_wishlist, monkeypatch):
+        """❌ Негатив: ошибка в середине вызова откатывает уже выполненные записи и не сбрасывает кэш"""
+        from app.services import wishlist_service
+
+        invalidated = []
+        monkeypatch.setattr(wishlist_service.public_wishlist_cache, "invalidate_wishlist", invalidated.append)
+        monkeypatch.setattr(WishlistRepository, "update", lambda self, wishlist, data: 1 / 0)
+        wishlist_id, old_link = public_wishlist.wishlist_id, public_wishlist.unique_link
+
+        with pytest.raises(ZeroDivisionError):
+            WishlistService(db_session).update_for_user(
+                wishlist_id, test_user.user_id, WishlistUpdate(is_private=True, unique_link="other"),
+            )
+
+        assert invalidated == []
+        assert db_session.get(Wishlist, wishlist_id).unique_link == old_link
+        db_session.commit()
+        assert invalidated == []
+
+    def test_nested_service_calls_share_transaction(self, db_session, test_user, commits):
+        """✅ Позитив: вызов сервиса из сервиса не коммитит раньше внешнего"""
+        from app.services.unit_of_work import transactional
+
+        class Batch:
+            def __init__(self, db):
+                self.db = db
+                self.wishlists = WishlistService(db)
+
+            @transactional
+            def create_two(self):
+                for name in ("First", "Second"):
+                    self.wishlists.create_for_user(
+                        test_user.user_id, WishlistCreate(user_id=test_user.user_id, name=name, event_date=date(2026, 1, 1)),
+                    )
+                assert commits == []
+
+        Batch(db_session).create_two()
+
+        assert len(commits) == 1
+        assert [w.name for w in WishlistService(db_session).list_for_user(test_user.user_id)] == ["First", "Second"]